@@ -0,0 +1,45 @@
+import django_filters
+from bikes.models import Bike
+from testimonials.filters import TestimonialFilter
+from .models import Issue
+
+
+class BikeModerationFilter(django_filters.FilterSet):
+    """
+    Selections for bulk bike moderation: price, name, approval, owner and age. Unlike the
+    catalog's BikeFilter there is no availability window, which does not describe the rows.
+    """
+    min_price = django_filters.NumberFilter(field_name="price_per_day", lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name="price_per_day", lookup_expr='lte')
+    name = django_filters.CharFilter(field_name="name", lookup_expr='icontains')
+    is_approved = django_filters.BooleanFilter(field_name="is_approved")
+    availability_status = django_filters.BooleanFilter(field_name="availability_status")
+    owner = django_filters.NumberFilter(field_name="owner")
+    brand = django_filters.CharFilter(field_name="brand", lookup_expr='iexact')
+    created_before = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='lt')
+    created_after = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='gte')
+
+    class Meta:
+        model = Bike
+        fields = ['min_price', 'max_price', 'name', 'is_approved', 'availability_status', 'owner', 'brand',
+                  'created_before', 'created_after']
+
+
+class TestimonialModerationFilter(TestimonialFilter):
+    """Selections for bulk testimonial moderation."""
+    user = django_filters.NumberFilter(field_name="user")
+    created_before = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='lt')
+    created_after = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='gte')
+
+
+class IssueModerationFilter(django_filters.FilterSet):
+    """Selections for bulk issue moderation."""
+    status = django_filters.ChoiceFilter(field_name="status", choices=Issue.STATUS_CHOICES)
+    user = django_filters.NumberFilter(field_name="user")
+    bike = django_filters.NumberFilter(field_name="bike")
+    created_before = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='lt')
+    created_after = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr='gte')
+
+    class Meta:
+        model = Issue
+        fields = ['status', 'user', 'bike', 'created_before', 'created_after']
@@ -0,0 +1,135 @@
+"""
+Bulk moderation of bikes, testimonials and issues.
+
+``moderate`` applies one action (approve a set of bikes, feature
+testimonials, resolve issues, ...) to rows chosen by primary key or by a
+filter expression, in a single ``UPDATE``. A filter must set at least one
+value; sweeping the whole table takes an explicit ``select_all``. Rows already in the requested
+state are left alone, so their ``updated_at`` does not move and the
+returned count is the number of rows that actually changed.
+
+``update()`` skips ``save()`` and the model signals, so each target
+declares the caches its rows feed instead. They are invalidated once per
+call after the transaction commits, however many rows changed:
+
+* bikes: the catalog response cache version and the nearby-search grid;
+* testimonials: the homepage feed and rating summary;
+* issues: nothing is cached.
+"""
+from django.db import transaction
+from django.utils.timezone import now
+
+from bikes.cache import bump_catalog_version
+from bikes.geo import geo_index
+from bikes.models import Bike
+from testimonials.feed import invalidate_feed
+from testimonials.models import Testimonial
+from .filters import BikeModerationFilter, IssueModerationFilter, TestimonialModerationFilter
+from .models import Issue
+
+# Ids accepted per request; larger sweeps should use a filter.
+MAX_IDS = 10_000
+
+
+class ModerationError(Exception):
+    """Raised for an unknown target or action, or an invalid selection."""
+
+
+def _invalidate_catalog():
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(geo_index.invalidate)
+
+
+class ModerationTarget:
+    def __init__(self, model, filterset_class, actions, invalidate=None):
+        self.model = model
+        self.filterset_class = filterset_class
+        # action -> the field values it sets
+        self.actions = actions
+        self.invalidate = invalidate
+
+    def changes(self, action, user):
+        """Field values to write for `action` done by `user`."""
+        return dict(self.actions[action])
+
+
+class IssueTarget(ModerationTarget):
+    def changes(self, action, user):
+        values = super().changes(action, user)
+        # Record who resolved the issues; reopened issues are no longer resolved by anyone.
+        values['resolved_by'] = user if values['status'] == 'resolved' else None
+        return values
+
+
+TARGETS = {
+    'bikes': ModerationTarget(
+        Bike, BikeModerationFilter,
+        {'approve': {'is_approved': True}, 'reject': {'is_approved': False}},
+        invalidate=_invalidate_catalog,
+    ),
+    'testimonials': ModerationTarget(
+        Testimonial, TestimonialModerationFilter,
+        {
+            'approve': {'is_approved': True},
+            'reject': {'is_approved': False},
+            'feature': {'is_featured': True},
+            'unfeature': {'is_featured': False},
+        },
+        invalidate=invalidate_feed,
+    ),
+    'issues': IssueTarget(
+        Issue, IssueModerationFilter,
+        {'resolve': {'status': 'resolved'}, 'start': {'status': 'in_progress'}, 'reopen': {'status': 'open'}},
+    ),
+}
+
+
+def select(target, ids=None, filters=None, select_all=False):
+    """
+    Rows of `target` chosen by primary key and/or a filter expression (query-string style
+    lookups), or every row if `select_all` is set.
+    """
+    if select_all:
+        if ids or filters:
+            raise ModerationError("Select all rows or give ids / a filter, not both.")
+        return target.model.objects.all()
+    if not ids and not filters:
+        raise ModerationError("Select rows with ids or a non-empty filter.")
+    if ids and len(ids) > MAX_IDS:
+        raise ModerationError(f"At most {MAX_IDS} ids per request; use a filter for larger sweeps.")
+    queryset = target.model.objects.all()
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    if filters:
+        unknown = set(filters) - set(target.filterset_class.base_filters)
+        if unknown:
+            raise ModerationError(f"Unknown filter(s): {', '.join(sorted(unknown))}.")
+        filterset = target.filterset_class(filters, queryset=queryset)
+        if not filterset.is_valid():
+            raise ModerationError(filterset.errors.as_text())
+        # Blank values filter nothing; a filter made only of them would select the whole table.
+        if all(value in (None, '') for value in filterset.form.cleaned_data.values()):
+            raise ModerationError("The filter must set at least one non-empty value.")
+        queryset = filterset.qs
+    return queryset
+
+
+def moderate(target_name, action, user, ids=None, filters=None, select_all=False):
+    """
+    Apply `action` to the selected rows of `target_name` in one UPDATE and
+    return the number of rows changed.
+    """
+    target = TARGETS.get(target_name)
+    if target is None:
+        raise ModerationError(f"Unknown target '{target_name}'. Choose from: {', '.join(TARGETS)}.")
+    if action not in target.actions:
+        raise ModerationError(f"Unknown action '{action}' for {target_name}. Choose from: {', '.join(target.actions)}.")
+    changes = target.changes(action, user)
+    # The action's own fields decide whether a row still needs it (resolved_by is recorded, not compared).
+    pending = select(target, ids, filters, select_all).exclude(**target.actions[action])
+    with transaction.atomic():
+        # A plain UPDATE does not touch auto_now fields.
+        updated = pending.order_by().update(**changes, updated_at=now())
+        if updated and target.invalidate is not None:
+            target.invalidate()
+    return updated
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
 from .models import Issue
+from .moderation import MAX_IDS
 
-class AdminPanelSerializer(serializers.ModelSerializer):
+class AdminPanelSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Issue
         fields = '__all__'
@@ -18,4 +20,28 @@ class AdminPanelSerializer(serializers.ModelSerializer):
         cleaned_value = escape(value) if value else value
         if len(cleaned_value.strip()) < 10:
             raise serializers.ValidationError("Issue description must be at least 10 characters long.")
-        return cleaned_value
\ No newline at end of file
+        return cleaned_value
+
+
+class BulkModerationSerializer(serializers.Serializer):
+    action = serializers.CharField(help_text="Moderation action, e.g. approve, feature or resolve.")
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=MAX_IDS,
+        help_text="Primary keys of the rows to moderate.",
+    )
+    filter = serializers.DictField(
+        required=False, allow_empty=False,
+        help_text="Filter lookups selecting the rows to moderate, e.g. {\"is_approved\": false, \"owner\": 7}.",
+    )
+
+    all = serializers.BooleanField(
+        required=False, default=False, help_text="Moderate every row of the target; cannot be combined with ids or filter.",
+    )
+
+    def validate(self, data):
+        if data['all']:
+            if 'ids' in data or 'filter' in data:
+                raise serializers.ValidationError("all cannot be combined with ids or a filter.")
+        elif 'ids' not in data and 'filter' not in data:
+            raise serializers.ValidationError("Provide ids, a filter, or both (or all: true for every row).")
+        return data
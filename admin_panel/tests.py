@@ -1,3 +1,108 @@
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.utils import seed_bikes, seed_users
+from bikes.models import Bike
+from testimonials.models import Testimonial
+from users.models import User
+from .models import Issue
+from .moderation import moderate
+
+
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.reporter = seed_users(2, prefix='moderation-user')
+        cls.bikes = seed_bikes(cls.reporter, 6, prefix='moderation-bike')
+        Bike.objects.filter(pk__in=[bike.pk for bike in cls.bikes[:3]]).update(is_approved=False)
+        Issue.objects.bulk_create([
+            Issue(user=cls.reporter, bike=bike, description=f"Issue with {bike.name}.") for bike in cls.bikes[:2]
+        ])
+
+    def test_bulk_approve_is_one_update(self):
+        ids = [bike.pk for bike in self.bikes[:4]]
+        with CaptureQueriesContext(connection) as queries:
+            updated = moderate('bikes', 'approve', self.admin, ids=ids)
+        # The already approved bike is not counted.
+        self.assertEqual(updated, 3)
+        self.assertEqual([query['sql'].split()[0] for query in queries].count('UPDATE'), 1)
+        self.assertFalse(Bike.objects.filter(pk__in=ids, is_approved=False).exists())
+
+    def test_bulk_resolve_records_admin(self):
+        updated = moderate('issues', 'resolve', self.admin, filters={'status': 'open'})
+        self.assertEqual(updated, 2)
+        self.assertEqual(set(Issue.objects.values_list('status', 'resolved_by')), {('resolved', self.admin.pk)})
+
+
+class BulkModerationViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.reporter = seed_users(2, prefix='moderation-view-user')
+        User.objects.filter(pk=cls.admin.pk).update(is_staff=True)
+        cls.bikes = seed_bikes(cls.reporter, 4, prefix='moderation-view-bike')
+        Bike.objects.filter(pk__in=[bike.pk for bike in cls.bikes[:3]]).update(is_approved=False)
+        cls.issues = Issue.objects.bulk_create([
+            Issue(user=cls.reporter, bike=bike, description=f"Issue with {bike.name}.") for bike in cls.bikes[:2]
+        ])
+        cls.testimonials = Testimonial.objects.bulk_create([
+            Testimonial(user=cls.reporter, content=f"Testimonial {i}.", rating=5) for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def moderate(self, target, expected_status=200, **body):
+        response = self.client.post(f'/api/admin/moderate/{target}/', body, content_type='application/json')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def test_invalid_requests_are_rejected(self):
+        unapproved = Bike.objects.filter(is_approved=False).count()
+        for target, body in (
+            ('cars', {'action': 'approve', 'ids': [self.bikes[0].pk]}),
+            ('bikes', {'action': 'feature', 'ids': [self.bikes[0].pk]}),
+            ('bikes', {'action': 'approve', 'filter': {'name': ''}}),
+            ('bikes', {'action': 'approve', 'filter': {'is_approved': '', 'owner': ''}}),
+            ('bikes', {'action': 'approve', 'filter': {'available_from': '2030-01-01T00:00:00'}}),
+            ('bikes', {'action': 'approve', 'filter': {'colour': 'red'}}),
+            ('bikes', {'action': 'approve'}),
+            ('bikes', {'action': 'approve', 'all': True, 'ids': [self.bikes[0].pk]}),
+        ):
+            self.assertFalse(self.moderate(target, 400, **body)['success'], (target, body))
+        self.assertEqual(Bike.objects.filter(is_approved=False).count(), unapproved)
+
+    def test_whole_table_needs_all(self):
+        self.assertEqual(self.moderate('bikes', action='approve', all=True)['updated'], 3)
+        self.assertFalse(Bike.objects.filter(is_approved=False).exists())
+
+    def test_testimonials_approve_and_feature(self):
+        ids = [testimonial.pk for testimonial in self.testimonials[:2]]
+        self.assertEqual(self.moderate('testimonials', action='approve', ids=ids)['updated'], 2)
+        self.assertEqual(self.moderate('testimonials', action='feature', filter={'is_approved': True})['updated'], 2)
+        self.assertEqual(set(Testimonial.objects.values_list('pk', 'is_approved', 'is_featured')), {
+            (ids[0], True, True), (ids[1], True, True), (self.testimonials[2].pk, False, False),
+        })
+
+    def test_reopen_clears_resolved_by(self):
+        ids = [issue.pk for issue in self.issues]
+        self.moderate('issues', action='resolve', ids=ids)
+        self.assertEqual(set(Issue.objects.values_list('status', 'resolved_by')), {('resolved', self.admin.pk)})
+        self.assertEqual(self.moderate('issues', action='reopen', filter={'status': 'resolved'})['updated'], 2)
+        self.assertEqual(set(Issue.objects.values_list('status', 'resolved_by')), {('open', None)})
 
-# Create your tests here.
+    def test_caches_are_invalidated_once_per_request(self):
+        bump_catalog = self.enterContext(mock.patch('admin_panel.moderation.bump_catalog_version'))
+        bump_feed = self.enterContext(mock.patch('testimonials.feed.bump_feed_version'))
+        self.enterContext(mock.patch('testimonials.feed.run_coalesced_in_background'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.moderate('bikes', action='approve', filter={'owner': self.reporter.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.moderate('testimonials', action='approve', ids=[testimonial.pk for testimonial in self.testimonials])
+        self.assertEqual((bump_catalog.call_count, bump_feed.call_count), (1, 1))
+        # Nothing changed, so nothing is invalidated.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.moderate('bikes', action='approve', filter={'owner': self.reporter.pk})
+        self.assertEqual(bump_catalog.call_count, 1)
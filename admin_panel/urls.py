@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import IssueViewSet
+from .views import BulkModerationView, IssueViewSet
 
 router = DefaultRouter()
 router.register(r'issue', IssueViewSet)
 
 urlpatterns = [
+    path('moderate/<str:target>/', BulkModerationView.as_view(), name='bulk-moderation'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,17 +1,48 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from bike_rental_service.fieldsets import SparseFieldsetMixin
 
 from .models import Issue
-from .serializers import AdminPanelSerializer
+from .moderation import ModerationError, moderate
+from .serializers import AdminPanelSerializer, BulkModerationSerializer
 
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     Manage issues (create, list, retrieve, update, delete).
 
     * Requires: Admin authentication
+    * Optional: fields / omit (comma-separated) to choose the returned fields on GET
     * Returns: Issue data or list of issues
     """
     queryset = Issue.objects.all()
     serializer_class = AdminPanelSerializer
     permission_classes = [IsAdminUser]
-    throttle_scope = 'admin_issues'  # Scoped to 50/day
\ No newline at end of file
+    throttle_scope = 'admin_issues'  # Scoped to 50/day
+
+class BulkModerationView(APIView):
+    """
+    Apply one moderation action to many bikes, testimonials or issues in a single update.
+
+    * Requires: Admin authentication, action, and ids (list) and/or filter (object of non-empty filter lookups),
+      or all: true to moderate every row
+    * Actions: bikes (approve, reject); testimonials (approve, reject, feature, unfeature);
+      issues (resolve, start, reopen; resolving records the admin as resolved_by)
+    * Returns: Number of rows changed (rows already in that state are skipped)
+    """
+    permission_classes = [IsAdminUser]
+    throttle_scope = 'moderation'  # Scoped to 200/day
+
+    def post(self, request, target):
+        serializer = BulkModerationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            updated = moderate(target, data['action'], request.user, ids=data.get('ids'), filters=data.get('filter'),
+                               select_all=data['all'])
+        except ModerationError as exc:
+            return Response({"success": False, "message": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"success": True, "target": target, "action": data['action'], "updated": updated},
+                        status=status.HTTP_200_OK)
@@ -0,0 +1,365 @@
+"""
+In-process load test of the main API endpoints.
+
+Each scenario builds a list of requests against a seeded dataset, and the
+runner sends them through the real URLconf and middleware with the Django
+test client from several threads at once (one client and one database
+connection per thread). For every scenario and concurrency level it
+records throughput, latency percentiles and the number of queries each
+request ran, so runs can be written to JSON and compared with a baseline.
+
+The requests commit, and several run concurrently, so a transaction that
+is rolled back afterwards (see benchmarks.utils) cannot hold the data.
+``scratch_database`` creates a throwaway database the way the test runner
+does, and the whole run happens inside it. While it runs:
+
+* the throttle rates are raised so no request is refused; every throttle
+  check still runs and is counted with the request's queries;
+* PayPal's IPN postback is answered with ``VERIFIED`` in-process, so the
+  IPN scenario measures this service and not a round trip to PayPal.
+
+Threads share the GIL, so throughput measures one worker process serving
+concurrent requests; lock waits and database contention show up in the
+latency percentiles. Queries run by the background worker (payment
+preparation, the IPN queue) are off the request path and not counted.
+"""
+import json
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from paypal.standard.ipn.models import PayPalIPN
+from rest_framework.throttling import SimpleRateThrottle
+
+from bike_rental_service.background import worker
+from bikes.cache import bump_catalog_version
+from bikes.geo import geo_index
+from bookings.models import Booking
+from payment.models import Payment
+from users.authentication import get_valid_token
+from .utils import seed_bikes, seed_bookings, seed_users, summarize
+
+User = get_user_model()
+
+LOGIN_PASSWORD = 'loadtest-password'
+SEARCH_TERMS = ['honda', 'yamaha', 'royal enfield', 'bajaj pulsar', 'tvs', 'benchmark bike']
+
+# Growth in mean queries per request tolerated by ``compare``: the first
+# request of each throttle key also inserts its bucket row.
+QUERY_TOLERANCE = 0.5
+
+
+@contextmanager
+def scratch_database(keepdb=False, verbosity=0):
+    """Run the block against a freshly migrated copy of the default database's schema."""
+    settings_dict = connection.settings_dict
+    old_name, old_test = settings_dict['NAME'], settings_dict['TEST']
+    if connection.vendor == 'sqlite' and not settings_dict['TEST'].get('NAME'):
+        # The in-memory test database serializes writers with "table is locked" errors instead of waiting.
+        settings_dict['TEST'] = {**settings_dict['TEST'], 'NAME': f"{old_name}-loadtest"}
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        worker.join()
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+        settings_dict['TEST'] = old_test
+
+
+@contextmanager
+def raised_throttle_rates():
+    """Allow every request while keeping the throttle checks on the request path."""
+    rates = SimpleRateThrottle.THROTTLE_RATES
+    saved = dict(rates)
+    rates.update({scope: '1000000/second' for scope in saved})
+    try:
+        yield
+    finally:
+        rates.clear()
+        rates.update(saved)
+
+
+@contextmanager
+def verified_postbacks():
+    """Answer django-paypal's IPN verification postback without calling PayPal."""
+    postback = PayPalIPN._postback
+    PayPalIPN._postback = lambda ipn_obj: b"VERIFIED"
+    try:
+        yield
+    finally:
+        PayPalIPN._postback = postback
+
+
+def seed_dataset(users, bikes, bookings, rng):
+    """
+    Create `users` users (sharing one password, each with a token), `bikes`
+    bikes spread over ten owners and `bookings` bookings. Returns what the
+    scenarios need to build requests.
+    """
+    people = seed_users(users, prefix='loadtest-user')
+    # One hash for everybody: hashing is what login measures, not what seeding should spend time on.
+    User.objects.filter(pk__in=[user.pk for user in people]).update(password=make_password(LOGIN_PASSWORD))
+    owners = people[:10]
+    fleet = []
+    for number, owner in enumerate(owners):
+        fleet += seed_bikes(owner, bikes // len(owners) + (number < bikes % len(owners)),
+                            prefix=f"loadtest-bike-{number}", rng=rng)
+    _, cursors = seed_bookings(people, fleet, bookings, rng=rng)
+    bump_catalog_version()
+    geo_index.invalidate()
+    return SimpleNamespace(
+        users=people,
+        bikes=fleet,
+        tokens={user.pk: get_valid_token(user).key for user in people},
+        # Bookings created by the scenarios start after every seeded booking.
+        free_from=max(cursors.values()) + timedelta(days=1),
+        rng=rng,
+    )
+
+
+def fresh_bookings(dataset, count):
+    """`count` new bookings after every existing one, for scenarios that need their own."""
+    bikes = dataset.bikes[:count]
+    origin, cursors = seed_bookings(dataset.users, bikes, count, rng=dataset.rng, origin=dataset.free_from)
+    dataset.free_from = max(cursors.values()) + timedelta(days=1)
+    return list(Booking.objects.filter(bike__in=bikes, start_date__gte=origin).select_related('user').order_by('id'))
+
+
+def call(method, path, data=None, form=False, token=None):
+    """One request: (method, path, body, content type, headers)."""
+    if form:
+        body, content_type = urlencode(data), 'application/x-www-form-urlencoded'
+    else:
+        body, content_type = ('' if data is None else json.dumps(data)), 'application/json'
+    headers = {'Authorization': f"Token {token}"} if token else {}
+    return method, path, body, content_type, headers
+
+
+def user_token(dataset, index):
+    user = dataset.users[index % len(dataset.users)]
+    return user, dataset.tokens[user.pk]
+
+
+def bike_list(dataset, count):
+    pages = max(1, len(dataset.bikes) // settings.REST_FRAMEWORK.get('PAGE_SIZE', 10))
+    return [call('GET', f"/api/bikes/?page={index % min(pages, 50) + 1}") for index in range(count)]
+
+
+def bike_search(dataset, count):
+    return [call('GET', '/api/bikes/?' + urlencode({'search': SEARCH_TERMS[index % len(SEARCH_TERMS)]}))
+            for index in range(count)]
+
+
+def bike_detail(dataset, count):
+    return [call('GET', f"/api/bikes/bikes/{dataset.rng.choice(dataset.bikes).pk}/") for _ in range(count)]
+
+
+def booking_list(dataset, count):
+    return [call('GET', '/api/bookings/', token=user_token(dataset, index)[1]) for index in range(count)]
+
+
+def booking_create(dataset, count):
+    calls = []
+    for index in range(count):
+        bike = dataset.bikes[index % len(dataset.bikes)]
+        # One day per booking, each bike's bookings back to back.
+        start = dataset.free_from + timedelta(days=index // len(dataset.bikes))
+        calls.append(call('POST', '/api/bookings/create/', {
+            'bike': bike.pk,
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(hours=23)).isoformat(),
+            'pickup_location': 'Kathmandu',
+            'rental_duration': 'daily',
+            'payment_option': 'full_online',
+        }, token=user_token(dataset, index)[1]))
+    dataset.free_from += timedelta(days=count // len(dataset.bikes) + 1)
+    return calls
+
+
+def payment_create(dataset, count):
+    return [call('POST', '/api/payments/', {'booking': booking.pk, 'payment_method': 'paypal'},
+                 token=dataset.tokens[booking.user_id])
+            for booking in fresh_bookings(dataset, count)]
+
+
+def ipn(dataset, count):
+    bookings = fresh_bookings(dataset, count)
+    Payment.objects.bulk_create([
+        Payment(booking=booking, amount=booking.total_price, payment_method='paypal') for booking in bookings
+    ])
+    return [call('POST', '/api/payments/paypal-ipn/', {
+        'txn_type': 'web_accept',
+        'txn_id': f"LOADTEST{booking.pk}",
+        'invoice': str(booking.pk),
+        'payment_status': 'Completed',
+        'mc_gross': f"{booking.total_price:.2f}",
+        'mc_currency': 'USD',
+        'receiver_email': settings.PAYPAL_RECEIVER_EMAIL,
+        'payer_email': f"{booking.user.username}@example.com",
+        'test_ipn': '1',
+        'charset': 'utf-8',
+    }, form=True) for booking in bookings]
+
+
+def login(dataset, count):
+    return [call('POST', '/api/users/login/', {'username': user_token(dataset, index)[0].username,
+                                               'password': LOGIN_PASSWORD})
+            for index in range(count)]
+
+
+# name -> builder of `count` requests; the order is the order they run in.
+SCENARIOS = {
+    'bike_list': bike_list,
+    'bike_search': bike_search,
+    'bike_detail': bike_detail,
+    'booking_list': booking_list,
+    'booking_create': booking_create,
+    'payment_create': payment_create,
+    'ipn': ipn,
+    'login': login,
+}
+
+
+def send(calls, concurrency):
+    """
+    Send `calls` from `concurrency` threads; return the wall time and one
+    (seconds, queries, status code) sample per request.
+    """
+    pending = queue.SimpleQueue()
+    for item in calls:
+        pending.put(item)
+    samples = []
+    ready = threading.Barrier(concurrency + 1)
+
+    def count_queries(counter):
+        def wrapper(execute, sql, params, many, context):
+            counter[0] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def drive():
+        client = Client(raise_request_exception=False)
+        results = []
+        try:
+            ready.wait()
+            while True:
+                try:
+                    method, path, body, content_type, headers = pending.get_nowait()
+                except queue.Empty:
+                    break
+                counter = [0]
+                with connection.execute_wrapper(count_queries(counter)):
+                    started = time.perf_counter()
+                    response = client.generic(method, path, body, content_type, headers=headers)
+                    elapsed = time.perf_counter() - started
+                results.append((elapsed, counter[0], response.status_code))
+        finally:
+            samples.extend(results)
+            connection.close()
+
+    threads = [threading.Thread(target=drive, name=f"loadtest-{number}") for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, samples
+
+
+def measure(calls, concurrency):
+    """Throughput, latency summary and queries per request of sending `calls`."""
+    wall, samples = send(calls, concurrency)
+    statuses = {}
+    for _, _, status_code in samples:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    return {
+        'concurrency': concurrency,
+        **summarize([elapsed for elapsed, _, _ in samples]),
+        'throughput_rps': len(samples) / wall if wall else 0.0,
+        'errors': sum(1 for _, _, status_code in samples if status_code >= 400),
+        'status_codes': statuses,
+        'queries_per_request': sum(queries for _, queries, _ in samples) / len(samples) if samples else 0.0,
+        'max_queries': max((queries for _, queries, _ in samples), default=0),
+    }
+
+
+def run_loadtest(scenarios, concurrency_levels, requests, warmup=0, users=200, bikes=1000, bookings=10_000,
+                 seed=0, keepdb=False, progress=None):
+    """
+    Seed a scratch database and run each scenario at each concurrency
+    level. Returns the results as a JSON-serializable dict.
+    """
+    rng = random.Random(seed)
+    results = {
+        'meta': {
+            'vendor': connection.vendor,
+            'dataset': {'users': users, 'bikes': bikes, 'bookings': bookings, 'seed': seed},
+            'requests': requests,
+            'warmup': warmup,
+            'concurrency': list(concurrency_levels),
+        },
+        'scenarios': {},
+    }
+    with scratch_database(keepdb=keepdb), raised_throttle_rates(), verified_postbacks(), \
+            override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        started = time.perf_counter()
+        dataset = seed_dataset(users, bikes, bookings, rng)
+        results['meta']['seed_seconds'] = round(time.perf_counter() - started, 2)
+        for name in scenarios:
+            build = SCENARIOS[name]
+            levels = []
+            for concurrency in concurrency_levels:
+                if warmup:
+                    send(build(dataset, warmup), concurrency)
+                level = measure(build(dataset, requests), concurrency)
+                # Let queued background work finish so it does not spill into the next measurement.
+                worker.join()
+                levels.append(level)
+                if progress is not None:
+                    progress(name, level)
+            results['scenarios'][name] = levels
+    return results
+
+
+def compare(results, baseline, max_regression=10.0):
+    """
+    Regressions of `results` against `baseline`, one message each. Only
+    scenario and concurrency pairs present in both are compared.
+    """
+    allowed = max_regression / 100
+    regressions = []
+    for name, levels in results['scenarios'].items():
+        previous = {level['concurrency']: level for level in baseline.get('scenarios', {}).get(name, [])}
+        for level in levels:
+            before = previous.get(level['concurrency'])
+            if before is None:
+                continue
+            label = f"{name} @ {level['concurrency']}"
+            for key in ('p50_us', 'p95_us', 'p99_us'):
+                if level[key] > before[key] * (1 + allowed):
+                    regressions.append(f"{label}: {key} {before[key]:.0f} -> {level[key]:.0f}")
+            if level['throughput_rps'] < before['throughput_rps'] * (1 - allowed):
+                regressions.append(
+                    f"{label}: throughput {before['throughput_rps']:.1f} -> {level['throughput_rps']:.1f} req/s"
+                )
+            if level['queries_per_request'] > before['queries_per_request'] + QUERY_TOLERANCE:
+                regressions.append(
+                    f"{label}: queries per request {before['queries_per_request']:.1f} "
+                    f"-> {level['queries_per_request']:.1f}"
+                )
+            if level['errors'] > before['errors']:
+                regressions.append(f"{label}: errors {before['errors']} -> {level['errors']}")
+    return regressions
@@ -0,0 +1,55 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.plans import sequential_scans
+from benchmarks.utils import (
+    format_summary, rollback_afterwards, seed_bikes, seed_bookings, seed_users, summarize,
+)
+from bookings.availability import find_conflicting_booking, overlapping_bookings
+
+
+class Command(BaseCommand):
+    help = "Time the overlap check Booking.clean() runs as the number of bookings grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000],
+                            help="Total number of bookings to seed for each run.")
+        parser.add_argument('--bikes', type=int, default=100, help="Number of bikes the bookings are spread over.")
+        parser.add_argument('--queries', type=int, default=2000, help="Availability checks per run.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with rollback_afterwards():
+                self.run(size, options['bikes'], options['queries'], random.Random(options['seed']))
+
+    def run(self, size, bike_count, query_count, rng):
+        self.stdout.write(f"\n== {size} bookings over {bike_count} bikes ==")
+        started = time.perf_counter()
+        users = seed_users(10)
+        bikes = seed_bikes(users[0], bike_count, rng=rng)
+        origin, cursors = seed_bookings(users, bikes, size, rng=rng)
+        self.stdout.write(f"seeded in {time.perf_counter() - started:.1f}s")
+
+        windows = []
+        for _ in range(query_count):
+            bike = rng.choice(bikes)
+            span = (cursors[bike.id] - origin).total_seconds()
+            start = origin + timedelta(seconds=rng.uniform(0, span))
+            windows.append((bike.id, start, start + timedelta(hours=rng.randint(1, 48))))
+
+        samples, free = [], 0
+        for bike_id, start, end in windows:
+            started = time.perf_counter()
+            conflict = find_conflicting_booking(bike_id, start, end)
+            samples.append(time.perf_counter() - started)
+            free += conflict is None
+
+        bike_id, start, end = windows[0]
+        scans = sequential_scans(overlapping_bookings(bike_id, start, end))
+        self.stdout.write(format_summary("find_conflicting_booking", summarize(samples)))
+        self.stdout.write(f"free windows: {free}/{len(windows)}, "
+                          f"sequential scans: {', '.join(scans) or 'none'}")
@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_bikes, seed_users, summarize, timed
+from bike_rental_service.fieldsets import project_queryset
+from bikes.models import Bike
+from bikes.serializers import BikeCardSerializer, BikeSerializer
+
+# label: (serializer, query string, project the queryset)
+SHAPES = {
+    'full rows, full serializer': (BikeSerializer, {}, False),
+    'card (default)': (BikeCardSerializer, {}, True),
+    'fields=id,name,price_per_day': (BikeSerializer, {'fields': 'id,name,price_per_day'}, True),
+    'omit=description,image_variants': (BikeSerializer, {'omit': 'description,image_variants'}, True),
+}
+
+
+class Command(BaseCommand):
+    help = "Measure bike list page serialization time and payload size for each response shape."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bikes', type=int, default=5000)
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 100])
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        owner = seed_users(1, prefix='bench-payload-owner')[0]
+        seed_bikes(owner, options['bikes'], rng=rng)
+        self.stdout.write(f"seeded {options['bikes']} bikes in {time.perf_counter() - started:.1f}s")
+
+        factory = APIRequestFactory()
+        renderer = JSONRenderer()
+        listed = Bike.objects.filter(is_approved=True, availability_status=True).order_by('-average_rating', 'pk')
+        for page_size in options['page_sizes']:
+            for label, (serializer_class, params, project) in SHAPES.items():
+                request = Request(factory.get('/api/bikes/', params))
+                context = {'request': request}
+
+                def render_page():
+                    queryset = listed
+                    if project:
+                        queryset = project_queryset(queryset, serializer_class(context=context))
+                    data = serializer_class(queryset[:page_size], many=True, context=context).data
+                    return renderer.render(data)
+
+                payload = render_page()
+                samples = [timed(render_page)[1] for _ in range(options['repeat'])]
+                self.stdout.write(format_summary(f"page {page_size:>3} {label}", summarize(samples))
+                                  + f" payload={len(payload)}B")
@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_bikes, seed_users, summarize, timed
+from bikes.geo import GeoIndex, nearby_from_database
+from bikes.views import BikeNearbyView
+
+# Roughly the extent of Nepal.
+BOUNDS = (26.3, 30.4, 80.0, 88.2)
+
+
+class Command(BaseCommand):
+    help = "Measure nearby-bike lookups from the in-memory grid against the SQL bounding-box fallback."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bikes', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--radius', type=float, default=5.0, help="Search radius in km.")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        owner = seed_users(1, prefix='bench-nearby-owner')[0]
+        seed_bikes(owner, options['bikes'], rng=rng, bounds=BOUNDS)
+        self.stdout.write(f"seeded {options['bikes']} bikes in {time.perf_counter() - started:.1f}s")
+
+        index = GeoIndex(ttl=3600)
+        _, load_time = timed(index.load)
+        self.stdout.write(f"grid load: {load_time * 1000:.1f}ms for {len(index)} bikes")
+
+        points = [(rng.uniform(BOUNDS[0], BOUNDS[1]), rng.uniform(BOUNDS[2], BOUNDS[3]))
+                  for _ in range(options['queries'])]
+        radius, limit = options['radius'], options['limit']
+        grid, database, mismatches = [], [], 0
+        for lat, lon in points:
+            from_grid, elapsed = timed(index.nearby, lat, lon, radius, limit)
+            grid.append(elapsed)
+            from_database, elapsed = timed(nearby_from_database, lat, lon, radius, limit)
+            database.append(elapsed)
+            mismatches += [bike_id for _, bike_id in from_grid] != [bike_id for _, bike_id in from_database]
+
+        factory = APIRequestFactory()
+        view = BikeNearbyView.as_view(throttle_classes=[])
+        endpoint = []
+        with override_settings(BIKES_GEO_INDEX_ENABLED=True):
+            from bikes import geo
+            geo.geo_index, original = index, geo.geo_index
+            try:
+                for lat, lon in points[:200]:
+                    request = factory.get('/api/bikes/nearby/', {'lat': lat, 'lon': lon, 'radius': radius, 'limit': limit})
+                    _, elapsed = timed(view, request)
+                    endpoint.append(elapsed)
+            finally:
+                geo.geo_index = original
+
+        self.stdout.write(format_summary('grid lookup', summarize(grid)))
+        self.stdout.write(format_summary('sql bounding box', summarize(database)))
+        self.stdout.write(format_summary('endpoint (grid + fetch)', summarize(endpoint)))
+        self.stdout.write(f"result mismatches between grid and sql: {mismatches}")
@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import rollback_afterwards, seed_bikes, seed_users
+from bikes.filters import BikeSearchFilter
+from bikes.models import Bike
+
+WORDS = ['activa', 'pulsar', 'classic', 'splendor', 'duke', 'ntorq', 'fz', 'apache', 'ather', 'chetak',
+         'city', 'touring', 'sport', 'commuter', 'cargo', 'mountain', 'comfort', 'helmet', 'lightweight']
+
+
+class LegacyView:
+    # The search configuration BikeListView used before the ranked backend.
+    search_fields = ['name', 'model_year', 'type', 'brand']
+
+
+class Command(BaseCommand):
+    help = "Compare the icontains SearchFilter with the ranked bike search backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bikes', type=int, default=100_000)
+        parser.add_argument('--queries', nargs='+', default=['honda', 'pulsar', 'royal classic', 'electric 2020', 'duk'])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        owner = seed_users(1, prefix='bench-search-owner')[0]
+        bikes = seed_bikes(owner, options['bikes'], rng=rng)
+        # Give the seeded bikes varied names and descriptions to search through.
+        for bike in bikes:
+            bike.name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {bike.id}"
+            bike.description = ' '.join(rng.choice(WORDS) for _ in range(12))
+            bike.search_document = bike.build_search_document()
+        Bike.objects.bulk_update(bikes, ['name', 'description', 'search_document'], batch_size=1000)
+        self.stdout.write(f"seeded {len(bikes)} bikes in {time.perf_counter() - started:.1f}s")
+
+        factory = APIRequestFactory()
+        queryset = Bike.objects.filter(is_approved=True, availability_status=True)
+        self.stdout.write(f"{'query':<16} {'icontains':>12} {'matches':>8} {'ranked':>12} {'matches':>8}")
+        for term in options['queries']:
+            request = Request(factory.get('/api/bikes/', {'search': term}))
+            legacy = SearchFilter().filter_queryset(request, queryset, LegacyView())
+            ranked = BikeSearchFilter().filter_queryset(request, queryset, None)
+            legacy_time, legacy_count = self.measure(legacy, options['repeat'])
+            ranked_time, ranked_count = self.measure(ranked, options['repeat'])
+            self.stdout.write(
+                f"{term:<16} {legacy_time * 1000:>10.1f}ms {legacy_count:>8} "
+                f"{ranked_time * 1000:>10.1f}ms {ranked_count:>8}"
+            )
+
+    def measure(self, queryset, repeat):
+        """Best time to fetch the count and first page, as the paginated list view does."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:10])
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, count
@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils.timezone import now
+
+from benchmarks.utils import seed_bikes, seed_users
+from bookings.availability import ACTIVE_STATUSES
+from bookings.exceptions import BookingConflict
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+
+
+class Command(BaseCommand):
+    help = "Hammer one bike with concurrent booking creates and check for double bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=200, help="Booking attempts per thread.")
+        parser.add_argument('--slots', type=int, default=300,
+                            help="Number of hourly start slots the attempts compete for.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Worker threads use their own connections, so the seed data must be committed.
+        users = seed_users(options['threads'], prefix='bench-contention-user')
+        bike = seed_bikes(users[0], 1, prefix='bench-contention-bike')[0]
+        try:
+            self.run(bike, users, options)
+        finally:
+            Booking.objects.filter(bike=bike).delete()
+            bike.delete()
+            for user in users:
+                user.delete()
+
+    def run(self, bike, users, options):
+        origin = (now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        counts = {'created': 0, 'conflicts': 0, 'errors': 0}
+        counts_lock = threading.Lock()
+
+        def worker(thread_number):
+            rng = random.Random(options['seed'] + thread_number)
+            user = users[thread_number]
+            local = {'created': 0, 'conflicts': 0, 'errors': 0}
+            try:
+                for _ in range(options['attempts']):
+                    start = origin + timedelta(hours=rng.randrange(options['slots']))
+                    serializer = BookingSerializer(data={
+                        'bike': bike.id,
+                        'start_date': start,
+                        'end_date': start + timedelta(hours=rng.randint(1, 6)),
+                        'pickup_location': 'Kathmandu',
+                        'rental_duration': 'hourly',
+                        'payment_option': 'cash_on_delivery',
+                    })
+                    serializer.is_valid(raise_exception=True)
+                    try:
+                        serializer.save(user=user)
+                        local['created'] += 1
+                    except BookingConflict:
+                        local['conflicts'] += 1
+                    except Exception:
+                        local['errors'] += 1
+            finally:
+                connections.close_all()
+            with counts_lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            list(executor.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+
+        windows = list(
+            Booking.objects.filter(bike=bike, status__in=ACTIVE_STATUSES)
+            .order_by('start_date').values_list('start_date', 'end_date')
+        )
+        double_bookings, latest_end = 0, None
+        for start, end in windows:
+            if latest_end is not None and start < latest_end:
+                double_bookings += 1
+            latest_end = end if latest_end is None else max(latest_end, end)
+
+        attempts = options['threads'] * options['attempts']
+        self.stdout.write(f"backend: {connection.vendor}, threads: {options['threads']}, attempts: {attempts}")
+        self.stdout.write(f"elapsed: {elapsed:.2f}s, throughput: {attempts / elapsed:.0f} attempts/s")
+        self.stdout.write(
+            f"created: {counts['created']}, conflicts (409): {counts['conflicts']}, errors: {counts['errors']}"
+        )
+        self.stdout.write(f"double bookings: {double_bookings}")
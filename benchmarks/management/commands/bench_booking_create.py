@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bike_rental_service.background import worker
+from benchmarks.utils import format_summary, seed_bikes, seed_users, summarize
+from bookings.models import Booking
+from bookings.views import BookingCreateView
+from payment.serializers import PaymentSerializer
+
+
+class LegacyBookingCreateView(BookingCreateView):
+    """The create path before payment preparation moved off the request: two separate writes plus
+    PaymentSerializer validation, outside a single transaction."""
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            self.perform_create(serializer)
+            booking = serializer.instance
+            response_data = {"success": True, "data": serializer.data, "message": "Booking created successfully"}
+            if booking.payment_option in ['full_online', 'partial_online']:
+                payment_serializer = PaymentSerializer(data={"booking": booking.id, "payment_method": "paypal"})
+                if payment_serializer.is_valid():
+                    payment = payment_serializer.save()
+                    response_data["redirect_url"] = reverse('payment_process', kwargs={'payment_id': payment.id})
+                    response_data["message"] += ". Redirecting to payment."
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class Command(BaseCommand):
+    help = "Compare booking creation latency of the legacy and the single-transaction create paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help="Bookings created per path.")
+
+    def handle(self, *args, **options):
+        # Commit behaviour is part of what is measured, so data is committed and cleaned up afterwards.
+        users = seed_users(1, prefix='bench-create-user')
+        bikes = seed_bikes(users[0], 2, prefix='bench-create-bike', rng=random.Random(0))
+        try:
+            for label, view_class, bike in (("legacy create path", LegacyBookingCreateView, bikes[0]),
+                                            ("single transaction path", BookingCreateView, bikes[1])):
+                # In a single process the worker threads would compete with the timed requests
+                # for the GIL and the SQLite file lock, so their tasks are held back and run afterwards.
+                deferred = []
+                with mock.patch.object(worker, 'submit', lambda func, *a, **kw: deferred.append((func, a, kw))):
+                    # Throttling would cap the run at the "bookings" rate.
+                    samples = self.measure(view_class.as_view(throttle_classes=[]), users[0], bike, options['requests'])
+                self.stdout.write(format_summary(label, summarize(samples)))
+                if deferred:
+                    started = time.perf_counter()
+                    for func, task_args, task_kwargs in deferred:
+                        func(*task_args, **task_kwargs)
+                    self.stdout.write(f"  {len(deferred)} background tasks ran in "
+                                      f"{(time.perf_counter() - started) * 1000:.1f}ms off the request path")
+        finally:
+            Booking.objects.filter(bike__in=bikes).delete()
+            for bike in bikes:
+                bike.delete()
+            users[0].delete()
+
+    def measure(self, view, user, bike, count):
+        factory = APIRequestFactory()
+        origin = now() + timedelta(days=1)
+        samples = []
+        for i in range(count):
+            start = origin + timedelta(days=2 * i)
+            request = factory.post('/api/bookings/create/', {
+                'bike': bike.id,
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=1)).isoformat(),
+                'pickup_location': 'Kathmandu',
+                'rental_duration': 'daily',
+                'payment_option': 'full_online',
+            }, format='json')
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 201, response.content
+        return samples
@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.db import connection, reset_queries
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.utils import rollback_afterwards, seed_bikes, seed_bookings, seed_users
+from bookings.models import Booking
+from bookings.pagination import BookingCursorPagination
+from bookings.views import BookingListView
+
+
+class Command(BaseCommand):
+    help = "Compare page-number and cursor pagination of the staff booking history at increasing depth."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1_000_000, help="Number of bookings to seed.")
+        parser.add_argument('--depths', nargs='+', type=float, default=[0, 0.1, 0.5, 0.99],
+                            help="Page positions as a fraction of the history.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        started = time.perf_counter()
+        users = seed_users(20)
+        staff = users[0]
+        staff.is_staff = True
+        staff.save(update_fields=['is_staff'])
+        bikes = seed_bikes(staff, 200, rng=random.Random(0))
+        seed_bookings(users, bikes, options['size'])
+        self.stdout.write(f"seeded {options['size']} bookings in {time.perf_counter() - started:.1f}s")
+
+        factory = APIRequestFactory()
+        view = BookingListView.as_view()
+        ordered = Booking.objects.order_by('-created_at', '-id')
+        page_size = BookingCursorPagination.page_size or 10
+
+        self.stdout.write(f"{'depth':>8} {'page-number':>16} {'queries':>8} {'cursor':>12} {'queries':>8}")
+        for depth in options['depths']:
+            offset = int(depth * (options['size'] - page_size))
+            page = offset // page_size + 1
+            number_time, number_queries = self.measure(view, factory, staff, f"/api/bookings/?page={page}", options['repeat'])
+
+            paginator = BookingCursorPagination()
+            paginator.base_url = 'http://testserver/api/bookings/'
+            # Position of the row just before the page, exactly what a "next" link would carry.
+            position = paginator._encode_position(ordered[offset - 1]) if offset else None
+            cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+            cursor_time, cursor_queries = self.measure(view, factory, staff, cursor_url, options['repeat'])
+            self.stdout.write(
+                f"{offset:>8} {number_time * 1000:>14.1f}ms {number_queries:>8} "
+                f"{cursor_time * 1000:>10.1f}ms {cursor_queries:>8}"
+            )
+
+    def measure(self, view, factory, user, url, repeat):
+        samples, queries = [], 0
+        # Seeding fills the query log; CaptureQueriesContext needs room to count.
+        reset_queries()
+        for _ in range(repeat):
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.content
+            queries = len(context)
+        return min(samples), queries
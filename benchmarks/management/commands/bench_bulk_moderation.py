@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from admin_panel.models import Issue
+from admin_panel.moderation import moderate
+from benchmarks.utils import rollback_afterwards, seed_bikes, seed_users
+from bikes.models import Bike
+from testimonials.models import Testimonial
+
+
+class Command(BaseCommand):
+    help = "Compare moderating rows one save() at a time with a single bulk moderation update."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Rows of each kind to moderate.")
+        parser.add_argument('--sample', type=int, default=500, help="Rows moderated one at a time; extrapolated to --rows.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        rows, sample = options['rows'], options['sample']
+        started = time.perf_counter()
+        users = seed_users(50, prefix='bench-moderation-user')
+        admin = users[0]
+        bikes = seed_bikes(admin, rows + sample, prefix='bench-moderation-bike', rng=rng)
+        Bike.objects.filter(pk__in=[bike.pk for bike in bikes]).update(is_approved=False)
+        Testimonial.objects.bulk_create([
+            Testimonial(user=rng.choice(users), content=f"Benchmark testimonial {index}.", rating=rng.randint(1, 5))
+            for index in range(rows + sample)
+        ], batch_size=5000)
+        Issue.objects.bulk_create([
+            Issue(user=rng.choice(users), bike=rng.choice(bikes), description=f"Benchmark issue number {index}.")
+            for index in range(rows + sample)
+        ], batch_size=5000)
+        self.stdout.write(f"seeded {rows + sample} bikes, testimonials and issues in {time.perf_counter() - started:.1f}s")
+
+        kinds = [
+            ('bikes', 'approve', Bike.objects.filter(slug__startswith='bench-moderation-bike-'),
+             lambda bike: (setattr(bike, 'is_approved', True), bike.save())),
+            ('testimonials', 'approve', Testimonial.objects.filter(content__startswith='Benchmark testimonial'),
+             lambda testimonial: testimonial.mark_as_approved()),
+            ('issues', 'resolve', Issue.objects.filter(description__startswith='Benchmark issue'),
+             lambda issue: issue.mark_as_resolved(admin)),
+        ]
+        self.stdout.write(f"one save() per row: measured on {sample} rows, extrapolated to the bulk row count")
+        self.stdout.write(f"{'target':<13} {'one save() per row':>20} {'bulk':>10} {'queries':>8} {'rows':>7}")
+        for target, action, queryset, moderate_one in kinds:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+            one_by_one = list(queryset.filter(pk__in=ids[:sample]))
+            started = time.perf_counter()
+            for obj in one_by_one:
+                moderate_one(obj)
+            per_row = (time.perf_counter() - started) / len(one_by_one)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                updated = moderate(target, action, admin, ids=ids[sample:])
+                bulk = time.perf_counter() - started
+            self.stdout.write(
+                f"{target:<13} {per_row * updated * 1000:>18.0f}ms {bulk * 1000:>8.0f}ms "
+                f"{len(queries):>8} {updated:>7}"
+            )
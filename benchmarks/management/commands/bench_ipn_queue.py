@@ -0,0 +1,76 @@
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_bikes, seed_bookings, seed_users, summarize, timed
+from bookings.models import Booking
+from payment.ipn import enqueue_ipn, process_ipn_queue
+from payment.models import Payment
+
+
+def apply_synchronously(ipn_obj):
+    """The previous signal handler: one get() and save() per notification."""
+    try:
+        payment = Payment.objects.get(booking_id=ipn_obj.invoice)
+    except Payment.DoesNotExist:
+        return
+    if ipn_obj.payment_status == 'Completed':
+        payment.mark_as_completed(transaction_id=ipn_obj.txn_id)
+    elif ipn_obj.payment_status == 'Failed':
+        payment.mark_as_failed()
+
+
+class Command(BaseCommand):
+    help = "Measure PayPal IPN handling: synchronous per-notification updates against the batched queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=5000)
+        parser.add_argument('--retries', type=int, default=3, help="Deliveries of each notification (retry storm).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for label, run in (('synchronous', self.run_synchronous), ('queued', self.run_queued)):
+            with rollback_afterwards():
+                notifications = self.seed(options)
+                run(label, notifications, options)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        users = seed_users(20, prefix='bench-ipn-user')
+        bikes = seed_bikes(users[0], 200, prefix='bench-ipn-bike', rng=rng)
+        seed_bookings(users, bikes, options['payments'], rng=rng)
+        bookings = Booking.objects.filter(user__in=users).values_list('id', 'total_price')
+        Payment.objects.bulk_create(
+            [Payment(booking_id=booking_id, amount=price, payment_method='paypal') for booking_id, price in bookings],
+            batch_size=5000,
+        )
+        notifications = [
+            SimpleNamespace(pk=None, txn_id=f"BENCH{booking_id}", invoice=str(booking_id),
+                            payment_status='Completed' if rng.random() < 0.9 else 'Failed')
+            for booking_id, _ in bookings
+        ] * options['retries']
+        rng.shuffle(notifications)
+        return notifications
+
+    def run_synchronous(self, label, notifications, options):
+        samples = [timed(apply_synchronously, ipn_obj)[1] for ipn_obj in notifications]
+        self.stdout.write(format_summary(f"{label} handler", summarize(samples)))
+        self.report(label, sum(samples))
+
+    def run_queued(self, label, notifications, options):
+        # The scheduled drain never runs inside the rolled-back transaction; drain explicitly.
+        samples = [timed(enqueue_ipn, ipn_obj)[1] for ipn_obj in notifications]
+        self.stdout.write(format_summary(f"{label} handler", summarize(samples)))
+        started = time.perf_counter()
+        outcomes = process_ipn_queue(batch_size=options['batch_size'])
+        drained = time.perf_counter() - started
+        self.stdout.write(f"{label} drain: {sum(outcomes.values())} unique notifications in {drained * 1000:.0f}ms "
+                          f"({dict(outcomes)})")
+        self.report(label, sum(samples) + drained)
+
+    def report(self, label, total):
+        completed = Payment.objects.filter(status='completed', transaction_id__startswith='BENCH').count()
+        self.stdout.write(f"{label} total: {total * 1000:.0f}ms, {completed} payments completed")
@@ -0,0 +1,71 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay
+from django.utils.timezone import localdate, now
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_bikes, seed_bookings, seed_users, summarize, timed
+from bookings.models import Booking
+from payment.earnings import earnings_dashboard, fold_earnings
+from payment.models import EarningsEntry, Payment
+
+
+def dashboard_from_payments(owner_id, start, end):
+    """The dashboard computed directly from payments, for comparison."""
+    payments = Payment.objects.filter(status='completed', booking__bike__owner_id=owner_id)
+    series = list(payments.filter(updated_at__date__range=(start, end)).annotate(day=TruncDay('updated_at'))
+                  .values('day').annotate(bookings=Count('id'), earnings=Sum('amount')).order_by('day'))
+    lifetime = payments.aggregate(bookings=Count('id'), earnings=Sum('amount'))
+    return series, lifetime
+
+
+class Command(BaseCommand):
+    help = "Measure the owner earnings dashboard from rollups against aggregating completed payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=20)
+        parser.add_argument('--payments', type=int, default=50_000)
+        parser.add_argument('--days', type=int, default=365, help="Spread payments over this many past days.")
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        owners = seed_users(options['owners'], prefix='bench-earnings-owner')
+        bikes = []
+        for owner in owners:
+            bikes += seed_bikes(owner, 10, prefix=f"bench-earnings-{owner.pk}", rng=rng)
+        seed_bookings(owners, bikes, options['payments'], rng=rng)
+        current_time = now()
+        bookings = list(Booking.objects.filter(bike__in=bikes).values_list('id', 'bike_id', 'bike__owner_id', 'total_price'))
+        payments = Payment.objects.bulk_create([
+            Payment(booking_id=booking_id, amount=price, payment_method='paypal', status='completed')
+            for booking_id, _, _, price in bookings
+        ], batch_size=5000)
+        EarningsEntry.objects.bulk_create([
+            EarningsEntry(payment_id=payment.pk, owner_id=owner_id, booking_id=booking_id, bike_id=bike_id,
+                          amount=price, earned_at=current_time - timedelta(days=rng.uniform(0, options['days'])))
+            for payment, (booking_id, bike_id, owner_id, price) in zip(payments, bookings)
+        ], batch_size=5000)
+        self.stdout.write(f"seeded {len(payments)} completed payments in {time.perf_counter() - started:.1f}s")
+
+        folded, fold_time = timed(fold_earnings)
+        self.stdout.write(f"fold: {folded} entries in {fold_time * 1000:.0f}ms ({folded / fold_time:.0f} entries/s)")
+
+        end = localdate()
+        start = end - timedelta(days=29)
+        rollups, direct = [], []
+        for _ in range(options['queries']):
+            owner_id = rng.choice(owners).pk
+            rollups.append(timed(earnings_dashboard, owner_id, 'day', start, end)[1])
+            direct.append(timed(dashboard_from_payments, owner_id, start, end)[1])
+        self.stdout.write(format_summary('dashboard from rollups', summarize(rollups)))
+        self.stdout.write(format_summary('dashboard from payments', summarize(direct)))
@@ -0,0 +1,60 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from bikes.models import Bike
+from bookings.models import Booking
+from bookings.pricing import RENTAL_DURATIONS, quote_matrix
+
+
+class Command(BaseCommand):
+    help = "Compare the batched quote engine with per-instance Booking.calculate_total_price."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bikes', type=int, default=500)
+        parser.add_argument('--windows', type=int, default=10, help="Candidate windows, each quoted for every duration.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Pricing needs no database access, so unsaved bikes are enough.
+        bikes = [
+            Bike(pk=i + 1, name=f"bike {i}", price_per_day=Decimal(rng.randint(5000, 500000)) / 100)
+            for i in range(options['bikes'])
+        ]
+        origin = now()
+        windows = []
+        for _ in range(options['windows']):
+            start = origin + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            end = start + timedelta(minutes=rng.randint(30, 60 * 24 * 20))
+            windows.extend((start, end, duration) for duration in RENTAL_DURATIONS)
+
+        per_instance, batched = [], []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            expected = [
+                [Booking(bike=bike, start_date=start, end_date=end, rental_duration=duration).calculate_total_price()
+                 for start, end, duration in windows]
+                for bike in bikes
+            ]
+            per_instance.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            actual = quote_matrix([bike.price_per_day for bike in bikes], windows)
+            batched.append(time.perf_counter() - started)
+
+        mismatches = sum(
+            a != b for expected_row, actual_row in zip(expected, actual) for a, b in zip(expected_row, actual_row)
+        )
+        cells = len(bikes) * len(windows)
+        best_instance, best_batched = min(per_instance), min(batched)
+        self.stdout.write(f"{len(bikes)} bikes x {len(windows)} windows = {cells} quotes (best of {options['repeat']})")
+        self.stdout.write(f"per-instance calculate_total_price: {best_instance * 1000:8.1f}ms")
+        self.stdout.write(f"batched quote_matrix:               {best_batched * 1000:8.1f}ms "
+                          f"({best_instance / best_batched:.1f}x faster)")
+        self.stdout.write(f"mismatches: {mismatches}")
@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import generics, permissions
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_users, summarize, timed
+from testimonials.feed import render_feed
+from testimonials.models import Testimonial
+from testimonials.serializers import TestimonialSerializer
+from testimonials.views import TestimonialFeedView, TestimonialListView
+
+
+class LegacyListView(generics.ListAPIView):
+    # TestimonialListView before the feed: every testimonial, unordered.
+    queryset = Testimonial.objects.all()
+    serializer_class = TestimonialSerializer
+    permission_classes = [permissions.AllowAny]
+
+
+class Command(BaseCommand):
+    help = "Compare the live testimonial list with the precomputed homepage feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--testimonials', type=int, default=50_000)
+        parser.add_argument('--approved', type=float, default=0.3, help="Share of testimonials that are approved.")
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        users = seed_users(options['users'], prefix='bench-feed-user')
+        Testimonial.objects.bulk_create([
+            Testimonial(user=rng.choice(users), content=f"Benchmark testimonial number {index}.",
+                        rating=rng.randint(1, 5), is_approved=rng.random() < options['approved'],
+                        is_featured=rng.random() < 0.01)
+            for index in range(options['testimonials'])
+        ], batch_size=5000)
+        self.stdout.write(f"seeded {options['testimonials']} testimonials in {time.perf_counter() - started:.1f}s")
+
+        factory = APIRequestFactory()
+        # Without throttles: the anonymous rate would refuse most of the measured requests.
+        views = [
+            ('list, before', LegacyListView.as_view(throttle_classes=[])),
+            ('list, approved only', TestimonialListView.as_view(throttle_classes=[])),
+        ]
+        for label, view in views:
+            self.report(label, [timed(self.render, view, factory.get('/api/testimonials/'))[1]
+                                for _ in range(options['requests'])])
+
+        _, rebuild = timed(render_feed)
+        self.stdout.write(f"feed render: {rebuild * 1000:.1f}ms (once per testimonial change)")
+        cache.clear()
+        feed = TestimonialFeedView.as_view(throttle_classes=[])
+        self.report('feed, cached bytes', [timed(self.render, feed, factory.get('/api/testimonials/feed/'))[1]
+                                           for _ in range(options['requests'])])
+
+    def render(self, view, request):
+        response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(f"{request.path} answered {response.status_code}")
+        return response
+
+    def report(self, label, samples):
+        self.stdout.write(format_summary(label, summarize(samples)) + f" ({len(samples) / sum(samples):.0f} req/s)")
@@ -0,0 +1,96 @@
+import multiprocessing
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from rest_framework.throttling import SimpleRateThrottle
+
+from benchmarks.utils import format_summary, rollback_afterwards, summarize, timed
+from users.models import ThrottleBucket
+from users.throttling import consume
+
+PREFIX = 'bench-throttle-'
+
+
+class CacheThrottle(SimpleRateThrottle):
+    """DRF's cache-backed sliding window, driven directly by key."""
+    rate = '1000000/day'
+
+    def __init__(self, key, rate):
+        self.rate = rate
+        self.num_requests, self.duration = self.parse_rate(rate)
+        self.key = key
+
+    def check(self):
+        self.history = self.cache.get(self.key, [])
+        self.now = self.timer()
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+
+def cache_worker(key, capacity, checks, results):
+    throttle = CacheThrottle(key, f"{capacity}/day")
+    results.put(sum(throttle.check() for _ in range(checks)))
+
+
+def table_worker(key, capacity, checks, results):
+    connections.close_all()
+    results.put(sum(consume(key, capacity, 24 * 3600)[0] for _ in range(checks)))
+
+
+class Command(BaseCommand):
+    help = "Measure throttle checks per second and accuracy across processes: DRF cache throttle vs shared buckets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--rate', default='100/minute', help="Rate of the single-process run.")
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--capacity', type=int, default=100, help="Requests allowed per key in the accuracy run.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            self.run(options)
+        finally:
+            ThrottleBucket.objects.filter(key__startswith=PREFIX).delete()
+            cache.delete_many([f"{PREFIX}{index}" for index in range(options['keys'])] + [f"{PREFIX}shared"])
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        keys = [f"{PREFIX}{rng.randrange(options['keys'])}" for _ in range(options['checks'])]
+        capacity, period = SimpleRateThrottle.parse_rate(None, options['rate'])
+
+        throttles = {}
+        samples = [timed(throttles.setdefault(key, CacheThrottle(key, options['rate'])).check)[1] for key in keys]
+        self.report('drf cache throttle', samples)
+        samples = [timed(consume, key, capacity, period)[1] for key in keys]
+        self.report('shared bucket (autocommit)', samples)
+        # The same checks without a commit each: the statement cost alone, apart from the durable write.
+        ThrottleBucket.objects.filter(key__startswith=PREFIX).delete()
+        with rollback_afterwards():
+            samples = [timed(consume, key, capacity, period)[1] for key in keys]
+        self.report('shared bucket (no commit)', samples)
+
+        # Every process hammers one key; the limit should hold in total, not per process.
+        per_process = options['capacity']
+        context = multiprocessing.get_context('fork')
+        for label, worker in (('drf cache throttle', cache_worker), ('shared bucket', table_worker)):
+            connections.close_all()
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(f"{PREFIX}shared", options['capacity'], per_process, results))
+                         for _ in range(options['processes'])]
+            for process in processes:
+                process.start()
+            allowed = sum(results.get() for _ in processes)
+            for process in processes:
+                process.join()
+            self.stdout.write(f"{label}: {options['processes']} processes x {per_process} requests against a limit of "
+                              f"{options['capacity']}: {allowed} allowed")
+
+    def report(self, label, samples):
+        self.stdout.write(format_summary(label, summarize(samples)) + f" ({len(samples) / sum(samples):.0f} checks/s)")
@@ -0,0 +1,70 @@
+import base64
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import format_summary, rollback_afterwards, seed_users, summarize, timed
+from users.authentication import CachedTokenAuthentication, local_token_cache, token_cache_key
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = "Measure per-request authentication overhead of each authentication backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--basic-requests', type=int, default=20, help="Basic auth hashes the password; keep this small.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        users = seed_users(options['users'], prefix='bench-auth-user')
+        for user in users:
+            user.set_password(PASSWORD)
+            user.save(update_fields=['password'])
+        tokens = [Token.objects.create(user=user).key for user in users]
+        factory = APIRequestFactory()
+
+        def token_request(key):
+            return Request(factory.get('/api/bookings/', HTTP_AUTHORIZATION=f"Token {key}"))
+
+        def basic_request(user):
+            credentials = base64.b64encode(f"{user.username}:{PASSWORD}".encode()).decode()
+            return Request(factory.get('/api/bookings/', HTTP_AUTHORIZATION=f"Basic {credentials}"))
+
+        keys = [rng.choice(tokens) for _ in range(options['requests'])]
+        basic = BasicAuthentication()
+        samples = [timed(basic.authenticate, basic_request(rng.choice(users)))[1]
+                   for _ in range(options['basic_requests'])]
+        self.stdout.write(format_summary('basic (PBKDF2 per request)', summarize(samples)))
+
+        token = TokenAuthentication()
+        samples = [timed(token.authenticate, token_request(key))[1] for key in keys]
+        self.stdout.write(format_summary('token (database)', summarize(samples)))
+
+        cached = CachedTokenAuthentication()
+        cache.delete_many([token_cache_key(key) for key in tokens])
+        local_token_cache.clear()
+        # First sight of every token: database load plus cache fill.
+        samples = [timed(cached.authenticate, token_request(key))[1] for key in tokens]
+        self.stdout.write(format_summary('cached token, cold', summarize(samples)))
+
+        samples = []
+        for key in keys:
+            local_token_cache.clear()
+            samples.append(timed(cached.authenticate, token_request(key))[1])
+        self.stdout.write(format_summary('cached token, shared cache hit', summarize(samples)))
+
+        samples = [timed(cached.authenticate, token_request(key))[1] for key in keys]
+        self.stdout.write(format_summary('cached token, local hit', summarize(samples)))
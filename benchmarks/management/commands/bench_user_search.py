@@ -0,0 +1,115 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import rollback_afterwards
+from users.filters import UserFilter, UserSearchFilter
+from users.search import index_users
+
+User = get_user_model()
+
+SYLLABLES = ['ra', 'sha', 'ma', 'ni', 'ka', 'su', 'bi', 'ta', 'de', 'pra', 'ga', 'ya', 'an', 'ju', 'ro', 'hi',
+             'la', 'mi', 'na', 'pa', 'se', 'to', 'vi', 'ku', 'di', 'bha', 'kri', 'sa', 'ri', 'tha']
+
+
+class LegacyView:
+    # The search configuration UserListView used before the ranked backend.
+    search_fields = ['username', 'email', 'first_name', 'last_name']
+
+
+def name(rng, syllables):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(syllables)).title()
+
+
+def typo(word, rng):
+    """`word` with two neighbouring letters swapped."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+class Command(BaseCommand):
+    help = "Compare icontains user search with the indexed, ranked user search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--queries', type=int, default=5, help="Queries of each kind, drawn from the seeded users.")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rollback_afterwards():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        samples = self.seed(options['users'], options['batch_size'], options['queries'], rng)
+        self.stdout.write(f"seeded {options['users']} users in {time.perf_counter() - started:.1f}s")
+
+        queries = (
+            [('last name', user.last_name) for user in samples['last name']]
+            + [('full name', f"{user.first_name} {user.last_name}") for user in samples['full name']]
+            + [('misspelled', typo(user.last_name.lower(), rng)) for user in samples['misspelled']]
+            + [('username', user.username) for user in samples['username']]
+            + [('email', user.email) for user in samples['email']]
+            + [('phone prefix', user.phone_number[4:9]) for user in samples['phone prefix']]
+        )
+        factory = APIRequestFactory()
+        queryset = User.objects.all()
+        self.stdout.write(f"{'kind':<13} {'query':<32} {'icontains':>12} {'matches':>8} {'indexed':>12} {'matches':>8}")
+        for kind, term in queries:
+            request = Request(factory.get('/api/users/', {'search': term}))
+            ranked = UserSearchFilter().filter_queryset(request, queryset, None)
+            if kind == 'phone prefix':
+                legacy = queryset.filter(phone_number__icontains=term)
+                ranked = UserFilter({'phone_number': term}, queryset=queryset).qs
+            else:
+                legacy = SearchFilter().filter_queryset(request, queryset, LegacyView())
+            legacy_time, legacy_count = self.measure(legacy, options['repeat'])
+            ranked_time, ranked_count = self.measure(ranked, options['repeat'])
+            self.stdout.write(
+                f"{kind:<13} {term[:32]:<32} {legacy_time * 1000:>10.1f}ms {legacy_count:>8} "
+                f"{ranked_time * 1000:>10.1f}ms {ranked_count:>8}"
+            )
+
+    def seed(self, count, batch_size, queries, rng):
+        """Create `count` users with generated names and phone numbers; return users to build queries from."""
+        phones = rng.sample(range(10 ** 8), count)
+        picked = set(rng.sample(range(count), 6 * queries))
+        usernames = []
+        for offset in range(0, count, batch_size):
+            users = []
+            for i in range(offset, min(count, offset + batch_size)):
+                first, last = name(rng, 2), name(rng, 3)
+                username = f"{first.lower()}.{last.lower()}{i}"
+                user = User(username=username, email=f"{username}@example.com", first_name=first, last_name=last,
+                            phone_number=f"+9779{phones[i]:08d}", password='!')
+                user.search_document = user.build_search_document()
+                users.append(user)
+                if i in picked:
+                    usernames.append(username)
+            # bulk_create skips save() and the save signal, which normally maintain the search index.
+            index_users(User.objects.bulk_create(users))
+        samples = list(User.objects.filter(username__in=usernames))
+        rng.shuffle(samples)
+        kinds = ['last name', 'full name', 'misspelled', 'username', 'email', 'phone prefix']
+        return {kind: samples[index::len(kinds)] for index, kind in enumerate(kinds)}
+
+    def measure(self, queryset, repeat):
+        """Best time to fetch the count and first page, as the paginated list view does."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:10])
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, count
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.loadtest import SCENARIOS, compare, run_loadtest
+from benchmarks.utils import format_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the main API endpoints in-process at several concurrency levels against a seeded scratch "
+        "database, write the results as JSON and optionally fail on regressions against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--bikes', type=int, default=1000)
+        parser.add_argument('--bookings', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario and level.")
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests sent before each level.")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--output', default='loadtest-results.json', help="Where to write the results.")
+        parser.add_argument('--baseline', help="Results of an earlier run to compare with.")
+        parser.add_argument('--max-regression', type=float, default=10.0,
+                            help="Percentage a latency may grow or throughput drop before the run fails.")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the scratch database between runs.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            # Read it first: a missing baseline should not cost a whole run.
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        if min(options['concurrency']) < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1.")
+
+        results = run_loadtest(
+            [name for name in SCENARIOS if name in options['scenarios']],
+            options['concurrency'],
+            options['requests'],
+            warmup=options['warmup'],
+            users=options['users'],
+            bikes=options['bikes'],
+            bookings=options['bookings'],
+            seed=options['seed'],
+            keepdb=options['keepdb'],
+            progress=self.report,
+        )
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['max_regression'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(f"no regressions against {options['baseline']}")
+
+    def report(self, name, level):
+        self.stdout.write(
+            format_summary(f"{name} @ {level['concurrency']}", level)
+            + f" {level['throughput_rps']:>8.1f} req/s queries={level['queries_per_request']:.1f}"
+            f" errors={level['errors']}"
+        )
@@ -0,0 +1,85 @@
+"""
+Query plan checks for the hot queries.
+
+``QueryPlanTestCase`` seeds a realistic dataset once per test class and
+asserts that the database can answer a queryset without a full sequential
+scan of any table, using ``EXPLAIN`` (PostgreSQL) or ``EXPLAIN QUERY PLAN``
+(SQLite). On PostgreSQL sequential scans are disabled for the duration of
+each test, so a seq scan in the plan means no usable index exists rather
+than a planner cost decision on a small table.
+
+Seeding takes a while, so the plan assertions of every app live in one
+class (``benchmarks.tests.QueryPlanTests``); the apps test behaviour
+with small fixtures of their own.
+"""
+import json
+import random
+import re
+import unittest
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from .utils import seed_bikes, seed_bookings, seed_users
+
+SQLITE_SCAN_RE = re.compile(r'\bSCAN (\w+)(.*)$')
+
+
+def _postgres_seq_scans(node):
+    if node.get('Node Type') == 'Seq Scan':
+        yield node['Relation Name']
+    for child in node.get('Plans', ()):
+        yield from _postgres_seq_scans(child)
+
+
+def sequential_scans(queryset):
+    """Tables the database would read with a full sequential scan to run `queryset`."""
+    if connection.vendor == 'postgresql':
+        plan = queryset.explain(format='json')
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return sorted(set(_postgres_seq_scans(plan[0]['Plan'])))
+    if connection.vendor == 'sqlite':
+        tables = set()
+        for line in queryset.explain().splitlines():
+            match = SQLITE_SCAN_RE.search(line)
+            # "SCAN t USING INDEX i" walks an index in order; only a bare SCAN reads the table.
+            if match and 'USING' not in match.group(2) and match.group(1) != 'CONSTANT':
+                tables.add(match.group(1))
+        return sorted(tables)
+    raise unittest.SkipTest(f"No query plan check for {connection.vendor}")
+
+
+class QueryPlanTestCase(TestCase):
+    users = 50
+    bikes = 2000
+    bookings = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        cls.seeded_users = seed_users(cls.users, prefix='plan-user')
+        cls.seeded_bikes = seed_bikes(cls.seeded_users[0], cls.bikes, prefix='plan-bike', rng=rng)
+        cls.origin, _ = seed_bookings(cls.seeded_users, cls.seeded_bikes, cls.bookings, rng=rng)
+        cls.seed_extra()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    @classmethod
+    def seed_extra(cls):
+        """Hook for subclasses that need more rows before statistics are gathered."""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def window(self, days=3):
+        start = self.origin + timedelta(days=days)
+        return start, start + timedelta(days=2)
+
+    def assertNoSequentialScan(self, queryset):
+        scanned = sequential_scans(queryset)
+        self.assertEqual(scanned, [], f"Sequential scan of {', '.join(scanned)} in plan:\n{queryset.explain()}")
@@ -0,0 +1,159 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from django.utils.timezone import now
+
+from admin_panel.models import Issue
+from admin_panel.moderation import TARGETS, select
+from bikes.filters import BikeFilter
+from bikes.models import Bike
+from bikes.views import BikeListView
+from bookings.availability import overlapping_bookings
+from bookings.models import Booking
+from bookings.views import BookingListView
+from payment.models import EarningsRollup, IpnNotification, Payment
+from testimonials.models import Testimonial
+from testimonials.views import TestimonialListView
+from users.models import User
+from users.search import filter_phone_prefix, phone_prefix, query_trigrams, search_users, trigram_candidates, uses_trigram_table
+from .loadtest import compare
+from .plans import QueryPlanTestCase
+
+
+def results(**level):
+    defaults = {'concurrency': 4, 'p50_us': 1000.0, 'p95_us': 2000.0, 'p99_us': 3000.0,
+                'throughput_rps': 100.0, 'queries_per_request': 3.0, 'errors': 0}
+    return {'scenarios': {'bike_list': [{**defaults, **level}]}}
+
+
+class LoadTestCompareTests(SimpleTestCase):
+    def test_within_allowed_regression(self):
+        self.assertEqual(compare(results(p95_us=2150.0, throughput_rps=95.0, queries_per_request=3.2), results()), [])
+
+    def test_regressions_are_reported(self):
+        regressions = compare(results(p95_us=2500.0, throughput_rps=80.0, queries_per_request=4.0, errors=2),
+                              results(), max_regression=10)
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(all(regression.startswith('bike_list @ 4') for regression in regressions))
+
+    def test_levels_missing_from_the_baseline_are_skipped(self):
+        self.assertEqual(compare(results(concurrency=16, p95_us=10_000.0), results()), [])
+
+
+class QueryPlanTests(QueryPlanTestCase):
+    """
+    The hot queries of every app, checked against one seeded dataset.
+
+    Behaviour is tested in each app with small fixtures; only plan
+    assertions belong here, so the large dataset is seeded once per run.
+    """
+
+    @classmethod
+    def seed_extra(cls):
+        users, bikes = cls.seeded_users, cls.seeded_bikes
+        cls.owner = users[0]
+        for index, user in enumerate(users):
+            user.phone_number = f"+9779841{index:06d}"
+        User.objects.bulk_update(users, ['phone_number'])
+        Bike.objects.filter(pk__in=[bike.pk for bike in bikes[:500]]).update(is_approved=False)
+        Issue.objects.bulk_create([
+            Issue(user=user, bike=bikes[index], description=f"Issue number {index} reported.")
+            for index, user in enumerate(users)
+        ])
+        Testimonial.objects.bulk_create([
+            Testimonial(user=user, content=f"Testimonial number {index} of {user.pk}.", rating=1 + index % 5,
+                        is_approved=index % 4 == 0, is_featured=index % 40 == 0)
+            for user in users for index in range(100)
+        ])
+
+        statuses = ['completed'] * 8 + ['pending', 'failed']
+        payments = [
+            Payment(booking_id=booking_id, amount=price, payment_method='paypal', status=statuses[booking_id % 10])
+            for booking_id, price in Booking.objects.values_list('id', 'total_price')
+        ]
+        Payment.objects.bulk_create(payments, batch_size=5000)
+        cls.booking_id = payments[0].booking_id
+        processed_at = now()
+        IpnNotification.objects.bulk_create([
+            IpnNotification(txn_id=f"TXN{payment.booking_id}", payment_status='Completed', invoice=str(payment.booking_id),
+                            processed_at=None if index % 100 == 0 else processed_at, outcome='completed')
+            for index, payment in enumerate(payments)
+        ], batch_size=5000)
+        EarningsRollup.objects.bulk_create([
+            EarningsRollup(owner=user, period='day', period_start=date(2025, 1, 1) + timedelta(days=day),
+                           bookings=1, earnings=100)
+            for user in users for day in range(200)
+        ], batch_size=5000)
+
+    # bikes
+
+    def filtered_bikes(self, params):
+        return BikeFilter(params, queryset=BikeListView.queryset).qs
+
+    def test_bike_list(self):
+        self.assertNoSequentialScan(BikeListView.queryset.all())
+
+    def test_bike_list_by_price(self):
+        self.assertNoSequentialScan(self.filtered_bikes({'min_price': '1000', 'max_price': '2000'}))
+
+    def test_bike_list_available_in_window(self):
+        start, end = self.window()
+        self.assertNoSequentialScan(self.filtered_bikes({
+            'min_price': '1000', 'available_from': start.isoformat(), 'available_to': end.isoformat(),
+        }))
+
+    # bookings
+
+    def test_availability_overlap(self):
+        start, end = self.window()
+        self.assertNoSequentialScan(overlapping_bookings(self.seeded_bikes[0].id, start, end))
+
+    def test_booking_list_of_user(self):
+        view = BookingListView(request=SimpleNamespace(user=self.seeded_users[1]))
+        self.assertNoSequentialScan(view.get_queryset()[:10])
+
+    # payments
+
+    def test_payment_by_booking(self):
+        self.assertNoSequentialScan(Payment.objects.filter(booking_id=self.booking_id))
+
+    def test_payments_by_status(self):
+        self.assertNoSequentialScan(Payment.objects.filter(status='pending'))
+
+    def test_ipn_queue_scan(self):
+        pending = IpnNotification.objects.filter(processed_at__isnull=True).order_by('received_at', 'id')
+        self.assertNoSequentialScan(pending.values_list('id', 'txn_id', 'payment_status', 'invoice')[:500])
+
+    def test_earnings_dashboard_series(self):
+        rollups = EarningsRollup.objects.filter(owner_id=self.owner.pk, period='day')
+        self.assertNoSequentialScan(rollups.filter(period_start__range=(date(2025, 2, 1), date(2025, 3, 2))).order_by('period_start'))
+
+    # users
+
+    def test_user_search(self):
+        self.assertNoSequentialScan(search_users(User.objects.all(), 'plan-user-7'))
+
+    def test_user_search_trigram_candidates(self):
+        if not uses_trigram_table():
+            self.skipTest("The trigram table is only used without PostgreSQL.")
+        grams, inner = query_trigrams(['plan', 'user'])
+        self.assertNoSequentialScan(trigram_candidates('default', grams, inner, len(grams)))
+
+    def test_phone_prefix_lookup(self):
+        self.assertNoSequentialScan(filter_phone_prefix(User.objects.all(), phone_prefix('98410')))
+
+    # testimonials
+
+    def test_testimonial_list(self):
+        self.assertNoSequentialScan(TestimonialListView.queryset.all()[:10])
+
+    def test_featured_testimonials(self):
+        featured = Testimonial.approved.filter(is_featured=True).order_by('-created_at', '-id')
+        self.assertNoSequentialScan(featured[:6])
+
+    # moderation
+
+    def test_moderation_selection_by_owner(self):
+        pending = select(TARGETS['bikes'], filters={'owner': self.owner.pk, 'is_approved': False})
+        self.assertNoSequentialScan(pending.exclude(is_approved=True))
@@ -0,0 +1,158 @@
+"""
+Shared helpers for the benchmark management commands.
+
+Every benchmark seeds its own data inside a transaction that is rolled back
+when it finishes, so it can be pointed at any database without leaving rows
+behind.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.timezone import now
+
+from bikes.models import Bike
+from bookings.models import Booking
+from users.search import index_users
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised internally to discard benchmark data."""
+
+
+@contextmanager
+def rollback_afterwards(using='default'):
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def timed(func, *args, **kwargs):
+    """Call func and return (result, elapsed seconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """Summary statistics (in microseconds) for a list of durations in seconds."""
+    if not samples:
+        return {'count': 0, 'mean_us': 0.0, 'p50_us': 0.0, 'p95_us': 0.0, 'p99_us': 0.0}
+    return {
+        'count': len(samples),
+        'mean_us': statistics.fmean(samples) * 1e6,
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p95_us': percentile(samples, 95) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+    }
+
+
+def format_summary(label, summary):
+    return (
+        f"{label:<28} n={summary['count']:<7} mean={summary['mean_us']:>10.1f}us "
+        f"p50={summary['p50_us']:>10.1f}us p95={summary['p95_us']:>10.1f}us "
+        f"p99={summary['p99_us']:>10.1f}us"
+    )
+
+
+def seed_users(count, prefix='bench-user'):
+    """Create `count` users without hashing passwords."""
+    users = [
+        User(username=f"{prefix}-{i}", email=f"{prefix}-{i}@example.com", password='!')
+        for i in range(count)
+    ]
+    # bulk_create skips save() and the save signal, which normally maintain the search index.
+    for user in users:
+        user.search_document = user.build_search_document()
+    User.objects.bulk_create(users, batch_size=1000)
+    users = list(User.objects.filter(username__startswith=f"{prefix}-").order_by('id'))
+    index_users(users)
+    return users
+
+
+def seed_bikes(owner, count, prefix='bench-bike', rng=None, bounds=None):
+    """
+    Create `count` approved, available bikes owned by `owner`. With `bounds`
+    (min_lat, max_lat, min_lon, max_lon) every bike gets a random location inside it.
+    """
+    rng = rng or random.Random(0)
+    bikes = [
+        Bike(
+            name=f"{prefix} {i}",
+            type=rng.choice(Bike.BIKE_TYPES)[0],
+            brand=rng.choice(['Honda', 'Yamaha', 'Bajaj', 'TVS', 'Royal Enfield']),
+            model_year=rng.randint(2010, 2024),
+            description=f"Benchmark bike number {i}.",
+            price_per_day=Decimal(rng.randint(500, 5000)),
+            is_approved=True,
+            availability_status=True,
+            slug=f"{prefix}-{i}",
+            owner=owner,
+        )
+        for i in range(count)
+    ]
+    # bulk_create skips save(), which normally maintains the search document.
+    for bike in bikes:
+        bike.search_document = bike.build_search_document()
+        if bounds is not None:
+            bike.latitude = Decimal(f"{rng.uniform(bounds[0], bounds[1]):.6f}")
+            bike.longitude = Decimal(f"{rng.uniform(bounds[2], bounds[3]):.6f}")
+    Bike.objects.bulk_create(bikes, batch_size=1000)
+    return list(Bike.objects.filter(slug__startswith=f"{prefix}-").order_by('id'))
+
+
+def seed_bookings(users, bikes, count, rng=None, batch_size=5000, origin=None):
+    """
+    Create `count` bookings spread evenly over `bikes`.
+
+    Each bike gets back-to-back windows separated by a small gap, so active
+    bookings never overlap. Roughly one in five bookings is cancelled or
+    completed. Returns the origin datetime of the generated timeline.
+    """
+    rng = rng or random.Random(0)
+    origin = origin or now() + timedelta(days=1)
+    cursors = {bike.id: origin for bike in bikes}
+    statuses = ['pending', 'confirmed', 'confirmed', 'confirmed', 'cancelled', 'completed',
+                'pending', 'confirmed', 'confirmed', 'confirmed']
+    batch = []
+    for i in range(count):
+        bike = bikes[i % len(bikes)]
+        start = cursors[bike.id] + timedelta(hours=rng.randint(1, 12))
+        end = start + timedelta(hours=rng.randint(2, 72))
+        cursors[bike.id] = end
+        batch.append(Booking(
+            user=users[i % len(users)],
+            bike=bike,
+            start_date=start,
+            end_date=end,
+            pickup_location='Kathmandu',
+            rental_duration='daily',
+            total_price=bike.price_per_day,
+            status=statuses[i % len(statuses)],
+        ))
+        if len(batch) >= batch_size:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Booking.objects.bulk_create(batch)
+    return origin, cursors
@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class BikeRentalServiceConfig(AppConfig):
+    """Project-level app: owns setup that belongs to settings rather than to any one app."""
+    name = 'bike_rental_service'
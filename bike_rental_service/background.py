@@ -0,0 +1,102 @@
+"""
+Local background worker.
+
+A small pool of daemon threads that runs work handed off from the request
+path (payment preparation, notifications, image processing, ...). Tasks
+are queued in memory, so they are lost if the process exits. Use it only
+for work that can be redone or that a periodic job will catch up on.
+
+Set ``BACKGROUND_TASKS_EAGER = True`` to run tasks inline, e.g. in tests
+or management commands.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    def __init__(self, name='background'):
+        self.name = name
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    @property
+    def eager(self):
+        return getattr(settings, 'BACKGROUND_TASKS_EAGER', False)
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(getattr(settings, 'BACKGROUND_WORKER_THREADS', 2)):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            close_old_connections()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception("Background task %s failed", getattr(func, '__name__', func))
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) to run on a worker thread."""
+        if self.eager:
+            func(*args, **kwargs)
+            return
+        self._start()
+        self._queue.put((func, args, kwargs))
+
+    def depth(self):
+        """Number of tasks waiting to run."""
+        return self._queue.qsize()
+
+    def join(self):
+        """Block until every queued task has run."""
+        self._queue.join()
+
+
+worker = BackgroundWorker()
+
+_coalesce_lock = threading.Lock()
+_coalesced = set()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run func on the background worker once the current transaction commits."""
+    transaction.on_commit(lambda: worker.submit(func, *args, **kwargs))
+
+
+def _submit_coalesced(func):
+    with _coalesce_lock:
+        if func in _coalesced:
+            return
+        _coalesced.add(func)
+    worker.submit(_run_coalesced, func)
+
+
+def _run_coalesced(func):
+    with _coalesce_lock:
+        _coalesced.discard(func)
+    func()
+
+
+def run_coalesced_in_background(func):
+    """
+    Like ``run_in_background`` for argument-less catch-up jobs (queue
+    drains, incremental folds): the run is skipped if one is already
+    queued and has not started yet, since that run will see this work too.
+    """
+    transaction.on_commit(lambda: _submit_coalesced(func))
@@ -0,0 +1,125 @@
+"""
+Client-selected sparse fieldsets.
+
+GET requests may pass ``?fields=a,b`` to keep only those fields and/or
+``?omit=c,d`` to drop some. ``SparseFieldsetSerializerMixin`` trims the
+serializer accordingly (naming a field it does not have is a 400), and ``SparseFieldsetMixin`` pushes the selection
+down into the list query so unrequested columns are never fetched:
+
+* ``values()`` when every selected field is a plain model column (or a
+  field that can render from raw column values), skipping model
+  instantiation entirely;
+* ``only()`` otherwise, as long as each field's columns are known;
+* the unchanged queryset when a field reads something that cannot be
+  mapped to columns (e.g. a related object's attribute).
+
+Serializers describe computed fields with ``Meta.field_columns``
+(``{"field": ["column", ...]}``); serializer fields can expose the same
+with a ``model_fields`` attribute.
+"""
+from django.db import models
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request):
+    """Return (fields to keep or None for all, fields to omit) from the query string."""
+    if request is None or request.method != 'GET':
+        return None, set()
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    keep = _split(params[FIELDS_PARAM]) if params.get(FIELDS_PARAM) else None
+    return keep, _split(params.get(OMIT_PARAM, ''))
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop the fields a GET request did not ask for; reject names the serializer does not have."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        keep, omit = requested_fields(self.context.get('request'))
+        errors = {
+            param: [f"Unknown field(s): {', '.join(sorted(unknown))}."]
+            for param, unknown in ((FIELDS_PARAM, (keep or set()) - fields.keys()), (OMIT_PARAM, omit - fields.keys()))
+            if unknown
+        }
+        if errors:
+            raise ValidationError(errors)
+        if keep is not None:
+            fields = {name: field for name, field in fields.items() if name in keep}
+        for name in omit:
+            fields.pop(name, None)
+        return fields
+
+    def get_source_columns(self):
+        """
+        Model columns needed to render the selected fields, or None if some
+        field reads data that cannot be mapped to columns.
+        """
+        opts = self.Meta.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        extra = getattr(self.Meta, 'field_columns', {})
+        columns = [opts.pk.name]
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in extra:
+                sources = extra[name]
+            elif hasattr(field, 'model_fields'):
+                sources = field.model_fields
+            elif field.source in concrete:
+                sources = [field.source]
+            else:
+                return None
+            columns.extend(source for source in sources if source not in columns)
+        return columns
+
+    def can_render_from_values(self):
+        """Whether the selected fields render from ``values()`` dicts instead of model instances."""
+        opts = self.Meta.model._meta
+        concrete = {field.name: field for field in opts.concrete_fields}
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if getattr(field, 'renders_from_values', False):
+                continue
+            model_field = concrete.get(field.source)
+            if model_field is None or model_field.is_relation or isinstance(model_field, models.FileField):
+                return False
+        return True
+
+
+def project_queryset(queryset, serializer, extra_columns=()):
+    """
+    Restrict `queryset` to the columns `serializer` will render, plus
+    `extra_columns` (e.g. the fields a cursor paginator reads from each row).
+    """
+    if not hasattr(serializer, 'get_source_columns'):
+        return queryset
+    columns = serializer.get_source_columns()
+    if columns is None:
+        return queryset
+    columns.extend(column for column in extra_columns if column not in columns)
+    if serializer.can_render_from_values():
+        return queryset.values(*columns)
+    # Every selected field maps to this model's own columns (relations render as
+    # their primary key), so joins added for other serializers are not needed.
+    return queryset.select_related(None).only(*columns)
+
+
+class SparseFieldsetMixin:
+    """List view mixin that fetches only the columns the selected fields need."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return project_queryset(queryset, self.get_serializer(), [field.lstrip('-') for field in ordering])
@@ -0,0 +1,178 @@
+"""
+Resized image variants for uploaded pictures.
+
+Uploads (bike photos, profile pictures) can be several megabytes, which is
+far more than a list page needs. After a picture is saved, the background
+worker renders a few fixed-size variants, re-encodes them and records
+their storage names on the model in ``<field>_variants``:
+
+    {"source": "bikes/activa.jpg", "thumbnail": "variants/bikes/activa-thumbnail-1a2b3c4d.webp", ...}
+
+Variant file names include a digest of the source file's bytes and the
+variant spec, so a variant's URL never changes meaning and can be cached
+for a year. Until the variants exist, or if the source cannot be decoded,
+``ImageVariantsField`` falls back to the original URL. The shared default
+picture of a field is never processed.
+
+In production the web server serves ``MEDIA_ROOT``; it should send
+``Cache-Control: public, max-age=31536000, immutable`` for
+``MEDIA_URL/variants/``. With ``DEBUG`` on, ``serve_variant`` does that.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.views.static import serve
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from .background import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height, crop). Cropped variants fill the box exactly; the
+# others are scaled down to fit inside it.
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160, True),
+    'card': (480, 360, True),
+    'full': (1600, 1600, False),
+}
+
+VARIANTS_DIR = 'variants'
+VARIANT_CACHE_SECONDS = 365 * 24 * 3600
+
+
+def get_variants():
+    return getattr(settings, 'IMAGE_VARIANTS', IMAGE_VARIANTS)
+
+
+def variant_name(source_name, content_digest, variant, spec, image_format):
+    """Storage name of one variant of `source_name`, whose bytes hash to `content_digest`."""
+    stem, _ = os.path.splitext(source_name)
+    digest = hashlib.md5(f"{content_digest}:{spec}:{image_format}".encode()).hexdigest()[:8]
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    return f"{VARIANTS_DIR}/{stem}-{variant}-{digest}.{extension}"
+
+
+def render_variant(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def build_variants(field_file, storage=default_storage):
+    """
+    Render every configured variant of an image field file and save them
+    to `storage`. Returns the variants mapping to store on the model.
+    """
+    image_format = getattr(settings, 'IMAGE_VARIANT_FORMAT', 'WEBP')
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    with field_file.open('rb') as source:
+        content = source.read()
+    content_digest = hashlib.md5(content).hexdigest()
+    image = Image.open(io.BytesIO(content))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if image_format != 'JPEG' and image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    variants = {'source': field_file.name}
+    for variant, (width, height, crop) in get_variants().items():
+        name = variant_name(field_file.name, content_digest, variant, (width, height, crop), image_format)
+        if not storage.exists(name):
+            buffer = io.BytesIO()
+            render_variant(image, width, height, crop).save(buffer, image_format, quality=quality, optimize=True)
+            storage.save(name, ContentFile(buffer.getvalue()))
+        variants[variant] = name
+    return variants
+
+
+def process_image_variants(model_label, pk, field_name):
+    """
+    Background task: build the variants of ``<model>.<field_name>`` and
+    store them in ``<field_name>_variants``.
+    """
+    model = apps.get_model(model_label)
+    variants_field = f"{field_name}_variants"
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file or getattr(instance, variants_field).get('source') == field_file.name:
+        return
+    try:
+        variants = build_variants(field_file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Cannot build variants of %s %s %s", model_label, pk, field_file.name, exc_info=True)
+        # Remember the failure so every later save does not retry it.
+        variants = {'source': field_file.name}
+    setattr(instance, variants_field, variants)
+    # A regular save so post_save listeners (e.g. the catalog cache) see the change.
+    instance.save(update_fields=[variants_field])
+    logger.info("Built %d variants of %s %s", len(variants) - 1, model_label, pk)
+
+
+def default_picture(model, field_name):
+    """Name of the picture every row of `model` gets when none is uploaded, or None."""
+    return model._meta.get_field(field_name).get_default() or None
+
+
+def schedule_image_variants(instance, field_name):
+    """Queue variant generation if the picture changed since it was last processed."""
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, f"{field_name}_variants") or {}
+    if not field_file or field_file.name == default_picture(type(instance), field_name):
+        return
+    if variants.get('source') != field_file.name:
+        run_in_background(process_image_variants, instance._meta.label, instance.pk, field_name)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Absolute URLs of an image's variants, falling back to the original
+    picture for variants that have not been built yet. With `variant`, only
+    that variant's URL is returned.
+
+    Renders from model instances or from ``values()`` rows (see
+    bike_rental_service.fieldsets).
+    """
+    renders_from_values = True
+
+    def __init__(self, image_field, variant=None, **kwargs):
+        self.image_field = image_field
+        self.variant = variant
+        self.model_fields = [image_field, f"{image_field}_variants"]
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            name = instance[self.image_field]
+            variants = instance[f"{self.image_field}_variants"] or {}
+        else:
+            name = getattr(instance, self.image_field).name
+            variants = getattr(instance, f"{self.image_field}_variants") or {}
+        if not name:
+            return None
+        if variants.get('source') != name:
+            variants = {}
+        request = self.context.get('request')
+
+        def absolute(url):
+            return request.build_absolute_uri(url) if request is not None else url
+
+        names = [self.variant] if self.variant else list(get_variants())
+        urls = {variant: absolute(default_storage.url(variants.get(variant, name))) for variant in names}
+        return urls[self.variant] if self.variant else urls
+
+
+def serve_variant(request, path):
+    """Serve a variant from MEDIA_ROOT with long-lived cache headers (development only, like ``static()``)."""
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, VARIANTS_DIR))
+    response['Cache-Control'] = f"public, max-age={VARIANT_CACHE_SECONDS}, immutable"
+    return response
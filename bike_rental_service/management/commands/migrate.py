@@ -0,0 +1,12 @@
+from django.core.management import call_command
+from django.core.management.commands.migrate import Command as MigrateCommand
+
+
+class Command(MigrateCommand):
+    help = MigrateCommand.help + " Also creates the tables of every DatabaseCache in CACHES."
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        # createcachetable walks settings.CACHES, so new aliases are picked up without
+        # a migration; it skips tables that already exist and honours database routers.
+        call_command('createcachetable', database=options['database'], verbosity=options['verbosity'])
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # local apps
     'users',
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
     'testimonials',
     'payment',
     'admin_panel',
+    'benchmarks',
+    'bike_rental_service',
 
     #third party package
     'rest_framework',
@@ -104,6 +107,23 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every worker process: catalog and feed versions, token lookups and
+# rendered pages must agree across processes, so the default cache lives in the
+# database. `manage.py migrate` creates the table of every DatabaseCache alias
+# (bike_rental_service/management/commands/migrate.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,  # Cached catalog pages are keyed by query string
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -151,7 +171,7 @@ AUTH_USER_MODEL = 'users.User'
 # global authentications and permissions
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -162,9 +182,9 @@ REST_FRAMEWORK = {
 
     # Throttling configuration
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.ScopedRateThrottle',
+        'users.throttling.SharedAnonRateThrottle',
+        'users.throttling.SharedUserRateThrottle',
+        'users.throttling.SharedScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '50/day',  # Limits unauthenticated users to 50 requests/day for browsing
@@ -175,6 +195,7 @@ REST_FRAMEWORK = {
         'payments': '5/minute',  # Limits payment attempts to 5/minute to allow transactions but prevent abuse
         'testimonials': '5/hour',  # Limits testimonial submissions to 5/hour to prevent spam
         'admin_issues': '50/day',  # Limits admin issue management to 50/day
+        'moderation': '200/day',  # Limits staff bulk moderation requests to 200/day
     },
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -196,4 +217,37 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 #paypal
 PAYPAL_RECEIVER_EMAIL = 'sb-6imge37854947@business.example.com'
-PAYPAL_TEST = True  # Use True for sandbox testing, False for live transactions
\ No newline at end of file
+PAYPAL_TEST = True  # Use True for sandbox testing, False for live transactions
+
+#booking lifecycle
+BOOKING_UNPAID_CANCEL_AFTER = 60 * 60  # Seconds before unpaid online bookings still pending are auto-cancelled
+
+#background worker
+BACKGROUND_WORKER_THREADS = 2  # Threads per process running work handed off from requests
+BACKGROUND_TASKS_EAGER = False  # Run background tasks inline instead (useful for tests)
+
+#bike catalog response cache
+CATALOG_CACHE_TIMEOUT = 60  # Seconds a cached catalog response is served as fresh
+CATALOG_CACHE_STALE_GRACE = 30  # Extra seconds a stale copy is served while one request rebuilds it
+
+#image variants
+IMAGE_VARIANT_FORMAT = 'WEBP'  # Pillow format used to re-encode resized variants
+IMAGE_VARIANT_QUALITY = 80  # Encoder quality for resized variants
+
+#nearby bike search
+BIKES_GEO_INDEX_ENABLED = True  # Serve /api/bikes/nearby/ from the in-memory grid instead of a SQL bounding box
+BIKES_GEO_INDEX_TTL = 300  # Seconds before the grid is reloaded from the database
+
+#owner earnings rollups
+EARNINGS_GAP_TIMEOUT = 600  # Seconds a missing ledger id below the high-water mark is re-checked before it is treated as rolled back
+
+#token authentication
+TOKEN_TTL = 30 * 24 * 3600  # Seconds before a token expires and the user has to log in again (None: never)
+TOKEN_AUTH_CACHE_TIMEOUT = 300  # Seconds an authenticated token is kept in the shared cache
+TOKEN_AUTH_LOCAL_TTL = 5  # Seconds a process serves a token from its own LRU; bounds how long other processes see a revoked token
+TOKEN_AUTH_LOCAL_SIZE = 10000  # Tokens kept in each process's LRU
+
+#testimonials feed
+TESTIMONIALS_FEED_FEATURED = 6  # Featured testimonials in the homepage feed
+TESTIMONIALS_FEED_LATEST = 20  # Latest approved testimonials in the homepage feed
+TESTIMONIALS_FEED_TIMEOUT = 3600  # Seconds a rendered feed is kept; testimonial changes replace it right away
@@ -9,6 +9,7 @@ from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
+from .images import VARIANTS_DIR, serve_variant
 
 # Configure Swagger schema
 schema_view = get_schema_view(
@@ -38,4 +39,10 @@ urlpatterns = [
     path('api/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
 
+# Media is served by Django in development only; in production the web server serves MEDIA_ROOT.
+if settings.DEBUG:
+    # Variant file names hash the source bytes, so they are served with far-future cache headers.
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.strip('/')}/{VARIANTS_DIR}/<path:path>", serve_variant, name='image-variant'),
+    ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BikesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bikes'
+
+    def ready(self):
+        # Import signals to ensure they are registered
+        import bikes.signals
@@ -0,0 +1,188 @@
+"""
+Versioned response cache for the public bike catalog.
+
+Cached responses are keyed by scheme, host, path, query string and the
+catalog version.
+Saving or deleting a bike bumps the catalog version, so every cached page
+becomes unreachable at once instead of being deleted key by key. Queries
+using the availability window filter also include the availability
+version, which booking changes bump.
+
+Entries stay fresh for ``CATALOG_CACHE_TIMEOUT`` seconds. After that they
+are kept for ``CATALOG_CACHE_STALE_GRACE`` more seconds. In that window a
+single request rebuilds the entry while the others keep serving the stale
+copy, which prevents a stampede when a hot key expires.
+
+Versions, entries, stats and the rebuild lock live in the default cache,
+which every worker process shares (see ``CACHES`` in settings), so a bump
+made by one worker is seen by all of them on their next request.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+CATALOG_VERSION_KEY = 'bikes:catalog:version'
+AVAILABILITY_VERSION_KEY = 'bikes:availability:version'
+STATS_KEYS = {
+    'hits': 'bikes:catalog:hits',
+    'stale_hits': 'bikes:catalog:stale-hits',
+    'misses': 'bikes:catalog:misses',
+}
+AVAILABILITY_PARAMS = ('available_from', 'available_to')
+
+# Hit/miss counts are added up per process and written to the cache at most this often.
+STATS_FLUSH_INTERVAL = 1.0
+_pending_stats = Counter()
+_stats_lock = threading.Lock()
+_stats_flushed_at = 0.0
+
+
+def _get_versions(*keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so a lost version never reuses an old one.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _get_version(key):
+    return _get_versions(key)[0]
+
+
+def _bump_version(key):
+    # A fresh clock value rather than incr(): the database cache increments with a
+    # read and a write, so two concurrent bumps could otherwise land on one version.
+    version = time.time_ns()
+    cache.set(key, version, None)
+    return version
+
+
+def get_catalog_version():
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response."""
+    return _bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_availability_version():
+    """Invalidate cached catalog responses filtered by an availability window."""
+    return _bump_version(AVAILABILITY_VERSION_KEY)
+
+
+def _flush_stats(force=False):
+    global _stats_flushed_at
+    with _stats_lock:
+        if not force and time.monotonic() - _stats_flushed_at < STATS_FLUSH_INTERVAL:
+            return
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _stats_flushed_at = time.monotonic()
+    for stat, count in pending.items():
+        key = STATS_KEYS[stat]
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+
+
+def _count(stat):
+    with _stats_lock:
+        _pending_stats[stat] += 1
+    _flush_stats()
+
+
+def get_cache_stats():
+    """Hit, stale hit and miss counts of every process (approximate) and the catalog version."""
+    _flush_stats(force=True)
+    counts = cache.get_many(STATS_KEYS.values())
+    stats = {stat: counts.get(key, 0) for stat, key in STATS_KEYS.items()}
+    stats['catalog_version'] = get_catalog_version()
+    return stats
+
+
+def catalog_cache_key(request):
+    keys = [CATALOG_VERSION_KEY]
+    if any(param in request.query_params for param in AVAILABILITY_PARAMS):
+        keys.append(AVAILABILITY_VERSION_KEY)
+    versions = [str(version) for version in _get_versions(*keys)]
+    query = request.META.get('QUERY_STRING', '')
+    # Bodies hold absolute image URLs (ImageVariantsField), so each scheme and host gets its own entry.
+    digest = hashlib.md5(f"{request.scheme}://{request.get_host()}{request.path}?{query}".encode()).hexdigest()
+    return f"bikes:catalog:{'.'.join(versions)}:{digest}"
+
+
+def etag_matches(etag, if_none_match):
+    """Weak If-None-Match comparison of `etag` against the header value (RFC 9110)."""
+    etags = parse_etags(if_none_match)
+    return etags == ['*'] or etag.strip('W/') in (tag.strip('W/') for tag in etags)
+
+
+class CachedCatalogMixin:
+    """
+    Serve GET responses of a public catalog view from the versioned cache,
+    with ETag / If-None-Match support. Only JSON responses are cached; the
+    browsable API always renders fresh.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return super().get(request, *args, **kwargs)
+
+        timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60)
+        grace = getattr(settings, 'CATALOG_CACHE_STALE_GRACE', 30)
+        key = catalog_cache_key(request)
+        lock_key = f"{key}:lock"
+
+        entry = cache.get(key)
+        locked = False
+        for _ in range(10):
+            if entry is not None and entry[2] > time.time():
+                _count('hits')
+                return self._cached_response(request, entry, 'HIT')
+            # Only one request rebuilds an entry; the others serve the stale copy or wait briefly.
+            locked = cache.add(lock_key, 1, timeout=10)
+            if locked:
+                break
+            if entry is not None:
+                _count('stale_hits')
+                return self._cached_response(request, entry, 'STALE')
+            time.sleep(0.05)
+            entry = cache.get(key)
+
+        try:
+            _count('misses')
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = JSONRenderer().render(response.data)
+            entry = (quote_etag(hashlib.md5(body).hexdigest()), body, time.time() + timeout)
+            cache.set(key, entry, timeout + grace)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return self._cached_response(request, entry, 'MISS')
+
+    def _cached_response(self, request, entry, status):
+        etag, body, _ = entry
+        if etag_matches(etag, request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['X-Cache'] = status
+        # Only JSON is cached; the browsable API renders the same URL differently.
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -1,11 +1,107 @@
+import re
+
 import django_filters
+from django import forms
+from django.db import connection
+from django.db.models import Case, Exists, FloatField, OuterRef, Q, Value, When
+from rest_framework.filters import SearchFilter
 from .models import Bike
 
+# Terms are reduced to lowercase word characters so they are safe inside a raw tsquery.
+SEARCH_TERM_RE = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 8
+
+
+class BikeFilterForm(forms.Form):
+    def clean(self):
+        cleaned_data = super().clean()
+        available_from = cleaned_data.get('available_from')
+        available_to = cleaned_data.get('available_to')
+        if available_from and available_to and available_to <= available_from:
+            raise forms.ValidationError("available_to must be later than available_from.")
+        return cleaned_data
+
+
 class BikeFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price_per_day", lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name="price_per_day", lookup_expr='lte')
     name = django_filters.CharFilter(field_name="name", lookup_expr='icontains')
+    available_from = django_filters.IsoDateTimeFilter(method='filter_available_window')
+    available_to = django_filters.IsoDateTimeFilter(method='filter_available_window')
 
     class Meta:
         model = Bike
-        fields = ['min_price', 'max_price', 'name']
\ No newline at end of file
+        fields = ['min_price', 'max_price', 'name', 'available_from', 'available_to']
+        form = BikeFilterForm
+
+    def filter_available_window(self, queryset, name, value):
+        """
+        Drop bikes with a pending/confirmed booking overlapping the requested window.
+        Either bound may be omitted for an open-ended window. The check is a single
+        NOT EXISTS subquery, so the cost does not grow with the number of bikes returned.
+        """
+        available_from = self.form.cleaned_data.get('available_from')
+        available_to = self.form.cleaned_data.get('available_to')
+        # Both parameters share this method; apply the window only once.
+        if name == 'available_to' and available_from is not None:
+            return queryset
+
+        from bookings.availability import ACTIVE_STATUSES
+        from bookings.models import Booking
+        overlapping = Booking.objects.filter(bike=OuterRef('pk'), status__in=ACTIVE_STATUSES)
+        if available_to is not None:
+            overlapping = overlapping.filter(start_date__lt=available_to)
+        if available_from is not None:
+            overlapping = overlapping.filter(end_date__gt=available_from)
+        return queryset.filter(~Exists(overlapping))
+
+
+class BikeSearchFilter(SearchFilter):
+    """
+    Relevance-ranked search over ``Bike.search_document``.
+
+    On PostgreSQL every term is matched as a full-text prefix (``term:*``) or,
+    for typos, by trigram word similarity; both use GIN indexes added in
+    bikes/0004 and results are ordered by text rank plus similarity.
+    Other backends require every term to appear in the search document and
+    rank by the field the first term matched (name, brand, type/year, then
+    description). That fallback is a ``LIKE '%term%'`` per term, which no
+    index can serve: it scans the whole bike table and is only meant for
+    development databases.
+    """
+
+    def get_search_terms(self, request):
+        params = request.query_params.get(self.search_param, '')
+        return SEARCH_TERM_RE.findall(params.lower())[:MAX_SEARCH_TERMS]
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        if connection.vendor == 'postgresql':
+            queryset = self._postgres_search(queryset, terms)
+        else:
+            queryset = self._fallback_search(queryset, terms)
+        return queryset.order_by('-rank', 'pk')
+
+    def _postgres_search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+        # Must match the expression of the bike_search_document_fts index.
+        vector = SearchVector('search_document', config='simple')
+        query = SearchQuery(' & '.join(f"{term}:*" for term in terms), search_type='raw', config='simple')
+        phrase = ' '.join(terms)
+        return queryset.annotate(
+            rank=SearchRank(vector, query) + TrigramWordSimilarity(phrase, 'search_document'),
+        ).filter(Q(search_document__search=query) | Q(search_document__trigram_word_similar=phrase))
+
+    def _fallback_search(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(search_document__contains=term)
+        term = terms[0]
+        return queryset.annotate(rank=Case(
+            When(name__icontains=term, then=Value(4.0)),
+            When(brand__icontains=term, then=Value(3.0)),
+            When(Q(type__icontains=term) | Q(model_year__contains=term), then=Value(2.0)),
+            default=Value(1.0),
+            output_field=FloatField(),
+        ))
@@ -0,0 +1,227 @@
+"""
+Nearest-bike lookups.
+
+``GeoIndex`` keeps the coordinates of every listed bike (approved,
+available, with a location) in a uniform latitude/longitude grid held in
+memory. A radius query only visits the cells overlapping the circle's
+bounding box and measures great-circle distance to the bikes in them.
+
+The grid is loaded with one query on first use, updated incrementally by
+the bike save/delete signals and reloaded after ``BIKES_GEO_INDEX_TTL``
+seconds so changes made by other processes or bulk writes are picked up.
+Only one thread reloads an expired grid; the others keep answering from
+the old one meanwhile, and saves that arrive during the reload are
+replayed onto the new snapshot. ``nearby_from_database`` answers the same
+question with a bounding-box prefilter in SQL and is used when
+``BIKES_GEO_INDEX_ENABLED`` is off.
+
+Circles crossing the antimeridian are covered by two boxes, one on each
+side of it; circles containing a pole span every longitude.
+"""
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size in degrees (about 5.5 km of latitude).
+CELL_DEGREES = 0.05
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """
+    (min_lat, max_lat, min_lon, max_lon) boxes that together enclose the
+    circle: one box, or two when the circle crosses the antimeridian.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, lat - lat_delta), min(90.0, lat + lat_delta)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    # Widest at the latitude farthest from the equator.
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    lon_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    if lon_delta >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    min_lon, max_lon = lon - lon_delta, lon + lon_delta
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def _cell(lat, lon):
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lon / CELL_DEGREES))
+
+
+def listed_bikes():
+    """Bikes shown in the public catalog that have a location."""
+    from .models import Bike
+    return Bike.objects.filter(
+        is_approved=True, availability_status=True, latitude__isnull=False, longitude__isnull=False,
+    )
+
+
+class GeoIndex:
+    """In-memory grid of listed bike coordinates."""
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._cells = {}
+        self._points = {}
+        self._loaded_at = None
+        # Saves seen while a reload reads the database, replayed onto its snapshot.
+        self._pending = None
+        # Bumped by invalidate(), so a reload that started earlier does not count as fresh.
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'BIKES_GEO_INDEX_TTL', 300)
+
+    def __len__(self):
+        return len(self._points)
+
+    def _read_rows(self):
+        rows = listed_bikes().values_list('id', 'latitude', 'longitude')
+        return rows.iterator(chunk_size=5000)
+
+    def load(self):
+        """Rebuild the grid from the database."""
+        with self._reload_lock:
+            self._load()
+
+    def _load(self):
+        with self._lock:
+            self._pending = {}
+            generation = self._generation
+        try:
+            cells, points = {}, {}
+            for bike_id, lat, lon in self._read_rows():
+                lat, lon = float(lat), float(lon)
+                cell = _cell(lat, lon)
+                cells.setdefault(cell, {})[bike_id] = (lat, lon)
+                points[bike_id] = cell
+            with self._lock:
+                self._cells, self._points = cells, points
+                # The snapshot may have been read before these saves committed.
+                for bike_id, (lat, lon, listed) in self._pending.items():
+                    self._apply(bike_id, lat, lon, listed)
+                self._loaded_at = time.monotonic() if generation == self._generation else None
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        if self._loaded_at is not None:
+            # Expired: one thread reloads while the others keep using the old grid.
+            if not self._reload_lock.acquire(blocking=False):
+                return
+        else:
+            # Nothing to answer from yet: wait for whoever is loading.
+            self._reload_lock.acquire()
+        try:
+            if not self._is_fresh():
+                self._load()
+        finally:
+            self._reload_lock.release()
+
+    def record(self, bike_id, lat, lon, listed):
+        """Apply a saved bike; unlisted bikes and bikes without a location are dropped."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending[bike_id] = (lat, lon, listed)
+            if self._loaded_at is not None:
+                self._apply(bike_id, lat, lon, listed)
+
+    def discard(self, bike_id):
+        self.record(bike_id, None, None, False)
+
+    def _apply(self, bike_id, lat, lon, listed):
+        self._remove(bike_id)
+        if listed and lat is not None and lon is not None:
+            lat, lon = float(lat), float(lon)
+            cell = _cell(lat, lon)
+            self._cells.setdefault(cell, {})[bike_id] = (lat, lon)
+            self._points[bike_id] = cell
+
+    def _remove(self, bike_id):
+        cell = self._points.pop(bike_id, None)
+        if cell is not None:
+            bikes = self._cells[cell]
+            del bikes[bike_id]
+            if not bikes:
+                del self._cells[cell]
+
+    def invalidate(self):
+        """Reload the whole grid on next use."""
+        with self._lock:
+            self._loaded_at = None
+            self._generation += 1
+
+    def nearby(self, lat, lon, radius_km, limit=20):
+        """Return up to `limit` (distance_km, bike_id) pairs within the radius, nearest first."""
+        self._ensure_loaded()
+        found = []
+        with self._lock:
+            cells = self._cells
+            for min_lat, max_lat, min_lon, max_lon in bounding_boxes(lat, lon, radius_km):
+                (low_row, low_col), (high_row, high_col) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+                if (high_row - low_row + 1) * (high_col - low_col + 1) > len(cells):
+                    # Sparse grid or huge radius: walking the occupied cells is cheaper.
+                    candidates = [bikes for (row, col), bikes in cells.items()
+                                  if low_row <= row <= high_row and low_col <= col <= high_col]
+                else:
+                    candidates = [cells[(row, col)] for row in range(low_row, high_row + 1)
+                                  for col in range(low_col, high_col + 1) if (row, col) in cells]
+                for bikes in candidates:
+                    for bike_id, (bike_lat, bike_lon) in bikes.items():
+                        if min_lat <= bike_lat <= max_lat and min_lon <= bike_lon <= max_lon:
+                            distance = haversine_km(lat, lon, bike_lat, bike_lon)
+                            if distance <= radius_km:
+                                found.append((distance, bike_id))
+        return heapq.nsmallest(limit, found)
+
+
+geo_index = GeoIndex()
+
+
+def nearby_from_database(lat, lon, radius_km, limit=20):
+    """Same result as ``GeoIndex.nearby``, prefiltered by a bounding box in SQL."""
+    boxes = Q()
+    for min_lat, max_lat, min_lon, max_lon in bounding_boxes(lat, lon, radius_km):
+        boxes |= Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+    rows = listed_bikes().filter(boxes).values_list('id', 'latitude', 'longitude')
+    found = []
+    for bike_id, bike_lat, bike_lon in rows:
+        distance = haversine_km(lat, lon, float(bike_lat), float(bike_lon))
+        if distance <= radius_km:
+            found.append((distance, bike_id))
+    return heapq.nsmallest(limit, found)
+
+
+def find_nearby(lat, lon, radius_km, limit=20):
+    if getattr(settings, 'BIKES_GEO_INDEX_ENABLED', True):
+        return geo_index.nearby(lat, lon, radius_km, limit)
+    return nearby_from_database(lat, lon, radius_km, limit)
@@ -0,0 +1,152 @@
+"""
+Bulk fleet import.
+
+Rows are read from CSV or NDJSON and processed in chunks. Each chunk is
+validated with the ``BikeSerializer`` rules, gets its slugs from one
+``allocate_slugs`` call and is written with a single ``bulk_create`` inside
+its own transaction. Invalid rows are reported and skipped; a chunk that
+fails to save is rolled back and the import stops, reporting the row to
+resume from (``start_row``). Chunks committed before the failure stay in
+place, so resuming never imports a row twice.
+"""
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_catalog_version
+from .geo import geo_index
+from .models import Bike, allocate_slugs
+from .serializers import BikeSerializer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+class BikeImportSerializer(BikeSerializer):
+    """BikeSerializer rules without the fields the importer fills in itself."""
+
+    class Meta(BikeSerializer.Meta):
+        fields = None
+        # The slug is allocated per chunk and the owner is the importing user,
+        # which also avoids a uniqueness / foreign key query per row.
+        exclude = ['owner', 'slug', 'image', 'average_rating', 'search_document']
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)
+    failed: bool = False
+    next_row: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.skipped) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'chunks': self.chunks,
+            'errors': self.errors,
+            'failed': self.failed,
+            'next_row': self.next_row,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def read_rows(stream, import_format):
+    """
+    Yield one dict per data row of a text stream. Empty CSV cells are
+    dropped so optional fields fall back to their defaults.
+    """
+    if import_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if key and value not in (None, '')}
+    elif import_format == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported by the serializer as an invalid row.
+                yield line
+    else:
+        raise ValueError(f"Unsupported import format: {import_format}")
+
+
+def text_stream(uploaded_file, encoding='utf-8'):
+    """Wrap an uploaded binary file for read_rows."""
+    return io.TextIOWrapper(uploaded_file, encoding=encoding, newline='')
+
+
+def _chunked(rows, chunk_size, start_row):
+    chunk, first = [], start_row
+    for number, row in enumerate(rows):
+        if number < start_row:
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield first, chunk
+            first, chunk = number + 1, []
+    if chunk:
+        yield first, chunk
+
+
+def import_bikes(rows, owner, chunk_size=500, start_row=0, progress=None):
+    """
+    Import bike rows for `owner`.
+
+    ``rows`` is any iterable of dicts (see ``read_rows``); row numbers count
+    data rows from 0. ``progress`` is called with the running ImportResult
+    after every committed chunk.
+    """
+    result = ImportResult(next_row=start_row)
+    # Build the serializer fields once and validate every row against them,
+    # the way ListSerializer validates its items.
+    serializer = BikeImportSerializer()
+    started = time.perf_counter()
+    for first, chunk in _chunked(rows, chunk_size, start_row):
+        bikes, errors = [], []
+        for number, row in enumerate(chunk, start=first):
+            try:
+                bikes.append(Bike(owner=owner, **serializer.run_validation(row)))
+            except ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+
+        for bike, slug in zip(bikes, allocate_slugs([bike.name for bike in bikes])):
+            bike.slug = slug
+            bike.search_document = bike.build_search_document()
+        try:
+            with transaction.atomic():
+                Bike.objects.bulk_create(bikes)
+        except DatabaseError as exc:
+            result.failed = True
+            result.errors.append({'row': first, 'errors': {'non_field_errors': [str(exc)]}})
+            break
+
+        result.skipped += len(errors)
+        result.errors.extend(errors)
+        result.imported += len(bikes)
+        result.chunks += 1
+        result.next_row = first + len(chunk)
+        result.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(result)
+
+    result.elapsed = time.perf_counter() - started
+    if result.imported:
+        # bulk_create does not send post_save, so invalidate the catalog once.
+        transaction.on_commit(bump_catalog_version)
+        transaction.on_commit(geo_index.invalidate)
+    return result
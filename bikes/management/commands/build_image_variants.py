@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from bike_rental_service.images import default_picture, process_image_variants
+from bikes.models import Bike
+
+
+class Command(BaseCommand):
+    help = "Build missing resized variants of bike images and profile pictures (e.g. after a bulk import)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that are already recorded.")
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Bike, 'image'), (get_user_model(), 'profile_picture')):
+            variants_field = f"{field_name}_variants"
+            built = 0
+            rows = model._default_manager.exclude(**{field_name: ''})
+            if default_picture(model, field_name):
+                rows = rows.exclude(**{field_name: default_picture(model, field_name)})
+            rows = rows.values_list('pk', field_name, variants_field)
+            for pk, name, variants in rows.iterator(chunk_size=500):
+                if options['force'] and variants:
+                    model._default_manager.filter(pk=pk).update(**{variants_field: {}})
+                elif (variants or {}).get('source') == name:
+                    continue
+                process_image_variants(model._meta.label, pk, field_name)
+                built += 1
+            self.stdout.write(f"{model._meta.label}: processed {built} pictures")
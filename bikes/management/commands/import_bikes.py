@@ -0,0 +1,51 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from bikes.imports import IMPORT_FORMATS, import_bikes, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import a fleet of bikes from a CSV or NDJSON file in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header line) or NDJSON file.")
+        parser.add_argument('--owner', required=True, help="Username of the owner of the imported bikes.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows validated and inserted per transaction.")
+        parser.add_argument('--start-row', type=int, default=0, help="Data row to resume from after a failed chunk.")
+        parser.add_argument('--approve', action='store_true', help="Mark the imported bikes as approved.")
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']}; pass --format.")
+        try:
+            owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['owner']}.")
+
+        def progress(result):
+            self.stdout.write(
+                f"rows {result.next_row}: imported={result.imported} skipped={result.skipped} "
+                f"{result.rows_per_second:.0f} rows/s"
+            )
+
+        with open(options['path'], encoding='utf-8', newline='') as stream:
+            rows = read_rows(stream, import_format)
+            if options['approve']:
+                rows = ({**row, 'is_approved': True} for row in rows)
+            result = import_bikes(rows, owner, chunk_size=options['chunk_size'],
+                                  start_row=options['start_row'], progress=progress)
+
+        for error in result.errors[:20]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if len(result.errors) > 20:
+            self.stderr.write(f"... {len(result.errors) - 20} more rows with errors")
+        summary = (f"imported {result.imported} bikes, skipped {result.skipped} rows in "
+                   f"{result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)")
+        if result.failed:
+            raise CommandError(f"{summary}; chunk starting at row {result.next_row} failed. "
+                               f"Resume with --start-row {result.next_row}.")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from bikes.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Rebuild every bike's rating sum, count, per-star histogram and average from the feedback table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bike', type=int, action='append', dest='bike_ids', help="Only this bike (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Bikes updated per statement.")
+
+    def handle(self, *args, **options):
+        changed = reconcile_ratings(options['bike_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled ratings; {changed} bikes were out of date."))
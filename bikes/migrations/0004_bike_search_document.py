@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:42
+
+from django.db import migrations, models
+
+BIKE_TYPE_LABELS = {'scooter': 'Scooter', 'motorcycle': 'Motorcycle', 'electric': 'Electric Bike'}
+
+
+def fill_search_documents(apps, schema_editor):
+    Bike = apps.get_model('bikes', 'Bike')
+    fields = ('id', 'name', 'brand', 'type', 'model_year', 'description')
+    chunk = []
+    for bike in Bike.objects.only(*fields).order_by('id').iterator(chunk_size=1000):
+        parts = [bike.name, bike.brand, bike.type, BIKE_TYPE_LABELS.get(bike.type), bike.model_year, bike.description]
+        bike.search_document = ' '.join(str(part) for part in parts if part not in (None, '')).lower()
+        chunk.append(bike)
+        if len(chunk) >= 1000:
+            Bike.objects.bulk_update(chunk, ['search_document'])
+            chunk = []
+    if chunk:
+        Bike.objects.bulk_update(chunk, ['search_document'])
+
+
+def add_search_indexes(apps, schema_editor):
+    """Full-text and trigram indexes on the search document (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX bike_search_document_fts ON bikes_bike "
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_document, '')))"
+    )
+    schema_editor.execute(
+        "CREATE INDEX bike_search_document_trgm ON bikes_bike USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS bike_search_document_fts")
+    schema_editor.execute("DROP INDEX IF EXISTS bike_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0003_bike_average_rating_alter_bike_brand_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bike',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Normalized text used for full-text search.'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0004_bike_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bike',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Storage names of the resized image variants.'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:50
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0005_bike_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bike',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text="Latitude of the bike's pickup point.", max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text="Longitude of the bike's pickup point.", max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='bike',
+            index=models.Index(fields=['latitude', 'longitude'], name='bike_location_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:54
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Cast, NullIf, Round
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Bike = apps.get_model('bikes', 'Bike')
+    Feedback = apps.get_model('bookings', 'Feedback')
+    counters = {
+        'rating_sum': Sum('rating'),
+        'rating_count': Count('id'),
+        **{f"rating_{star}_count": Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+    }
+    rows = Feedback.objects.values('booking__bike_id').order_by('booking__bike_id').annotate(**counters)
+    chunk = []
+    for row in rows.iterator(chunk_size=1000):
+        chunk.append(Bike(pk=row.pop('booking__bike_id'), **row))
+        if len(chunk) >= 1000:
+            Bike.objects.bulk_update(chunk, list(counters))
+            chunk = []
+    if chunk:
+        Bike.objects.bulk_update(chunk, list(counters))
+    # Rounded in SQL exactly like bikes.ratings._average, so the backfill and
+    # the incremental updates agree on halves (Python's round() would not).
+    Bike.objects.update(average_rating=Cast(
+        Round(Cast(F('rating_sum'), models.FloatField()) / NullIf(F('rating_count'), Value(0)), 1),
+        models.DecimalField(max_digits=3, decimal_places=1),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0006_bike_location'),
+        ('bookings', '0010_booking_pickup_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bike',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 1-star ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 2-star ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 3-star ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 4-star ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 5-star ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of feedback ratings.'),
+        ),
+        migrations.AddField(
+            model_name='bike',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Sum of all feedback ratings.'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
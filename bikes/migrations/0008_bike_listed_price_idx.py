@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0007_bike_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bike',
+            index=models.Index(condition=models.Q(('availability_status', True), ('is_approved', True)), fields=['price_per_day'], name='bike_listed_price_idx'),
+        ),
+    ]
@@ -1,12 +1,45 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import datetime
+from decimal import Decimal
 
 User = get_user_model()
 
+
+def allocate_slugs(names):
+    """
+    Return a unique slug for each name, in order.
+
+    Existing slugs sharing any of the base slugs are read with a single
+    prefix query; the counters are then assigned in memory, so a batch of
+    identical names costs one query instead of one per candidate slug.
+    """
+    max_length = Bike._meta.get_field('slug').max_length
+    # Leave room for a "-<counter>" suffix.
+    bases = [slugify(name)[:max_length - 8].strip('-') or 'bike' for name in names]
+    prefixes = models.Q()
+    for base in set(bases):
+        prefixes |= models.Q(slug__startswith=base)
+    taken = set(Bike.objects.filter(prefixes).values_list('slug', flat=True)) if bases else set()
+
+    slugs = []
+    next_counter = {}
+    for base in bases:
+        slug = base
+        if slug in taken:
+            counter = next_counter.get(base, 1)
+            while f"{base}-{counter}" in taken:
+                counter += 1
+            next_counter[base] = counter + 1
+            slug = f"{base}-{counter}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
 class Bike(models.Model):
     # Choices for bike types
     BIKE_TYPES = [
@@ -31,26 +64,68 @@ class Bike(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp for when the bike was added.")
     updated_at = models.DateTimeField(auto_now=True, help_text="Timestamp for the last update.")
     average_rating = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, help_text="Sum of all feedback ratings.")
+    rating_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of feedback ratings.")
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 1-star ratings.")
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 2-star ratings.")
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 3-star ratings.")
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 4-star ratings.")
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 5-star ratings.")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, validators=[MinValueValidator(Decimal(-90)), MaxValueValidator(Decimal(90))], help_text="Latitude of the bike's pickup point.")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, validators=[MinValueValidator(Decimal(-180)), MaxValueValidator(Decimal(180))], help_text="Longitude of the bike's pickup point.")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Storage names of the resized image variants.")
+    search_document = models.TextField(blank=True, default='', editable=False, help_text="Normalized text used for full-text search.")
+
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter of the nearby search fallback (bikes.geo).
+            models.Index(fields=['latitude', 'longitude'], name='bike_location_idx'),
+            # Public catalog: approved, available bikes filtered / ordered by price. Partial
+            # rather than leading with the two flags because Django filters booleans as bare
+            # "WHERE is_approved AND availability_status", which SQLite cannot match to an
+            # index column but does match to an index predicate.
+            models.Index(
+                fields=['price_per_day'], name='bike_listed_price_idx',
+                condition=models.Q(is_approved=True, availability_status=True),
+            ),
+        ]
+
+    def build_search_document(self):
+        """Lowercased name, brand, type, model year and description for search indexing."""
+        parts = [self.name, self.brand, self.type, self.get_type_display(), self.model_year, self.description]
+        return ' '.join(str(part) for part in parts if part not in (None, '')).lower()
 
     def save(self, *args, **kwargs):
-        """Automatically generate a unique slug from the bike's name."""
+        """
+        Automatically generate a unique slug from the bike's name and refresh the search document.
+        Saving a loaded bike never writes the rating columns: bikes.ratings maintains them with
+        F() updates, which a stale copy would otherwise overwrite.
+        """
+        from .ratings import RATING_FIELDS
+        self.search_document = self.build_search_document()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in RATING_FIELDS
+            ]
+        if update_fields is not None and 'search_document' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['search_document']
         if not self.slug:
-            base_slug = slugify(self.name)
-            unique_slug = base_slug
-            counter = 1
-            while Bike.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = unique_slug
+            self.slug = allocate_slugs([self.name])[0]
 
         super().save(*args, **kwargs)
 
     def update_average_rating(self):
-        """Recalculate and update the stored average rating."""
-        from bookings.models import Feedback
-        avg_rating = Feedback.objects.filter(booking__bike=self).aggregate(Avg('rating'))['rating__avg']
-        self.average_rating = round(avg_rating, 1) if avg_rating else None
-        self.save()
+        """Rebuild the stored rating counters and average from this bike's feedback."""
+        from .ratings import RATING_FIELDS, reconcile_ratings
+        reconcile_ratings([self.pk])
+        self.refresh_from_db(fields=RATING_FIELDS)
+
+    @property
+    def rating_histogram(self):
+        """Number of ratings per star, keyed 1-5."""
+        return {star: getattr(self, f"rating_{star}_count") for star in range(1, 6)}
 
     def __str__(self):
         return f"{self.brand} {self.name} ({self.model_year})"
@@ -64,3 +139,5 @@ class Bike(models.Model):
             raise ValidationError("Price per day must be greater than zero.")
         if self.mileage is not None and self.mileage < 0:
             raise ValidationError("Mileage cannot be negative.")
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValidationError("Latitude and longitude must be set together.")
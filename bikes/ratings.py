@@ -0,0 +1,99 @@
+"""
+Running rating aggregates on Bike.
+
+Each bike stores ``rating_sum``, ``rating_count``, one counter per star
+(``rating_1_count`` .. ``rating_5_count``) and the derived
+``average_rating``. Feedback changes apply their delta with a single
+UPDATE built from F() expressions, so concurrent reviews of the same bike
+never overwrite each other and no other column is touched.
+``reconcile_ratings`` rebuilds the counters from the feedback table in
+bulk for repairs and backfills.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, NullIf, Round
+
+from .cache import bump_catalog_version
+from .models import Bike
+
+STARS = (1, 2, 3, 4, 5)
+RATING_FIELDS = ['rating_sum', 'rating_count'] + [f"rating_{star}_count" for star in STARS] + ['average_rating']
+
+
+def _average(rating_sum, rating_count):
+    """SQL expression for the rounded average, NULL when there are no ratings."""
+    return Cast(
+        Round(Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0)), 1),
+        DecimalField(max_digits=3, decimal_places=1),
+    )
+
+
+def apply_rating_change(bike_id, old_rating=None, new_rating=None):
+    """
+    Move one review on a bike from `old_rating` to `new_rating`. Pass only
+    new_rating for a new review and only old_rating for a deleted one.
+    """
+    if bike_id is None or old_rating == new_rating:
+        return
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    updates = {
+        'rating_sum': F('rating_sum') + sum_delta,
+        'rating_count': F('rating_count') + count_delta,
+        # The right-hand side sees the old values, so apply the deltas here too.
+        'average_rating': _average(F('rating_sum') + sum_delta, F('rating_count') + count_delta),
+    }
+    if old_rating is not None:
+        updates[f"rating_{old_rating}_count"] = F(f"rating_{old_rating}_count") - 1
+    if new_rating is not None:
+        updates[f"rating_{new_rating}_count"] = F(f"rating_{new_rating}_count") + 1
+    Bike.objects.filter(pk=bike_id).update(**updates)
+    # update() does not send post_save, so invalidate cached catalog pages here.
+    transaction.on_commit(bump_catalog_version)
+
+
+def rating_aggregates(bike_ids=None):
+    """Per-bike rating counters computed from the feedback table, keyed by bike id."""
+    from bookings.models import Feedback
+    feedback = Feedback.objects.all()
+    if bike_ids is not None:
+        feedback = feedback.filter(booking__bike_id__in=bike_ids)
+    rows = feedback.values('booking__bike_id').order_by().annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id'),
+        **{f"rating_{star}_count": Count('id', filter=Q(rating=star)) for star in STARS},
+    )
+    return {row.pop('booking__bike_id'): row for row in rows}
+
+
+def reconcile_ratings(bike_ids=None, chunk_size=1000):
+    """
+    Rebuild the rating counters of the given bikes (or every bike) from
+    their feedback. Returns the number of bikes whose counters changed.
+    """
+    totals = rating_aggregates(bike_ids)
+    empty = {field: 0 for field in RATING_FIELDS if field != 'average_rating'}
+    bikes = Bike.objects.order_by('pk').only('pk', *RATING_FIELDS)
+    if bike_ids is not None:
+        bikes = bikes.filter(pk__in=bike_ids)
+
+    changed = []
+    for bike in bikes.iterator(chunk_size=chunk_size):
+        expected = totals.get(bike.pk, empty)
+        stale_average = not expected['rating_count'] and bike.average_rating is not None
+        if not stale_average and all(getattr(bike, field) == value for field, value in expected.items()):
+            continue
+        for field, value in expected.items():
+            setattr(bike, field, value)
+        changed.append(bike)
+
+    with transaction.atomic():
+        Bike.objects.bulk_update(changed, list(empty), batch_size=chunk_size)
+        # Same expression as the incremental path, so both round identically.
+        for start in range(0, len(changed), chunk_size):
+            Bike.objects.filter(pk__in=[bike.pk for bike in changed[start:start + chunk_size]]).update(
+                average_rating=_average(F('rating_sum'), F('rating_count')),
+            )
+    if changed:
+        transaction.on_commit(bump_catalog_version)
+    return len(changed)
@@ -1,11 +1,22 @@
 from rest_framework import serializers
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
+from bike_rental_service.images import ImageVariantsField
 from .models import Bike
 from datetime import datetime
 
-class BikeSerializer(serializers.ModelSerializer):
+class BikeSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField('image', help_text="URLs of the thumbnail, card and full-size image variants.")
+    rating_histogram = serializers.ReadOnlyField(help_text="Number of ratings per star, keyed 1-5.")
+
     class Meta:
         model = Bike
-        fields = '__all__'
+        exclude = ['search_document', 'rating_sum', 'rating_1_count', 'rating_2_count', 'rating_3_count',
+                   'rating_4_count', 'rating_5_count']
+        # Maintained from feedback (bikes.ratings).
+        read_only_fields = ['average_rating']
+        field_columns = {
+            'rating_histogram': ['rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count'],
+        }
 
     def validate_model_year(self, value):
         """Ensure the bike's model year is reasonable."""
@@ -32,4 +43,24 @@ class BikeSerializer(serializers.ModelSerializer):
     def validate_description(self, value):
         """Sanitize description to prevent basic XSS."""
         from django.utils.html import escape
-        return escape(value) if value else value
\ No newline at end of file
+        return escape(value) if value else value
+
+    def validate(self, data):
+        """Ensure the pickup point has both coordinates or neither."""
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Latitude and longitude must be set together.")
+        return data
+
+
+class BikeCardSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Compact bike representation for catalog listings."""
+    image = ImageVariantsField('image', variant='card', help_text="URL of the card-size image variant.")
+    thumbnail = ImageVariantsField('image', variant='thumbnail', help_text="URL of the thumbnail image variant.")
+
+    class Meta:
+        model = Bike
+        fields = ['id', 'slug', 'name', 'brand', 'type', 'model_year', 'price_per_day', 'average_rating',
+                  'rating_count', 'image', 'thumbnail']
+        read_only_fields = fields
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bike_rental_service.images import schedule_image_variants
+from .cache import bump_catalog_version
+from .geo import geo_index
+from .models import Bike
+
+@receiver(post_save, sender=Bike)
+@receiver(post_delete, sender=Bike)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    Invalidate cached catalog responses once a bike change commits.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Bike)
+def build_image_variants(sender, instance, **kwargs):
+    """
+    Render the resized variants of a new or changed bike image off the request path.
+    """
+    schedule_image_variants(instance, 'image')
+
+
+@receiver(post_save, sender=Bike)
+def update_geo_index(sender, instance, **kwargs):
+    """
+    Move, add or drop the bike in the nearby-search grid once the change commits.
+    """
+    args = (instance.pk, instance.latitude, instance.longitude, instance.is_approved and instance.availability_status)
+    transaction.on_commit(lambda: geo_index.record(*args))
+
+
+@receiver(post_delete, sender=Bike)
+def remove_from_geo_index(sender, instance, **kwargs):
+    bike_id = instance.pk
+    transaction.on_commit(lambda: geo_index.discard(bike_id))
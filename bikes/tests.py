@@ -1,3 +1,523 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils.timezone import now
+
+from PIL import Image
+
+from bike_rental_service.fieldsets import project_queryset
+from bike_rental_service.images import build_variants, default_picture, serve_variant
+from benchmarks.utils import seed_bikes, seed_users
+from bookings.models import Booking, Feedback
+from .cache import CATALOG_VERSION_KEY, bump_catalog_version, get_cache_stats, get_catalog_version
+from .filters import BikeFilter, BikeSearchFilter
+from .geo import GeoIndex, bounding_boxes, nearby_from_database
+from .imports import import_bikes
+from .models import Bike, allocate_slugs
+from .ratings import RATING_FIELDS, apply_rating_change, reconcile_ratings
+from .serializers import BikeCardSerializer, BikeSerializer
+
+
+class AvailabilityFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='filter-user')
+        cls.booked, cls.free = seed_bikes(cls.user, 2, prefix='filter-bike')
+        cls.origin = now() + timedelta(days=7)
+        Booking.objects.create(user=cls.user, bike=cls.booked, start_date=cls.origin,
+                               end_date=cls.origin + timedelta(days=2), pickup_location='Kathmandu', status='confirmed')
+        Booking.objects.create(user=cls.user, bike=cls.free, start_date=cls.origin,
+                               end_date=cls.origin + timedelta(days=2), pickup_location='Kathmandu', status='cancelled')
+
+    def available(self, start=None, end=None):
+        params = {}
+        if start is not None:
+            params['available_from'] = (self.origin + timedelta(days=start)).isoformat()
+        if end is not None:
+            params['available_to'] = (self.origin + timedelta(days=end)).isoformat()
+        filterset = BikeFilter(params, queryset=Bike.objects.order_by('pk'))
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return list(filterset.qs)
+
+    def test_booked_bike_is_hidden_in_overlapping_window(self):
+        self.assertEqual(self.available(1, 3), [self.free])
+
+    def test_windows_around_the_booking(self):
+        self.assertEqual(self.available(2, 4), [self.booked, self.free])
+        self.assertEqual(self.available(-2, 0), [self.booked, self.free])
+
+    def test_open_ended_windows(self):
+        self.assertEqual(self.available(start=1), [self.free])
+        self.assertEqual(self.available(start=2), [self.booked, self.free])
+        self.assertEqual(self.available(end=1), [self.free])
+        self.assertEqual(self.available(end=0), [self.booked, self.free])
+
+    def test_window_must_end_after_it_starts(self):
+        params = {'available_from': self.origin.isoformat(), 'available_to': self.origin.isoformat()}
+        self.assertFalse(BikeFilter(params, queryset=Bike.objects.all()).is_valid())
+
+
+class CatalogCacheTests(TestCase):
+    url = '/api/bikes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='catalog-user')
+        cls.bike, cls.other = seed_bikes(cls.user, 2, prefix='catalog-bike')
+
+    def get(self, url=None, **extra):
+        return self.client.get(url or self.url, **extra)
+
+    def test_second_request_is_a_hit(self):
+        first = self.get()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        second = self.get()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Accept', second['Vary'])
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+            self.assertIn('Accept', response['Vary'])
+        # Containing the tag is not matching it.
+        for header in (f'{etag}x', f'"x{etag[1:]}', ''):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=header).status_code, 200, header)
+
+    def test_bike_change_invalidates_every_page(self):
+        detail_url = f'/api/bikes/bikes/{self.bike.pk}/'
+        self.get(), self.get(detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bike.name = 'Renamed bike'
+            self.bike.save()
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Renamed bike', response.content.decode())
+        self.assertEqual(self.get(detail_url)['X-Cache'], 'MISS')
+
+    def test_bookings_only_invalidate_availability_queries(self):
+        start = now() + timedelta(days=3)
+        window = f'{self.url}?available_from={start:%Y-%m-%dT%H:%M:%S}&available_to={start + timedelta(days=1):%Y-%m-%dT%H:%M:%S}'
+        self.assertEqual(len(self.get(window).json()['results']), 2)
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, bike=self.bike, start_date=start, end_date=start + timedelta(days=1),
+                                   pickup_location='Kathmandu', status='confirmed')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+        response = self.get(window)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([bike['id'] for bike in response.json()['results']], [self.other.pk])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'bikes.example.com'])
+    def test_pages_are_cached_per_scheme_and_host(self):
+        self.get()
+        for extra in ({'HTTP_HOST': 'bikes.example.com'}, {'secure': True}):
+            response = self.get(**extra)
+            self.assertEqual(response['X-Cache'], 'MISS', extra)
+        response = self.get(HTTP_HOST='bikes.example.com')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertIn('http://bikes.example.com/', response.content.decode())
+        self.assertNotIn('//testserver/', response.content.decode())
+
+    def test_migrate_creates_every_database_cache_table(self):
+        caches = {**settings.CACHES, 'sessions': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'session_cache'}}
+        with override_settings(CACHES=caches):
+            call_command('migrate', verbosity=0)
+        self.assertIn('session_cache', connection.introspection.table_names())
+
+    def test_versions_are_shared_between_processes(self):
+        # Another worker process opens its own handle on the same cache.
+        other_process = DatabaseCache(settings.CACHES['default']['LOCATION'], {})
+        version = bump_catalog_version()
+        self.assertEqual(other_process.get(CATALOG_VERSION_KEY), version)
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_stats_count_hits_and_misses(self):
+        before = get_cache_stats()
+        self.get(), self.get(), self.get()
+        after = get_cache_stats()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+
+
+class BikeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='search-user')
+        cls.activa, cls.pulsar, cls.ather = seed_bikes(cls.user, 3, prefix='search-bike')
+        for bike, name, brand, bike_type, description in (
+            (cls.activa, 'Honda Activa', 'Honda', 'scooter', 'City scooter with a big boot.'),
+            (cls.pulsar, 'Pulsar 220', 'Bajaj', 'motorcycle', 'Sporty ride, comes with a Honda helmet.'),
+            (cls.ather, 'Ather 450X', 'Ather', 'electric', 'Fast charging commuter.'),
+        ):
+            bike.name, bike.brand, bike.type, bike.description = name, brand, bike_type, description
+            bike.save()
+
+    def search(self, query):
+        response = self.client.get('/api/bikes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [bike['id'] for bike in response.json()['results']]
+
+    def test_ranked_by_relevance(self):
+        self.assertEqual(self.search('honda'), [self.activa.pk, self.pulsar.pk])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('Honda, city!'), [self.activa.pk])
+        self.assertEqual(self.search('zzzz'), [])
+
+    def test_prefixes_type_labels_and_typos(self):
+        self.assertEqual(self.search('puls'), [self.pulsar.pk])
+        self.assertEqual(self.search('electric'), [self.ather.pk])
+        self.assertEqual(self.search('pulsr'), [self.pulsar.pk])
+
+    def test_fallback_ranks_by_the_field_matched(self):
+        queryset = BikeSearchFilter()._fallback_search(Bike.objects.all(), ['honda']).order_by('-rank', 'pk')
+        self.assertEqual([(bike.pk, bike.rank) for bike in queryset], [(self.activa.pk, 4.0), (self.pulsar.pk, 1.0)])
+
+    def test_migration_backfills_documents(self):
+        migration = import_module('bikes.migrations.0004_bike_search_document')
+        Bike.objects.update(search_document='')
+        migration.fill_search_documents(apps, None)
+        for bike in Bike.objects.all():
+            self.assertEqual(bike.search_document, bike.build_search_document())
+
+
+class FleetImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, = seed_users(1, prefix='import-user')
+
+    def existing(self, *slugs):
+        bikes = seed_bikes(self.owner, len(slugs), prefix='import-bike')
+        for bike, slug in zip(bikes, slugs):
+            Bike.objects.filter(pk=bike.pk).update(slug=slug)
+
+    def test_slugs_skip_taken_counters(self):
+        self.existing('honda-activa', 'honda-activa-1', 'honda-activa-3', 'honda-activa-pro')
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(['Honda Activa', 'Honda Activa', 'honda activa!', 'Pulsar', 'Pulsar', 'Honda Activa Pro'])
+        self.assertEqual(slugs, [
+            'honda-activa-2', 'honda-activa-4', 'honda-activa-5', 'pulsar', 'pulsar-1', 'honda-activa-pro-1',
+        ])
+
+    def test_slug_edge_cases(self):
+        max_length = Bike._meta.get_field('slug').max_length
+        slugs = allocate_slugs(['', '!!!', 'x' * 300])
+        self.assertEqual(slugs[:2], ['bike', 'bike-1'])
+        self.assertEqual(len(slugs[2]), max_length - 8)
+        with self.assertNumQueries(0):
+            self.assertEqual(allocate_slugs([]), [])
+
+    def row(self, name, **extra):
+        return {'name': name, 'type': 'scooter', 'brand': 'Honda', 'model_year': 2022,
+                'description': 'Imported bike.', 'price_per_day': '1500', **extra}
+
+    def test_import_in_chunks_skipping_invalid_rows(self):
+        rows = [self.row('Dio'), self.row('Dio', type='tractor'), self.row('Dio'), self.row('Dio')]
+        result = import_bikes(rows, self.owner, chunk_size=2)
+        self.assertEqual((result.imported, result.skipped, result.chunks, result.next_row), (3, 1, 2, 4))
+        self.assertEqual([error['row'] for error in result.errors], [1])
+        self.assertEqual(sorted(Bike.objects.filter(owner=self.owner).values_list('slug', flat=True)),
+                         ['dio', 'dio-1', 'dio-2'])
+        # Resuming from a row imports only what follows it.
+        result = import_bikes(rows, self.owner, chunk_size=2, start_row=3)
+        self.assertEqual((result.imported, result.next_row), (1, 4))
+        self.assertTrue(Bike.objects.filter(slug='dio-3', search_document__contains='imported bike').exists())
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, = seed_users(1, prefix='image-user')
+        cls.bike, = seed_bikes(cls.owner, 1, prefix='image-bike')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def picture(self, color='red', size=(800, 600)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return ContentFile(buffer.getvalue(), name='photo.png')
+
+    def upload(self, bike, color='red'):
+        with self.captureOnCommitCallbacks(execute=True):
+            bike.image = self.picture(color)
+            bike.save()
+        bike.refresh_from_db()
+        return bike.image_variants
+
+    def test_variants_are_built_after_upload(self):
+        variants = self.upload(self.bike)
+        self.assertEqual(variants['source'], self.bike.image.name)
+        with default_storage.open(variants['thumbnail']) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (160, 160))
+        with default_storage.open(variants['full']) as full:
+            self.assertEqual(Image.open(full).size, (800, 600))
+        data = BikeSerializer(self.bike).data['image_variants']
+        self.assertTrue(data['card'].endswith(variants['card']))
+
+    def test_names_follow_the_source_bytes(self):
+        red = self.upload(self.bike, 'red')
+        # Same upload name, different picture: the old URLs must not be reused.
+        blue = self.upload(self.bike, 'blue')
+        self.assertNotEqual(red['card'], blue['card'])
+        again = build_variants(self.bike.image)
+        self.assertEqual(again, blue)
+
+    def test_shared_default_picture_is_skipped(self):
+        with mock.patch('bike_rental_service.images.run_in_background') as queued:
+            user, = seed_users(1, prefix='image-default-user')
+            user.save()
+            self.assertEqual(user.profile_picture.name, default_picture(type(user), 'profile_picture'))
+            queued.assert_not_called()
+            user.profile_picture = self.picture()
+            user.save()
+            queued.assert_called_once()
+
+    def test_variants_route_is_development_only(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse('image-variant', kwargs={'path': 'x.webp'})
+        variants = self.upload(self.bike)
+        path = variants['card'].split('/', 1)[1]
+        response = serve_variant(RequestFactory().get('/'), path)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+class GeoIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, = seed_users(1, prefix='geo-user')
+        cls.east, cls.west, cls.north, cls.far = seed_bikes(cls.owner, 4, prefix='geo-bike')
+        for bike, lat, lon in ((cls.east, 0, '179.990000'), (cls.west, 0, '-179.990000'),
+                               (cls.north, '89.950000', 0), (cls.far, 0, 0)):
+            Bike.objects.filter(pk=bike.pk).update(latitude=lat, longitude=lon)
+
+    def ids(self, results):
+        return sorted(bike_id for _, bike_id in results)
+
+    def test_circles_wrap_across_the_antimeridian(self):
+        index = GeoIndex(ttl=3600)
+        for lon in (179.995, -179.995):
+            expected = sorted([self.east.pk, self.west.pk])
+            self.assertEqual(self.ids(index.nearby(0, lon, 5)), expected)
+            self.assertEqual(self.ids(nearby_from_database(0, lon, 5)), expected)
+        self.assertEqual(len(bounding_boxes(0, 179.995, 5)), 2)
+
+    def test_circles_around_a_pole_span_every_longitude(self):
+        (_, max_lat, min_lon, max_lon), = bounding_boxes(89.99, 120, 50)
+        self.assertEqual((max_lat, min_lon, max_lon), (90.0, -180.0, 180.0))
+        self.assertEqual(self.ids(GeoIndex(ttl=3600).nearby(89.99, 120, 50)), [self.north.pk])
+
+    def test_only_one_thread_reloads_an_expired_grid(self):
+        index = GeoIndex(ttl=3600)
+        index.load()
+        index._loaded_at -= 7200
+        reloads, release = [], threading.Event()
+
+        def slow_rows():
+            reloads.append(1)
+            release.wait(5)
+            return iter([(self.far.pk, 0, 0)])
+
+        answered = []
+
+        def query():
+            answered.append(index.nearby(0, 179.995, 5))
+
+        with mock.patch.object(index, '_read_rows', slow_rows):
+            threads = [threading.Thread(target=query) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            # Apart from the reloading thread, every query answers from the old grid without waiting.
+            deadline = time.monotonic() + 5
+            while len(answered) < 7 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(answered), 7)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(reloads), 1)
+        self.assertEqual(self.ids(index.nearby(0, 0, 5)), [self.far.pk])
+
+    def test_saves_during_a_reload_are_kept(self):
+        index = GeoIndex(ttl=3600)
+        real_rows = index._read_rows
+
+        def rows_then_saves():
+            rows = list(real_rows())
+            # Committed after the snapshot was read.
+            index.record(self.far.pk, 0, 0, False)
+            index.record(999999, '0.010000', '0.010000', True)
+            return iter(rows)
+
+        with mock.patch.object(index, '_read_rows', rows_then_saves):
+            index.load()
+        self.assertEqual(self.ids(index.nearby(0, 0, 5)), [999999])
+
+    def test_invalidation_during_a_reload_forces_another(self):
+        index = GeoIndex(ttl=3600)
+        real_rows = index._read_rows
+
+        def rows_then_invalidate():
+            rows = list(real_rows())
+            index.invalidate()
+            return iter(rows)
+
+        with mock.patch.object(index, '_read_rows', rows_then_invalidate):
+            index.load()
+        self.assertFalse(index._is_fresh())
+
+
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='rating-user')
+        cls.bike, cls.other = seed_bikes(cls.user, 2, prefix='rating-bike')
+        origin = now() + timedelta(days=3)
+        cls.bookings = [
+            Booking.objects.create(user=cls.user, bike=bike, start_date=origin + timedelta(days=day),
+                                   end_date=origin + timedelta(days=day + 1), pickup_location='Kathmandu')
+            for day, bike in enumerate([cls.bike] * 4 + [cls.other])
+        ]
+
+    def rate(self, booking, rating):
+        return Feedback.objects.create(booking=booking, user=self.user, rating=rating)
+
+    def counters(self, bike):
+        bike.refresh_from_db()
+        return bike.rating_sum, bike.rating_count, bike.rating_histogram, bike.average_rating
+
+    def test_reviews_apply_their_delta(self):
+        for booking, rating in zip(self.bookings, (2, 2, 2, 3)):
+            self.rate(booking, rating)
+        # 9 / 4 = 2.25 rounds half away from zero.
+        self.assertEqual(self.counters(self.bike), (9, 4, {1: 0, 2: 3, 3: 1, 4: 0, 5: 0}, Decimal('2.3')))
+
+        feedback = Feedback.objects.get(booking=self.bookings[0])
+        feedback.rating = 5
+        feedback.save()
+        Feedback.objects.get(booking=self.bookings[1]).delete()
+        self.assertEqual(self.counters(self.bike), (10, 3, {1: 0, 2: 1, 3: 1, 4: 0, 5: 1}, Decimal('3.3')))
+
+        Feedback.objects.filter(booking__bike=self.bike).delete()
+        self.assertEqual(self.counters(self.bike), (0, 0, {star: 0 for star in range(1, 6)}, None))
+
+    def test_moving_a_review_to_another_bike(self):
+        feedback = self.rate(self.bookings[0], 4)
+        feedback = Feedback.objects.get(pk=feedback.pk)
+        feedback.booking = self.bookings[4]
+        feedback.save()
+        self.assertEqual(self.counters(self.bike)[:2], (0, 0))
+        self.assertEqual(self.counters(self.other), (4, 1, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0}, Decimal('4.0')))
+
+    def test_concurrent_deltas_do_not_overwrite_each_other(self):
+        stale = Bike.objects.get(pk=self.bike.pk)
+        apply_rating_change(self.bike.pk, new_rating=5)
+        apply_rating_change(self.bike.pk, new_rating=1)
+        # A stale instance saved afterwards leaves the counters alone.
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.counters(self.bike), (6, 2, {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}, Decimal('3.0')))
+
+    def test_reconcile_and_backfill_round_like_the_deltas(self):
+        for booking, rating in zip(self.bookings, (2, 2, 2, 3)):
+            self.rate(booking, rating)
+        incremental = self.counters(self.bike)
+        Bike.objects.update(**{field: 0 for field in RATING_FIELDS if field != 'average_rating'}, average_rating=None)
+        import_module('bikes.migrations.0007_bike_rating_aggregates').fill_rating_aggregates(apps, None)
+        self.assertEqual(self.counters(self.bike), incremental)
+        self.assertIsNone(self.counters(self.other)[3])
+
+        Bike.objects.filter(pk=self.bike.pk).update(rating_sum=1, average_rating=Decimal('5.0'))
+        self.assertEqual(reconcile_ratings(), 1)
+        self.assertEqual(self.counters(self.bike), incremental)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, = seed_users(1, prefix='fieldset-user')
+        cls.bike, = seed_bikes(cls.owner, 1, prefix='fieldset-bike')
+        Bike.objects.filter(pk=cls.bike.pk).update(rating_count=2, rating_4_count=1, rating_5_count=1)
+
+    def setUp(self):
+        bump_catalog_version()
+
+    def projected(self, query, serializer_class=BikeSerializer):
+        request = RequestFactory().get('/api/bikes/', query)
+        return project_queryset(Bike.objects.all(), serializer_class(context={'request': request}))
+
+    def get(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bikes/', query)
+        self.assertEqual(response.status_code, 200)
+        bike_query, = [query['sql'] for query in queries if 'FROM "bikes_bike"' in query['sql'] and 'COUNT(' not in query['sql']]
+        return response.json()['results'][0], bike_query
+
+    def test_plain_columns_are_read_with_values(self):
+        self.assertEqual(self.projected({'fields': 'id,name,price_per_day'}).first(),
+                         {'id': self.bike.pk, 'name': self.bike.name, 'price_per_day': self.bike.price_per_day})
+        row, sql = self.get({'fields': 'name,price_per_day'})
+        self.assertEqual(row, {'name': self.bike.name, 'price_per_day': f'{self.bike.price_per_day:.2f}'})
+        self.assertNotIn('"description"', sql)
+
+    def test_default_cards_render_from_values(self):
+        queryset = self.projected({'omit': 'thumbnail'}, BikeCardSerializer)
+        self.assertIsInstance(queryset.first(), dict)
+        row, sql = self.get({'omit': 'thumbnail,image'})
+        self.assertEqual(set(row), {'id', 'slug', 'name', 'brand', 'type', 'model_year', 'price_per_day',
+                                    'average_rating', 'rating_count'})
+        self.assertNotIn('"image"', sql)
+
+    def test_relations_and_computed_fields_use_only(self):
+        queryset = self.projected({'fields': 'owner,rating_histogram'})
+        bike = queryset.get()
+        self.assertIsInstance(bike, Bike)
+        self.assertEqual(bike.get_deferred_fields() & {'owner_id', 'rating_5_count'}, set())
+        self.assertIn('description', bike.get_deferred_fields())
+        row, sql = self.get({'fields': 'owner,rating_histogram'})
+        self.assertEqual(row, {'owner': self.owner.pk, 'rating_histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1}})
+        self.assertNotIn('"description"', sql)
+
+    def test_fields_and_omit_combine(self):
+        row, _ = self.get({'fields': 'id,name,brand', 'omit': 'brand'})
+        self.assertEqual(row, {'id': self.bike.pk, 'name': self.bike.name})
+
+    def test_unknown_names_are_rejected(self):
+        for query, param in (({'fields': 'name,nonexistent'}, 'fields'), ({'omit': 'description'}, 'omit'),
+                             ({'fields': 'name', 'omit': 'nonexistent'}, 'omit')):
+            response = self.client.get('/api/bikes/', query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertEqual(list(response.json()), [param], query)
+            self.assertNotIn('X-Cache', response, query)
+        # The full representation has a description; the default cards do not.
+        self.assertEqual(self.client.get('/api/bikes/', {'fields': 'name', 'omit': 'description'}).status_code, 200)
+
+    def test_writes_are_not_projected(self):
+        request = RequestFactory().post('/api/bikes/?fields=name')
+        serializer = BikeSerializer(context={'request': request})
+        self.assertIn('description', serializer.fields)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import BikeListView, BikeDetailView, BikeCreateView, BikeUpdateView, BikeDeleteView
+from .views import BikeListView, BikeDetailView, BikeCreateView, BikeUpdateView, BikeDeleteView, BikeCacheStatsView, BikeImportView, BikeNearbyView
 
 urlpatterns = [
     path('', BikeListView.as_view(), name='bike-list'),
@@ -7,4 +7,7 @@ urlpatterns = [
     path('bikes/create/', BikeCreateView.as_view(), name='bike-create'),
     path('bikes/<int:pk>/update/', BikeUpdateView.as_view(), name='bike-update'),
     path('bikes/<int:pk>/delete/', BikeDeleteView.as_view(), name='bike-delete'),
+    path('nearby/', BikeNearbyView.as_view(), name='bike-nearby'),
+    path('import/', BikeImportView.as_view(), name='bike-import'),
+    path('cache-stats/', BikeCacheStatsView.as_view(), name='bike-cache-stats'),
 ]
\ No newline at end of file
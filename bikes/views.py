@@ -1,33 +1,50 @@
-from rest_framework import generics, permissions
+import os
+
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .cache import CachedCatalogMixin, get_cache_stats
+from .imports import IMPORT_FORMATS, import_bikes, read_rows, text_stream
 from .models import Bike
-from .serializers import BikeSerializer
+from .serializers import BikeCardSerializer, BikeSerializer
 from .permissions import IsOwnerOrAdmin  # Custom permission
-from .filters import BikeFilter
+from .filters import BikeFilter, BikeSearchFilter
+from .geo import find_nearby
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
+from bike_rental_service.fieldsets import FIELDS_PARAM, SparseFieldsetMixin, project_queryset
 
 # Anyone can see the list of bikes
-class BikeListView(generics.ListAPIView):
+class BikeListView(CachedCatalogMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
         List all approved and available bikes.
 
         * Requires: None (public access)
-        * Returns: List of bike data
+        * Optional: available_from, available_to (ISO datetimes) to hide bikes booked in that window
+        * Optional: search (ranked match on name, brand, type, model year and description)
+        * Optional: fields / omit (comma-separated) to choose fields from the full bike representation
+        * Returns: List of compact bike cards (cached; supports ETag / If-None-Match)
     """
     queryset = Bike.objects.filter(is_approved=True, availability_status=True)
-    serializer_class = BikeSerializer
+    serializer_class = BikeCardSerializer
     permission_classes = [permissions.AllowAny]  # Public access
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, BikeSearchFilter]
     filterset_class = BikeFilter
-    search_fields = ['name', 'model_year', 'type', 'brand',]
+
+    def get_serializer_class(self):
+        # Explicitly requested fields are picked from the full representation.
+        if self.request.query_params.get(FIELDS_PARAM):
+            return BikeSerializer
+        return BikeCardSerializer
 
 # Anyone can view bike details
-class BikeDetailView(generics.RetrieveAPIView):
+class BikeDetailView(CachedCatalogMixin, generics.RetrieveAPIView):
     """
         Retrieve details of a specific bike.
 
         * Requires: None (public access)
-        * Returns: Bike data
+        * Returns: Bike data (cached; supports ETag / If-None-Match)
     """
     queryset = Bike.objects.filter(is_approved=True, availability_status=True)
     serializer_class = BikeSerializer
@@ -71,3 +88,102 @@ class BikeDeleteView(generics.DestroyAPIView):
     queryset = Bike.objects.all()
     serializer_class = BikeSerializer
     permission_classes = [IsOwnerOrAdmin]
+
+class BikeNearbyView(APIView):
+    """
+        List approved and available bikes near a point, nearest first.
+
+        * Requires: None (public access)
+        * Query: lat, lon (degrees); optional radius (km, default 5, max 50) and limit (default 20, max 100)
+        * Optional: fields / omit (comma-separated) to choose fields from the full bike representation
+        * Returns: Compact bike cards with distance_km
+    """
+    permission_classes = [permissions.AllowAny]
+    default_radius = 5
+    max_radius = 50
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius = float(request.query_params.get('radius', self.default_radius))
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except (KeyError, ValueError):
+            return Response({"success": False, "message": "lat and lon are required; lat, lon, radius and limit must be numbers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response({"success": False, "message": "lat must be within [-90, 90] and lon within [-180, 180]."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius <= self.max_radius:
+            return Response({"success": False, "message": f"radius must be between 0 and {self.max_radius} km."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+
+        nearest = find_nearby(lat, lon, radius, limit)
+        serializer_class = BikeSerializer if request.query_params.get(FIELDS_PARAM) else BikeCardSerializer
+        context = {'request': request}
+        queryset = project_queryset(Bike.objects.filter(is_approved=True, availability_status=True),
+                                    serializer_class(context=context))
+        # Rows may be values() dicts, which in_bulk() does not support.
+        rows = queryset.filter(pk__in=[bike_id for _, bike_id in nearest])
+        bikes = {row['id'] if isinstance(row, dict) else row.pk: row for row in rows}
+        # Skip bikes unlisted since the index last saw them.
+        nearest = [(distance, bikes[bike_id]) for distance, bike_id in nearest if bike_id in bikes]
+        results = serializer_class([bike for _, bike in nearest], many=True, context=context).data
+        for data, (distance, _) in zip(results, nearest):
+            data['distance_km'] = round(distance, 3)
+        return Response(results)
+
+class BikeCacheStatsView(APIView):
+    """
+        Report catalog response cache counters.
+
+        * Requires: Admin authentication
+        * Returns: Hit, stale hit and miss counts and the current catalog version
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+class BikeImportView(APIView):
+    """
+        Import a fleet of bikes from an uploaded CSV or NDJSON file.
+
+        * Requires: Admin authentication
+        * Body (multipart): file; optional format (csv|ndjson, default from the file name),
+          owner (user id, default the caller), chunk_size, start_row (resume after a failed chunk)
+        * Returns: Imported/skipped counts, per-row errors, rows per second and the next row
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"success": False, "message": "Upload a CSV or NDJSON file as 'file'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            return Response({"success": False, "message": f"Unsupported import format: {import_format}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_size = max(1, int(request.data.get('chunk_size', 500)))
+            start_row = max(0, int(request.data.get('start_row', 0)))
+        except (TypeError, ValueError):
+            return Response({"success": False, "message": "chunk_size and start_row must be integers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        owner = request.user
+        if request.data.get('owner'):
+            owner = get_user_model().objects.filter(pk=request.data['owner']).first()
+            if owner is None:
+                return Response({"success": False, "message": "Owner not found."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_bikes(read_rows(text_stream(upload), import_format), owner,
+                              chunk_size=chunk_size, start_row=start_row)
+        return Response({"success": not result.failed, **result.as_dict()},
+                        status=status.HTTP_201_CREATED if result.imported and not result.failed
+                        else status.HTTP_200_OK)
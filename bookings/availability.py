@@ -0,0 +1,175 @@
+import bisect
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+# Booking statuses that block a bike for their rental window.
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# Name of the PostgreSQL exclusion constraint added in bookings/0007.
+OVERLAP_CONSTRAINT = 'booking_no_overlapping_active'
+
+# Striped process-local locks used where the database cannot enforce overlaps.
+# Reentrant so a caller can hold a bike's lock around a nested write of the same bike.
+_bike_locks = [threading.RLock() for _ in range(64)]
+
+
+class BikeIntervals:
+    """
+    Sorted rental windows of a single bike.
+
+    Windows are kept ordered by start date. Alongside them, for every
+    prefix of that order, the two latest end dates and their bookings are
+    kept. The windows starting before a requested end form such a prefix,
+    and one of them overlaps the request exactly when the latest end among
+    them (leaving out an excluded booking) is after the requested start.
+    A lookup is therefore one bisect; adding or removing a window rewrites
+    the prefixes after it, so writes are linear in the number of windows.
+    """
+
+    __slots__ = ('keys', 'ends', 'latest', 'starts')
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda row: (row[1], row[0]))
+        self.keys = [(start, booking_id) for booking_id, start, _ in rows]
+        self.ends = [end for _, _, end in rows]
+        self.starts = {booking_id: start for booking_id, start, _ in rows}
+        # (latest end, its booking, second latest end, its booking) of each prefix.
+        self.latest = []
+        self._rebuild_latest(0)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rebuild_latest(self, position):
+        del self.latest[position:]
+        best = self.latest[-1] if self.latest else (None, None, None, None)
+        for (_, booking_id), end in zip(self.keys[position:], self.ends[position:]):
+            first_end, first_id, second_end, second_id = best
+            if first_end is None or end > first_end:
+                best = (end, booking_id, first_end, first_id)
+            elif second_end is None or end > second_end:
+                best = (first_end, first_id, end, booking_id)
+            self.latest.append(best)
+
+    def add(self, booking_id, start, end):
+        """Insert a rental window, replacing any previous window of the same booking."""
+        self.remove(booking_id)
+        position = bisect.bisect_left(self.keys, (start, booking_id))
+        self.keys.insert(position, (start, booking_id))
+        self.starts[booking_id] = start
+        self.ends.insert(position, end)
+        self._rebuild_latest(position)
+
+    def remove(self, booking_id):
+        """Drop the rental window of a booking if it is present."""
+        start = self.starts.pop(booking_id, None)
+        if start is None:
+            return False
+        position = bisect.bisect_left(self.keys, (start, booking_id))
+        del self.keys[position]
+        del self.ends[position]
+        self._rebuild_latest(position)
+        return True
+
+    def find_overlap(self, start, end, exclude_id=None):
+        """Return the id of a booking overlapping [start, end), or None."""
+        # Every window up to this position starts before `end`.
+        position = bisect.bisect_left(self.keys, (end,)) - 1
+        if position < 0:
+            return None
+        first_end, first_id, second_end, second_id = self.latest[position]
+        if first_id != exclude_id:
+            return first_id if first_end > start else None
+        return second_id if second_end is not None and second_end > start else None
+
+
+def find_conflicting_booking(bike_id, start, end, exclude_id=None):
+    """Return the id of an active booking overlapping [start, end), or None."""
+    return overlapping_bookings(bike_id, start, end).exclude(id=exclude_id).values_list('id', flat=True).first()
+
+
+def overlapping_bookings(bike_id, start, end):
+    """Active bookings of a bike intersecting [start, end) (served by booking_bike_status_window_idx)."""
+    from .models import Booking
+    return Booking.objects.filter(
+        bike_id=bike_id,
+        status__in=ACTIVE_STATUSES,
+        start_date__lt=end,
+        end_date__gt=start,
+    )
+
+
+def is_overlap_violation(exc):
+    """Check whether an IntegrityError comes from the booking overlap constraint."""
+    return OVERLAP_CONSTRAINT in str(exc)
+
+
+@contextmanager
+def bike_write_lock(bike_ids, using='default'):
+    """
+    Open a transaction for writing bookings of the given bike(s).
+
+    PostgreSQL enforces non-overlapping bookings with an exclusion constraint,
+    so no lock is taken there and a losing writer gets an IntegrityError.
+    Other backends serialize writers per bike: a process-local striped lock
+    (enough for SQLite, which also serializes writers across processes) plus
+    a row lock on the bike where SELECT ... FOR UPDATE is supported.
+    """
+    if isinstance(bike_ids, int):
+        bike_ids = [bike_ids]
+    bike_ids = sorted(set(bike_ids))
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Acquire stripes in a fixed order so concurrent multi-bike writers cannot deadlock.
+    stripes = sorted({bike_id % len(_bike_locks) for bike_id in bike_ids})
+    for stripe in stripes:
+        _bike_locks[stripe].acquire()
+    try:
+        with transaction.atomic(using=using):
+            if connection.features.has_select_for_update:
+                from bikes.models import Bike
+                list(Bike.objects.using(using).select_for_update().filter(pk__in=bike_ids).values_list('pk', flat=True))
+            yield
+    finally:
+        for stripe in reversed(stripes):
+            _bike_locks[stripe].release()
+
+
+def find_batch_conflicts(windows):
+    """
+    Check many rental windows at once.
+
+    ``windows`` is a list of ``(key, bike_id, start, end)`` tuples. Returns the
+    keys of windows that overlap a stored active booking or an earlier window
+    of the same batch, using a single query for the stored bookings.
+    """
+    if not windows:
+        return set()
+    from .models import Booking
+    bike_ids = {bike_id for _, bike_id, _, _ in windows}
+    rows = Booking.objects.filter(
+        bike_id__in=bike_ids,
+        status__in=ACTIVE_STATUSES,
+        start_date__lt=max(end for _, _, _, end in windows),
+        end_date__gt=min(start for _, _, start, _ in windows),
+    ).values_list('bike_id', 'id', 'start_date', 'end_date')
+    stored = {}
+    for bike_id, booking_id, start, end in rows:
+        stored.setdefault(bike_id, []).append((booking_id, start, end))
+    intervals = {bike_id: BikeIntervals(stored.get(bike_id, ())) for bike_id in bike_ids}
+
+    conflicts = set()
+    for position, (key, bike_id, start, end) in enumerate(windows):
+        if intervals[bike_id].find_overlap(start, end) is not None:
+            conflicts.add(key)
+        else:
+            # Later windows in the batch must not overlap this one either; negative
+            # ids keep them apart from stored bookings.
+            intervals[bike_id].add(-(position + 1), start, end)
+    return conflicts
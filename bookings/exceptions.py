@@ -0,0 +1,9 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class BookingConflict(APIException):
+    """Raised when a booking overlaps an existing pending/confirmed booking of the same bike."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This bike is already booked for the selected dates."
+    default_code = 'booking_conflict'
@@ -0,0 +1,81 @@
+"""
+Streaming exports for finance.
+
+Rows are read with ``values_list().iterator()``, which uses a server-side
+cursor on PostgreSQL, and written out chunk by chunk, so memory stays flat
+and the first bytes leave before the query has been fully read.
+
+Formats:
+
+* ``csv``: header line followed by one line per row
+* ``ndjson``: one JSON object per row
+* ``columnar``: NDJSON where the first line lists the fields and every
+  following line holds one chunk as ``{"field": [values, ...], ...}``
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/x-ndjson', 'columns.ndjson'),
+}
+
+CHUNK_SIZE = 2000
+
+
+class _LineBuffer:
+    """File-like object that hands back whatever csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(queryset, fields, chunk_size):
+    chunk = []
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(queryset, fields, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(fields)
+    for chunk in _chunks(queryset, fields, chunk_size):
+        yield ''.join(writer.writerow(row) for row in chunk)
+
+
+def stream_ndjson(queryset, fields, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    for chunk in _chunks(queryset, fields, chunk_size):
+        yield ''.join(encoder.encode(dict(zip(fields, row))) + '\n' for row in chunk)
+
+
+def stream_columnar(queryset, fields, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    yield json.dumps({'fields': list(fields)}) + '\n'
+    for chunk in _chunks(queryset, fields, chunk_size):
+        yield encoder.encode(dict(zip(fields, map(list, zip(*chunk))))) + '\n'
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'columnar': stream_columnar,
+}
+
+
+def export_response(queryset, fields, export_format, filename):
+    """Build a streaming download of `fields` from `queryset` in the given format."""
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(STREAMERS[export_format](queryset, fields), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    response['Cache-Control'] = 'no-store'
+    return response
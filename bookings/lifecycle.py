@@ -0,0 +1,91 @@
+"""
+Set-based booking lifecycle transitions.
+
+Replaces calling ``Booking.update_status()`` row by row:
+
+* pending/confirmed bookings whose end date has passed become ``completed``
+* online-payment bookings still ``pending`` and unpaid after
+  ``BOOKING_UNPAID_CANCEL_AFTER`` seconds become ``cancelled`` (their
+  pending payments are marked failed)
+
+Each run remembers the cutoffs it used, so the next run only scans bookings
+that became eligible since then. Updates are applied in primary-key chunks,
+each in its own short transaction.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from bikes.cache import bump_availability_version
+from .models import Booking, BookingLifecycleRun
+
+ONLINE_PAYMENT_OPTIONS = ('full_online', 'partial_online')
+
+
+def _update_in_chunks(queryset, chunk_size, values, on_chunk=None):
+    """Apply `values` to every row of `queryset` in primary-key chunks; return the number of rows updated."""
+    updated, last_pk = 0, 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return updated
+        with transaction.atomic():
+            # Re-apply the filter so rows changed since the read are left alone.
+            count = queryset.filter(pk__in=ids).update(**values)
+            if on_chunk:
+                on_chunk(ids)
+            transaction.on_commit(bump_availability_version)
+        updated += count
+        last_pk = ids[-1]
+
+
+def _fail_pending_payments(booking_ids):
+    from payment.models import Payment
+    Payment.objects.filter(booking_id__in=booking_ids, status='pending').update(status='failed', updated_at=now())
+
+
+def run_lifecycle(chunk_size=1000, full=False, current_time=None):
+    """
+    Run one lifecycle pass and record it.
+
+    With ``full=True`` the high-water marks of earlier runs are ignored and
+    every eligible booking is scanned.
+    """
+    started = time.perf_counter()
+    current_time = current_time or now()
+    cancel_after = timedelta(seconds=getattr(settings, 'BOOKING_UNPAID_CANCEL_AFTER', 60 * 60))
+    run = BookingLifecycleRun(
+        started_at=current_time,
+        completed_until=current_time,
+        cancelled_until=current_time - cancel_after,
+    )
+    previous = None if full else BookingLifecycleRun.objects.filter(finished_at__isnull=False).first()
+
+    stale = Booking.objects.filter(
+        status='pending',
+        payment_status=False,
+        payment_option__in=ONLINE_PAYMENT_OPTIONS,
+        created_at__lte=run.cancelled_until,
+    )
+    expired = Booking.objects.filter(
+        status__in=['pending', 'confirmed'],
+        end_date__lte=run.completed_until,
+    )
+    if previous:
+        stale = stale.filter(created_at__gt=previous.cancelled_until)
+        expired = expired.filter(end_date__gt=previous.completed_until)
+
+    # Cancel first so stale unpaid bookings that also expired are not reported as completed.
+    run.cancelled_count = _update_in_chunks(
+        stale, chunk_size, {'status': 'cancelled', 'updated_at': current_time}, on_chunk=_fail_pending_payments,
+    )
+    run.completed_count = _update_in_chunks(
+        expired, chunk_size, {'status': 'completed', 'updated_at': current_time},
+    )
+    run.finished_at = now()
+    run.duration_ms = int((time.perf_counter() - started) * 1000)
+    run.save()
+    return run
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.lifecycle import run_lifecycle
+
+
+class Command(BaseCommand):
+    help = "Complete expired bookings and cancel stale unpaid ones using set-based updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows updated per transaction.")
+        parser.add_argument('--full', action='store_true', help="Ignore the high-water mark and scan every booking.")
+        parser.add_argument('--loop', action='store_true', help="Keep running every --interval seconds.")
+        parser.add_argument('--interval', type=int, default=300, help="Seconds between runs with --loop.")
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            run = run_lifecycle(chunk_size=options['chunk_size'], full=full)
+            self.stdout.write(
+                f"{run.started_at:%Y-%m-%d %H:%M:%S} completed={run.completed_count} "
+                f"cancelled={run.cancelled_count} duration={run.duration_ms}ms"
+            )
+            if not options['loop']:
+                break
+            full = False
+            time.sleep(options['interval'])
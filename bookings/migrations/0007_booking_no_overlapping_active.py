@@ -0,0 +1,65 @@
+# Generated by Django 5.1.6 on 2026-10-17 09:12
+
+import logging
+
+from django.db import migrations
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+
+logger = logging.getLogger(__name__)
+
+
+def cancel_overlapping_bookings(apps, schema_editor):
+    """
+    Cancel pending/confirmed bookings that overlap another one of the same
+    bike, so the constraint below can be added. Per bike, confirmed bookings
+    win over pending ones and earlier bookings over later duplicates.
+    """
+    Booking = apps.get_model('bookings', 'Booking')
+    active = Booking.objects.filter(status__in=['pending', 'confirmed'])
+    overlapping = active.filter(
+        bike_id=OuterRef('bike_id'), start_date__lt=OuterRef('end_date'), end_date__gt=OuterRef('start_date'),
+    ).exclude(pk=OuterRef('pk'))
+    bike_ids = set(active.filter(Exists(overlapping)).values_list('bike_id', flat=True))
+    confirmed_first = Case(When(status='confirmed', then=Value(0)), default=Value(1), output_field=IntegerField())
+    cancelled = []
+    for bike_id in sorted(bike_ids):
+        kept = []
+        for booking_id, start, end in (active.filter(bike_id=bike_id).order_by(confirmed_first, 'id')
+                                       .values_list('id', 'start_date', 'end_date')):
+            if any(start < kept_end and kept_start < end for kept_start, kept_end in kept):
+                cancelled.append(booking_id)
+            else:
+                kept.append((start, end))
+    if cancelled:
+        Booking.objects.filter(pk__in=cancelled).update(status='cancelled')
+        logger.warning("Cancelled %d overlapping bookings: %s", len(cancelled), ', '.join(map(str, cancelled)))
+
+
+def add_overlap_constraint(apps, schema_editor):
+    """Enforce non-overlapping pending/confirmed bookings per bike on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE bookings_booking ADD CONSTRAINT booking_no_overlapping_active "
+        "EXCLUDE USING gist (bike_id WITH =, tstzrange(start_date, end_date, '[)') WITH &&) "
+        "WHERE (status IN ('pending', 'confirmed'))"
+    )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_no_overlapping_active")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_payment_option'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_overlapping_bookings, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
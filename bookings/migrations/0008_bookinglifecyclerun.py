@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_booking_no_overlapping_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingLifecycleRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(help_text='When the run started.')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='When the run finished.', null=True)),
+                ('completed_until', models.DateTimeField(help_text='Bookings ending up to this time have been completed.')),
+                ('cancelled_until', models.DateTimeField(help_text='Unpaid bookings created up to this time have been cancelled.')),
+                ('completed_count', models.PositiveIntegerField(default=0, help_text='Bookings moved to completed.')),
+                ('cancelled_count', models.PositiveIntegerField(default=0, help_text='Stale unpaid bookings cancelled.')),
+                ('duration_ms', models.PositiveIntegerField(default=0, help_text='Wall-clock duration of the run.')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
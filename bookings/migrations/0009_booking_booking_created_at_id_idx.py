@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0003_bike_average_rating_alter_bike_brand_and_more'),
+        ('bookings', '0008_bookinglifecyclerun'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['created_at', 'id'], name='booking_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_booking_booking_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='pickup_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='Latitude of the pickup point.', max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='pickup_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='Longitude of the pickup point.', max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0007_bike_rating_aggregates'),
+        ('bookings', '0010_booking_pickup_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['bike', 'status', 'start_date', 'end_date'], name='booking_bike_status_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='booking_user_created_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from rest_framework.exceptions import ValidationError
 from bikes.models import Bike
 from decimal import Decimal
 from django.utils.timezone import now
+from .availability import find_conflicting_booking
 
 User = get_user_model()
 
@@ -37,6 +38,8 @@ class Booking(models.Model):
     start_date = models.DateTimeField(help_text="Start date of the rental period.")
     end_date = models.DateTimeField(help_text="End date of the rental period.")
     pickup_location = models.CharField(max_length=200, help_text="Location where the bike will be picked up.")
+    pickup_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, validators=[MinValueValidator(Decimal(-90)), MaxValueValidator(Decimal(90))], help_text="Latitude of the pickup point.")
+    pickup_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, validators=[MinValueValidator(Decimal(-180)), MaxValueValidator(Decimal(180))], help_text="Longitude of the pickup point.")
     rental_duration = models.CharField(max_length=10, choices=RENTAL_DURATION_CHOICES, default='daily', help_text="Rental duration.")
     total_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, help_text="Total rental cost.")
     payment_status = models.BooleanField(default=False, help_text="Indicates whether the payment is completed.")
@@ -53,18 +56,20 @@ class Booking(models.Model):
                 name='end_date_after_start_date'
             )
         ]
+        indexes = [
+            # Keyset pagination of booking history (BookingCursorPagination).
+            models.Index(fields=['created_at', 'id'], name='booking_created_at_id_idx'),
+            # Overlap checks: active bookings of a bike intersecting a window.
+            models.Index(fields=['bike', 'status', 'start_date', 'end_date'], name='booking_bike_status_window_idx'),
+            # A user's booking history, newest first (id breaks created_at ties).
+            models.Index(fields=['user', 'created_at', 'id'], name='booking_user_created_idx'),
+        ]
 
     def clean(self):
         """Ensure end_date is after start_date and check for overlapping bookings."""
         if self.end_date <= self.start_date:
             raise ValidationError("End date must be later than start date.")
-        overlapping_bookings = Booking.objects.filter(
-            bike=self.bike,
-            start_date__lt=self.end_date,
-            end_date__gt=self.start_date,
-            status__in=['pending', 'confirmed']
-        ).exclude(id=self.id)  # Exclude the current booking during updates
-        if overlapping_bookings.exists():
+        if find_conflicting_booking(self.bike_id, self.start_date, self.end_date, exclude_id=self.id) is not None:
             raise ValidationError("This bike is already booked for the selected dates.")
 
     def calculate_total_price(self):
@@ -152,10 +157,34 @@ class Feedback(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored rating and booking so the rating signals can apply a delta."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get('rating')
+        instance._loaded_booking_id = instance.__dict__.get('booking_id')
+        return instance
+
     def clean(self):
         """Validate that the rating is between 1 and 5."""
         if not (1 <= self.rating <= 5):
             raise ValidationError("Rating must be between 1 and 5.")
 
     def __str__(self):
-        return f"Feedback by {self.user.username} for Booking {self.booking.id}"
\ No newline at end of file
+        return f"Feedback by {self.user.username} for Booking {self.booking.id}"
+
+class BookingLifecycleRun(models.Model):
+    """Record of one booking lifecycle run; its cutoffs are the high-water marks for the next run."""
+    started_at = models.DateTimeField(help_text="When the run started.")
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="When the run finished.")
+    completed_until = models.DateTimeField(help_text="Bookings ending up to this time have been completed.")
+    cancelled_until = models.DateTimeField(help_text="Unpaid bookings created up to this time have been cancelled.")
+    completed_count = models.PositiveIntegerField(default=0, help_text="Bookings moved to completed.")
+    cancelled_count = models.PositiveIntegerField(default=0, help_text="Stale unpaid bookings cancelled.")
+    duration_ms = models.PositiveIntegerField(default=0, help_text="Wall-clock duration of the run.")
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Lifecycle run at {self.started_at:%Y-%m-%d %H:%M:%S}: {self.completed_count} completed, {self.cancelled_count} cancelled"
@@ -0,0 +1,67 @@
+"""
+Batched rental pricing.
+
+Prices every bike against every candidate window in one pass and returns
+exactly what ``Booking.calculate_total_price`` would for each pair.
+
+Windows are reduced once to column arrays (duration kind, billable days,
+billable hours) and bikes to their price in integer cents plus the derived
+hourly rate. Daily and weekly totals are then integer multiplications (the
+weekly rate is 7 x the daily price, so a weekly total equals price x days);
+only hourly totals need Decimal arithmetic, which is kept identical to the
+model so results match to the cent.
+"""
+from decimal import Decimal
+
+RENTAL_DURATIONS = ('hourly', 'daily', 'weekly')
+
+CENT = Decimal('0.01')
+ZERO = Decimal(0)
+
+
+def window_columns(windows):
+    """
+    Reduce ``(start, end, rental_duration)`` windows to column arrays.
+    Returns (kinds, days, hours).
+    """
+    kinds, days, hours = [], [], []
+    for start, end, rental_duration in windows:
+        delta = end - start
+        kinds.append(rental_duration)
+        days.append(delta.days + 1)
+        hours.append(Decimal(delta.total_seconds() / 3600))
+    return kinds, days, hours
+
+
+def quote_matrix(prices, windows):
+    """
+    Price N bikes x M windows.
+
+    ``prices`` holds each bike's price per day (Decimal or None) and
+    ``windows`` holds ``(start, end, rental_duration)`` tuples. Returns one
+    list of M Decimal totals per bike.
+    """
+    kinds, days, hours = window_columns(windows)
+    matrix = []
+    for price in prices:
+        if not price:
+            matrix.append([ZERO] * len(kinds))
+            continue
+        cents = price * 100
+        # Prices stored on Bike always have two decimal places; anything finer
+        # falls back to Decimal multiplication.
+        cents = int(cents) if cents == cents.to_integral_value() else None
+        hourly_rate = price / 24
+        row = []
+        for kind, day_count, hour_count in zip(kinds, days, hours):
+            if kind == 'hourly':
+                row.append((hourly_rate * hour_count).quantize(CENT))
+            elif kind == 'daily' or kind == 'weekly':
+                if cents is not None:
+                    row.append(Decimal(cents * day_count).scaleb(-2))
+                else:
+                    row.append((price * day_count).quantize(CENT))
+            else:
+                row.append(ZERO)
+        matrix.append(row)
+    return matrix
@@ -1,13 +1,39 @@
+from django.db import IntegrityError
 from rest_framework import serializers
-from .models import Booking
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
+from .availability import bike_write_lock, find_conflicting_booking, is_overlap_violation
+from .exceptions import BookingConflict
+from .models import Booking, Feedback
+from bikes.models import Bike
 from django.utils.timezone import now
 
-class BookingSerializer(serializers.ModelSerializer):
+
+class BikeField(serializers.PrimaryKeyRelatedField):
+    """Resolve bikes from a prefetched ``bikes`` map in the serializer context when one is given."""
+
+    def to_internal_value(self, data):
+        bikes = self.context.get('bikes')
+        if bikes is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            bike = bikes.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if bike is None:
+            self.fail('does_not_exist', pk_value=data)
+        return bike
+
+
+class BookingSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    bike = BikeField(queryset=Bike.objects.all(), help_text="Bike being booked.")
+
     class Meta:
         model = Booking
         fields = [
             'id', 'user', 'bike', 'start_date', 'end_date', 'pickup_location',
-            'rental_duration', 'payment_option', 'total_price', 'payment_status',
+            'pickup_latitude', 'pickup_longitude', 'rental_duration', 'payment_option', 'total_price', 'payment_status',
             'status', 'created_at', 'updated_at', 'is_active'
         ]
         read_only_fields = ['id', 'user', 'total_price', 'payment_status', 'status', 'created_at', 'updated_at', 'is_active']
@@ -25,6 +51,8 @@ class BookingSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data['end_date'] <= data['start_date']:
             raise serializers.ValidationError("End date must be after the start date.")
+        if (data.get('pickup_latitude') is None) != (data.get('pickup_longitude') is None):
+            raise serializers.ValidationError("pickup_latitude and pickup_longitude must be set together.")
         bike = data.get('bike')
         if bike and not bike.availability_status:
             raise serializers.ValidationError("Selected bike is not available for booking.")
@@ -35,4 +63,59 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Pickup location must be at least 3 characters long.")
         if len(value) > 200:
             raise serializers.ValidationError("Pickup location must not exceed 200 characters.")
-        return value
\ No newline at end of file
+        return value
+
+    def create(self, validated_data):
+        return self._save_exclusive(lambda: super(BookingSerializer, self).create(validated_data), validated_data)
+
+    def update(self, instance, validated_data):
+        return self._save_exclusive(lambda: super(BookingSerializer, self).update(instance, validated_data), validated_data, instance)
+
+    def _save_exclusive(self, save, validated_data, instance=None):
+        """
+        Check for overlapping bookings and write inside one transaction.
+        Raises BookingConflict (409) if the window is taken, including when a
+        concurrent writer wins the race and the database constraint rejects the insert.
+        """
+        bike = validated_data.get('bike') or instance.bike
+        start = validated_data.get('start_date') or instance.start_date
+        end = validated_data.get('end_date') or instance.end_date
+        exclude_id = instance.id if instance else None
+        try:
+            with bike_write_lock(bike.id):
+                if find_conflicting_booking(bike.id, start, end, exclude_id=exclude_id) is not None:
+                    raise BookingConflict()
+                return save()
+        except IntegrityError as exc:
+            if is_overlap_violation(exc):
+                raise BookingConflict()
+            raise
+
+
+class QuoteWindowSerializer(serializers.Serializer):
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField()
+    rental_duration = serializers.ChoiceField(choices=Booking.RENTAL_DURATION_CHOICES, required=False,
+                                              help_text="Quote every duration when omitted.")
+
+    def validate(self, data):
+        if data['end_date'] <= data['start_date']:
+            raise serializers.ValidationError("End date must be after the start date.")
+        return data
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    bikes = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=200)
+    windows = QuoteWindowSerializer(many=True, allow_empty=False, max_length=20)
+
+
+class FeedbackSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Feedback
+        fields = ['id', 'booking', 'user', 'rating', 'comments', 'created_at']
+        read_only_fields = ['id', 'booking', 'user', 'created_at']
+
+    def validate_comments(self, value):
+        """Sanitize comments to prevent basic XSS."""
+        from django.utils.html import escape
+        return escape(value) if value else value
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bikes.cache import bump_availability_version
+from bikes.ratings import apply_rating_change, reconcile_ratings
+from .models import Booking, Feedback
+
+@receiver(post_save, sender=Booking)
+def bump_availability_on_save(sender, instance, **kwargs):
+    """
+    Expire cached availability answers once a booking write commits.
+    """
+    transaction.on_commit(bump_availability_version)
+
+@receiver(post_delete, sender=Booking)
+def bump_availability_on_delete(sender, instance, **kwargs):
+    """
+    Expire cached availability answers once a booking delete commits.
+    """
+    transaction.on_commit(bump_availability_version)
+
+
+def _bike_of_booking(booking_id):
+    return Booking.objects.filter(pk=booking_id).values_list('bike_id', flat=True).first()
+
+@receiver(post_save, sender=Feedback)
+def apply_feedback_rating(sender, instance, created, **kwargs):
+    """
+    Apply a new or edited rating to the bike's running rating counters.
+    """
+    if Feedback.booking.is_cached(instance):
+        bike_id = instance.booking.bike_id
+    else:
+        bike_id = _bike_of_booking(instance.booking_id)
+    if created:
+        apply_rating_change(bike_id, new_rating=instance.rating)
+    elif hasattr(instance, '_loaded_rating'):
+        old_booking_id = instance._loaded_booking_id
+        if old_booking_id != instance.booking_id:
+            apply_rating_change(_bike_of_booking(old_booking_id), old_rating=instance._loaded_rating)
+            apply_rating_change(bike_id, new_rating=instance.rating)
+        else:
+            apply_rating_change(bike_id, old_rating=instance._loaded_rating, new_rating=instance.rating)
+    else:
+        # Saved without being loaded first, so the previous rating is unknown.
+        reconcile_ratings([bike_id])
+    instance._loaded_rating, instance._loaded_booking_id = instance.rating, instance.booking_id
+
+@receiver(post_delete, sender=Feedback)
+def remove_feedback_rating(sender, instance, **kwargs):
+    """
+    Take a deleted rating off the bike's running rating counters.
+    """
+    rating = getattr(instance, '_loaded_rating', instance.rating)
+    booking_id = getattr(instance, '_loaded_booking_id', instance.booking_id)
+    apply_rating_change(_bike_of_booking(booking_id), old_rating=rating)
@@ -1,3 +1,373 @@
+import csv
+import io
+import json
+import random
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from benchmarks.utils import seed_bikes, seed_users
+from payment.models import Payment
+from .availability import (
+    OVERLAP_CONSTRAINT, BikeIntervals, find_conflicting_booking, is_overlap_violation,
+)
+from .exports import stream_columnar
+from .lifecycle import run_lifecycle
+from .models import Booking
+from .pricing import RENTAL_DURATIONS, quote_matrix
+from .views import BookingExportView
+
+
+class BookingTestCase(TestCase):
+    """A couple of users and bikes, and helpers to book them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = seed_users(2, prefix='booking-user')
+        cls.bike, cls.other_bike = seed_bikes(cls.user, 2, prefix='booking-bike')
+        cls.origin = (now() + timedelta(days=7)).replace(microsecond=0)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def window(self, day, days=1):
+        start = self.origin + timedelta(days=day)
+        return start, start + timedelta(days=days)
+
+    def book(self, day, days=1, bike=None, status='confirmed', user=None):
+        start, end = self.window(day, days)
+        return Booking.objects.create(user=user or self.user, bike=bike or self.bike, start_date=start, end_date=end,
+                                      pickup_location='Kathmandu', status=status)
+
+    def payload(self, day, days=1, bike=None, **extra):
+        start, end = self.window(day, days)
+        return {'bike': (bike or self.bike).pk, 'start_date': start.isoformat(), 'end_date': end.isoformat(),
+                'pickup_location': 'Kathmandu', 'rental_duration': 'daily', 'payment_option': 'cash_on_delivery',
+                **extra}
+
+
+class AvailabilityTests(BookingTestCase):
+    def test_overlapping_booking_is_refused(self):
+        response = self.client.post('/api/bookings/create/', self.payload(0, 2), format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/bookings/create/', self.payload(1), format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['success'], False)
+        # Back to back is not an overlap.
+        response = self.client.post('/api/bookings/create/', self.payload(2), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_booking_does_not_conflict_with_itself(self):
+        booking = self.book(0, 2)
+        start, end = self.window(1)
+        self.assertEqual(find_conflicting_booking(self.bike.pk, start, end), booking.pk)
+        self.assertIsNone(find_conflicting_booking(self.bike.pk, start, end, exclude_id=booking.pk))
+        # Shrinking the booking to a window it already holds.
+        response = self.client.put(f'/api/bookings/{booking.pk}/update/', self.payload(1), format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.put(f'/api/bookings/{booking.pk}/update/', self.payload(1, bike=self.other_bike),
+                                   format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_cancelled_booking_frees_the_window(self):
+        booking = self.book(0)
+        start, end = self.window(0)
+        self.assertEqual(find_conflicting_booking(self.bike.pk, start, end), booking.pk)
+        # update() sends no signal; the check reads the database every time.
+        Booking.objects.filter(pk=booking.pk).update(status='cancelled')
+        with self.assertNumQueries(1):
+            self.assertIsNone(find_conflicting_booking(self.bike.pk, start, end))
+
+    def test_cancelled_and_completed_bookings_do_not_block(self):
+        self.book(0, status='cancelled')
+        self.book(0, status='completed', bike=self.other_bike)
+        start, end = self.window(0)
+        self.assertIsNone(find_conflicting_booking(self.bike.pk, start, end))
+        self.assertIsNone(find_conflicting_booking(self.other_bike.pk, start, end))
+
+
+class CursorPaginationTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bookings = [self.book(day) for day in range(25)]
+        # Whole runs of bookings sharing a timestamp, as bulk imports produce.
+        stamp = now()
+        Booking.objects.filter(pk__in=[b.pk for b in self.bookings[:12]]).update(created_at=stamp)
+        Booking.objects.filter(pk__in=[b.pk for b in self.bookings[12:]]).update(created_at=stamp - timedelta(hours=1))
+        self.newest_first = list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.append([row['id'] for row in response.json()['results']])
+            url = response.json()[link]
+        return ids
+
+    def test_pages_follow_created_at_and_id(self):
+        pages = self.walk('/api/bookings/?pagination=cursor', 'next')
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), self.newest_first)
+        # And back again from the last page.
+        response = self.client.get('/api/bookings/?pagination=cursor')
+        url = response.json()['next']
+        url = self.client.get(url).json()['next']
+        back = self.walk(self.client.get(url).json()['previous'], 'previous')
+        self.assertEqual(back, [self.newest_first[10:20], self.newest_first[:10]])
+
+    def test_deep_page_uses_no_offset(self):
+        url = self.client.get('/api/bookings/?pagination=cursor&fields=id,status').json()['next']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual([row['id'] for row in response.json()['results']], self.newest_first[10:20])
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'status'})
+        page_query = next(query['sql'] for query in queries if 'bookings_booking' in query['sql'])
+        self.assertNotIn('OFFSET', page_query)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/bookings/?cursor=cD1ub3Bl')
+        self.assertEqual(response.status_code, 404)
+
+
+class OverlapConstraintTests(BookingTestCase):
+    def test_is_overlap_violation(self):
+        self.assertTrue(is_overlap_violation(IntegrityError(
+            f'conflicting key value violates exclusion constraint "{OVERLAP_CONSTRAINT}"')))
+        self.assertFalse(is_overlap_violation(IntegrityError('UNIQUE constraint failed: payment_payment.booking_id')))
+
+    def test_constraint_violation_answers_conflict(self):
+        # A concurrent writer won the race: the check passed, the insert is rejected.
+        violation = IntegrityError(f'conflicting key value violates exclusion constraint "{OVERLAP_CONSTRAINT}"')
+        with mock.patch('bookings.serializers.find_conflicting_booking', return_value=None), \
+                mock.patch('rest_framework.serializers.ModelSerializer.create', side_effect=violation):
+            response = self.client.post('/api/bookings/create/', self.payload(0), format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {
+            'success': False, 'errors': {'non_field_errors': ['This bike is already booked for the selected dates.']},
+        })
+
+    def test_other_integrity_errors_are_not_conflicts(self):
+        with mock.patch('rest_framework.serializers.ModelSerializer.create', side_effect=IntegrityError('NOT NULL')):
+            with self.assertRaises(IntegrityError):
+                self.client.post('/api/bookings/create/', self.payload(0), format='json')
+
+    def test_migration_cancels_overlapping_duplicates(self):
+        migration = import_module('bookings.migrations.0007_booking_no_overlapping_active')
+        # Rows like these predate the constraint; drop it for this test's transaction.
+        with connection.schema_editor() as editor:
+            migration.remove_overlap_constraint(apps, editor)
+        first = self.book(0, 2, status='pending')
+        duplicate = self.book(1, status='pending')
+        pending = self.book(3, 2, status='pending')
+        confirmed = self.book(4, 2)
+        other_bike = self.book(0, 2, bike=self.other_bike)
+        with self.assertLogs(migration.logger, 'WARNING'):
+            migration.cancel_overlapping_bookings(apps, None)
+        statuses = dict(Booking.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[first.pk], 'pending')
+        self.assertEqual(statuses[duplicate.pk], 'cancelled')
+        # A confirmed booking wins over a pending one created before it.
+        self.assertEqual(statuses[pending.pk], 'cancelled')
+        self.assertEqual(statuses[confirmed.pk], 'confirmed')
+        self.assertEqual(statuses[other_bike.pk], 'confirmed')
+
+
+class BatchCreateTests(BookingTestCase):
+    url = '/api/bookings/batch/'
+
+    def test_batch_is_created_together(self):
+        response = self.client.post(self.url, [self.payload(0), self.payload(0, bike=self.other_bike)], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['success'] for result in response.json()['results']], [True, True])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_invalid_item_fails_the_whole_batch(self):
+        response = self.client.post(self.url, {'bookings': [self.payload(0), self.payload(1, pickup_location='x')]},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        first, second = response.json()['results']
+        self.assertEqual(first['success'], False)
+        self.assertIn('message', first)
+        self.assertIn('pickup_location', second['errors'])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_conflicts_are_reported_per_item(self):
+        self.book(0)
+        # The second item overlaps a stored booking, the third an earlier item of the batch.
+        response = self.client.post(self.url, [self.payload(3), self.payload(0), self.payload(3)], format='json')
+        self.assertEqual(response.status_code, 409)
+        results = response.json()['results']
+        self.assertEqual([result['success'] for result in results], [False, False, False])
+        self.assertNotIn('errors', results[0])
+        self.assertEqual(results[1]['errors'], {'non_field_errors': ['This bike is already booked for the selected dates.']})
+        self.assertEqual(results[2]['errors'], results[1]['errors'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_constraint_violation_has_the_same_shape(self):
+        taken = self.book(0)
+        violation = IntegrityError(f'conflicting key value violates exclusion constraint "{OVERLAP_CONSTRAINT}"')
+        # The check ran before a concurrent writer committed the overlapping booking.
+        with mock.patch('bookings.views.find_batch_conflicts', side_effect=[set(), {1}]), \
+                mock.patch.object(Booking.objects, 'bulk_create', side_effect=violation):
+            response = self.client.post(self.url, [self.payload(3), self.payload(0)], format='json')
+        self.assertEqual(response.status_code, 409)
+        results = response.json()['results']
+        self.assertEqual([result['success'] for result in results], [False, False])
+        self.assertIn('non_field_errors', results[1]['errors'])
+        self.assertEqual(list(Booking.objects.values_list('pk', flat=True)), [taken.pk])
+
+
+class LifecycleTests(BookingTestCase):
+    def statuses(self):
+        return list(Booking.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_expired_bookings_complete_in_chunks(self):
+        for day in range(5):
+            self.book(day * 2)
+        self.book(20)
+        self.book(0, status='cancelled', bike=self.other_bike)
+        run = run_lifecycle(chunk_size=2, current_time=self.origin + timedelta(days=10))
+        self.assertEqual(run.completed_count, 5)
+        self.assertEqual(self.statuses(), ['completed'] * 5 + ['confirmed', 'cancelled'])
+
+    def test_stale_unpaid_bookings_are_cancelled(self):
+        unpaid = self.book(0, status='pending')
+        paid = self.book(2, status='pending')
+        Booking.objects.filter(pk=paid.pk).update(payment_status=True)
+        cash = Booking.objects.create(user=self.user, bike=self.other_bike, start_date=self.origin,
+                                      end_date=self.origin + timedelta(days=1), pickup_location='Kathmandu',
+                                      payment_option='cash_on_delivery')
+        payment = Payment.objects.create(booking=unpaid, amount=unpaid.total_price, payment_method='paypal')
+        run = run_lifecycle(chunk_size=1, current_time=now() + timedelta(hours=2))
+        self.assertEqual(run.cancelled_count, 1)
+        self.assertEqual(self.statuses(), ['cancelled', 'pending', 'pending'])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(Booking.objects.get(pk=cash.pk).status, 'pending')
+
+    def test_later_runs_start_from_the_high_water_mark(self):
+        early = self.book(0)
+        run_lifecycle(current_time=self.origin + timedelta(days=3))
+        # Reopened behind the mark: an incremental run does not see it again, a full run does.
+        Booking.objects.filter(pk=early.pk).update(status='confirmed')
+        later = self.book(4)
+        run = run_lifecycle(current_time=self.origin + timedelta(days=6))
+        self.assertEqual(run.completed_count, 1)
+        self.assertEqual(Booking.objects.get(pk=later.pk).status, 'completed')
+        self.assertEqual(Booking.objects.get(pk=early.pk).status, 'confirmed')
+        run = run_lifecycle(full=True, current_time=self.origin + timedelta(days=6))
+        self.assertEqual(run.completed_count, 1)
+        self.assertEqual(Booking.objects.get(pk=early.pk).status, 'completed')
+
+    def test_freed_window_can_be_booked_right_away(self):
+        stale = self.book(0, status='pending')
+        start, end = self.window(0)
+        self.assertEqual(find_conflicting_booking(self.bike.pk, start, end), stale.pk)
+        run_lifecycle(current_time=now() + timedelta(hours=2))
+        response = self.client.post('/api/bookings/create/', self.payload(0), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class ExportTests(BookingTestCase):
+    url = '/api/bookings/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.other.is_staff = True
+        self.other.save(update_fields=['is_staff'])
+        self.client.force_authenticate(self.other)
+        self.bookings = [self.book(0), self.book(2, bike=self.other_bike), self.book(30, status='cancelled')]
+
+    def download(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.download()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="bookings.csv"')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], list(BookingExportView.fields))
+        self.assertEqual([int(row[0]) for row in rows[1:]], [b.pk for b in self.bookings])
+        self.assertEqual(rows[2][4], self.other_bike.name)
+
+    def test_ndjson_and_date_filter(self):
+        start = self.bookings[1].start_date.date().isoformat()
+        response, body = self.download(f'?output=ndjson&start_date={start}')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [b.pk for b in self.bookings[1:]])
+        self.assertEqual(rows[1]['status'], 'cancelled')
+        self.assertEqual(rows[0]['user__username'], self.user.username)
+
+    def test_columnar_chunks(self):
+        fields = ('id', 'status')
+        lines = [json.loads(line) for line in ''.join(
+            stream_columnar(Booking.objects.order_by('id'), fields, chunk_size=2)).splitlines()]
+        self.assertEqual(lines, [
+            {'fields': ['id', 'status']},
+            {'id': [b.pk for b in self.bookings[:2]], 'status': ['confirmed', 'confirmed']},
+            {'id': [self.bookings[2].pk], 'status': ['cancelled']},
+        ])
+
+    def test_unknown_format_and_non_staff(self):
+        self.assertEqual(self.client.get(self.url + '?output=xml').status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class QuoteTests(BookingTestCase):
+    def test_quotes_match_booking_prices(self):
+        rng = random.Random(0)
+        prices = [Decimal('1500.00'), Decimal('999.99'), Decimal('0.01'), Decimal('2750.50'), None]
+        windows = []
+        for _ in range(40):
+            start = self.origin + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            windows.append((start, start + timedelta(minutes=rng.randint(1, 60 * 24 * 40)), rng.choice(RENTAL_DURATIONS)))
+        matrix = quote_matrix(prices, windows)
+        for price, totals in zip(prices, matrix):
+            bike = SimpleNamespace(price_per_day=price)
+            for (start, end, duration), total in zip(windows, totals):
+                booking = Booking(start_date=start, end_date=end, rental_duration=duration)
+                with mock.patch.object(Booking, 'bike', bike):
+                    self.assertEqual(total, booking.calculate_total_price(), (price, start, end, duration))
+
+    def test_quote_endpoint(self):
+        start, end = self.window(0, 3)
+        response = self.client.post('/api/bookings/quote/', {
+            'bikes': [self.bike.pk],
+            'windows': [{'start_date': start.isoformat(), 'end_date': end.isoformat(), 'rental_duration': 'daily'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        quote, = response.json()['data'][0]['quotes']
+        booking = Booking(bike=self.bike, start_date=start, end_date=end, rental_duration='daily')
+        self.assertEqual(Decimal(quote['total_price']), booking.calculate_total_price())
+
 
-# Create your tests here.
+class BikeIntervalsTests(TestCase):
+    def test_overlap_behind_a_long_booking(self):
+        origin = now()
+        day = timedelta(days=1)
+        # A year-long booking, then short ones inside it.
+        rows = [(1, origin, origin + 365 * day)] + [(n, origin + n * day, origin + (n + 1) * day) for n in range(2, 50)]
+        intervals = BikeIntervals(rows)
+        self.assertEqual(intervals.find_overlap(origin + 10 * day, origin + 11 * day), 1)
+        self.assertEqual(intervals.find_overlap(origin + 10 * day, origin + 11 * day, exclude_id=1), 10)
+        self.assertIsNone(intervals.find_overlap(origin + 60 * day, origin + 61 * day, exclude_id=1))
+        self.assertIsNone(intervals.find_overlap(origin - 2 * day, origin))
+        intervals.remove(1)
+        self.assertIsNone(intervals.find_overlap(origin + 60 * day, origin + 61 * day))
+        intervals.add(99, origin + 59 * day, origin + 62 * day)
+        self.assertEqual(intervals.find_overlap(origin + 60 * day, origin + 61 * day), 99)
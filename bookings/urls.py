@@ -1,13 +1,17 @@
 from django.urls import path
 from .views import (
-    BookingListView, BookingCreateView, BookingDetailView,
-    BookingUpdateView, BookingDeleteView
+    BookingListView, BookingCreateView, BookingBatchCreateView, BookingQuoteView, BookingDetailView,
+    BookingUpdateView, BookingDeleteView, BookingFeedbackView, BookingExportView
 )
 
 urlpatterns = [
     path('', BookingListView.as_view(), name='booking-list'),
     path('create/', BookingCreateView.as_view(), name='booking-create'),
+    path('batch/', BookingBatchCreateView.as_view(), name='booking-batch-create'),
+    path('quote/', BookingQuoteView.as_view(), name='booking-quote'),
     path('<int:pk>/', BookingDetailView.as_view(), name='booking-detail'),
     path('<int:pk>/update/', BookingUpdateView.as_view(), name='booking-update'),
     path('<int:pk>/delete/', BookingDeleteView.as_view(), name='booking-delete'),
+    path('<int:pk>/feedback/', BookingFeedbackView.as_view(), name='booking-feedback'),
+    path('export/', BookingExportView.as_view(), name='booking-export'),
 ]
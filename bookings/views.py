@@ -1,20 +1,34 @@
-from payment.serializers import PaymentSerializer
+from bike_rental_service.background import run_in_background
+from bike_rental_service.fieldsets import SparseFieldsetMixin
+from bikes.cache import bump_availability_version
+from payment.models import Payment
+from payment.tasks import prepare_payment
+from bikes.models import Bike
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.urls import reverse
-from .models import Booking
-from .serializers import BookingSerializer
+from .availability import bike_write_lock, find_batch_conflicts, is_overlap_violation
+from .exceptions import BookingConflict
+from .exports import EXPORT_FORMATS, export_response
+from .models import Booking, Feedback
+from .pricing import RENTAL_DURATIONS, quote_matrix
+from .serializers import BookingSerializer, FeedbackSerializer, QuoteRequestSerializer
 from .filters import BookingFilter
+from .pagination import BookingCursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 
 
-class BookingListView(generics.ListAPIView):
+class BookingListView(SparseFieldsetMixin, generics.ListAPIView):
     """
-    List all bookings (admins see all, users see their own).
+    List all bookings (admins see all, users see their own), newest first.
 
     * Requires: Authentication
+    * Optional: pagination=cursor for keyset pagination (follow the next/previous links)
+    * Optional: fields / omit (comma-separated) to choose the returned fields
     * Returns: List of booking data
     """
     serializer_class = BookingSerializer
@@ -22,18 +36,29 @@ class BookingListView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_class = BookingFilter
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = BookingCursorPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+
     def get_queryset(self):
         user = self.request.user
+        queryset = Booking.objects.select_related('bike', 'user').order_by('-created_at', '-id')
         if user.is_staff:  # Admin can see all bookings
-            return Booking.objects.all()
-        return Booking.objects.filter(user=user)  # Users see their own bookings
+            return queryset
+        return queryset.filter(user=user)  # Users see their own bookings
 
 class BookingCreateView(generics.CreateAPIView):
     """
     Create a new booking.
 
     * Requires: Authentication, bike, start_date, end_date, pickup_location, rental_duration, payment_option
-    * Returns: Booking data with optional payment redirect URL
+    * Returns: Booking data with optional payment redirect URL (409 if the bike is already booked)
     """
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
@@ -45,27 +70,158 @@ class BookingCreateView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            self.perform_create(serializer)
-            booking = serializer.instance
+            payment = None
+            try:
+                # Booking and payment stub commit together in one short transaction.
+                with bike_write_lock(serializer.validated_data['bike'].id):
+                    self.perform_create(serializer)
+                    booking = serializer.instance
+                    if booking.payment_option in ['full_online', 'partial_online']:
+                        payment = Payment.objects.create(
+                            booking=booking, amount=booking.total_price, payment_method='paypal'  # Default to PayPal
+                        )
+                        # PayPal form data and notifications are prepared after commit, off the request path.
+                        run_in_background(prepare_payment, payment.id, request.get_host())
+            except BookingConflict as e:
+                return Response({"success": False, "errors": {"non_field_errors": [e.detail]}}, status=e.status_code)
             response_data = {
                 "success": True,
                 "data": serializer.data,
                 "message": "Booking created successfully"
             }
             # Redirect to payment if online payment option is chosen
-            if booking.payment_option in ['full_online', 'partial_online']:
-                payment_data = {
-                    "booking": booking.id,
-                    "payment_method": "paypal"  # Default to PayPal
-                }
-                payment_serializer = PaymentSerializer(data=payment_data)
-                if payment_serializer.is_valid():
-                    payment = payment_serializer.save()
-                    response_data["redirect_url"] = reverse('payment_process', kwargs={'payment_id': payment.id})
-                    response_data["message"] += ". Redirecting to payment."
+            if payment is not None:
+                response_data["redirect_url"] = reverse('payment_process', kwargs={'payment_id': payment.id})
+                response_data["message"] += ". Redirecting to payment."
             return Response(response_data, status=status.HTTP_201_CREATED)
         return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+class BookingBatchCreateView(generics.GenericAPIView):
+    """
+    Create many bookings in one transaction.
+
+    * Requires: Authentication, a list of bookings (same fields as booking creation),
+      either as the request body or under a "bookings" key
+    * Returns: One result per booking in the shape of the single-create response.
+      Nothing is created unless every booking is valid and available.
+    """
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    max_batch_size = 100
+
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"success": False, "message": "Expected a non-empty list of bookings."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({"success": False, "message": f"At most {self.max_batch_size} bookings per batch."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Resolve every referenced bike with one query.
+        bike_ids = set()
+        for item in items:
+            if isinstance(item, dict) and str(item.get('bike', '')).isdigit():
+                bike_ids.add(int(item['bike']))
+        bikes = Bike.objects.in_bulk(bike_ids)
+        context = self.get_serializer_context()
+        context['bikes'] = bikes
+
+        item_serializers = [self.get_serializer(data=item, context=context) for item in items]
+        results = [None] * len(items)
+        for position, serializer in enumerate(item_serializers):
+            if not serializer.is_valid():
+                results[position] = {"success": False, "errors": serializer.errors}
+        if any(results):
+            return self._failed(results, status.HTTP_400_BAD_REQUEST)
+
+        bookings = [Booking(user=request.user, **serializer.validated_data) for serializer in item_serializers]
+        for booking in bookings:
+            booking.total_price = booking.calculate_total_price()
+        windows = [(position, booking.bike_id, booking.start_date, booking.end_date)
+                   for position, booking in enumerate(bookings)]
+        try:
+            with bike_write_lock({booking.bike_id for booking in bookings}):
+                conflicts = find_batch_conflicts(windows)
+                if conflicts:
+                    return self._conflict(results, conflicts)
+                Booking.objects.bulk_create(bookings)
+                payments = Payment.objects.bulk_create([
+                    Payment(booking=booking, amount=booking.total_price, payment_method='paypal')
+                    for booking in bookings
+                    if booking.payment_option in ['full_online', 'partial_online']
+                ])
+                for payment in payments:
+                    run_in_background(prepare_payment, payment.id, request.get_host())
+                # bulk_create skips post_save, so expire cached availability directly.
+                transaction.on_commit(bump_availability_version)
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            # A concurrent writer took a window after the check; the winner has committed, so look again.
+            return self._conflict(results, find_batch_conflicts(windows) or range(len(bookings)))
+
+        payment_ids = {payment.booking_id: payment.id for payment in payments}
+        for position, booking in enumerate(bookings):
+            result = {
+                "success": True,
+                "data": BookingSerializer(booking, context=context).data,
+                "message": "Booking created successfully"
+            }
+            if booking.id in payment_ids:
+                result["redirect_url"] = reverse('payment_process', kwargs={'payment_id': payment_ids[booking.id]})
+                result["message"] += ". Redirecting to payment."
+            results[position] = result
+        return Response({"success": True, "results": results}, status=status.HTTP_201_CREATED)
+
+    def _conflict(self, results, conflicts):
+        for position in conflicts:
+            results[position] = {"success": False, "errors": {"non_field_errors": [BookingConflict.default_detail]}}
+        return self._failed(results, status.HTTP_409_CONFLICT)
+
+    def _failed(self, results, status_code):
+        # Valid items are reported as not created because the batch is all-or-nothing.
+        results = [result or {"success": False, "message": "Not created because other bookings in the batch failed."}
+                   for result in results]
+        return Response({"success": False, "results": results}, status=status_code)
+
+class BookingQuoteView(generics.GenericAPIView):
+    """
+    Quote rental prices for several bikes across several candidate windows.
+
+    * Requires: None (public access), bikes (list of ids), windows (start_date, end_date, optional rental_duration)
+    * Returns: Total price per bike, window and rental duration
+    """
+    serializer_class = QuoteRequestSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        windows = []
+        for window in serializer.validated_data['windows']:
+            durations = [window['rental_duration']] if 'rental_duration' in window else RENTAL_DURATIONS
+            windows.extend((window['start_date'], window['end_date'], duration) for duration in durations)
+        bikes = list(
+            Bike.objects.filter(pk__in=serializer.validated_data['bikes'], is_approved=True)
+            .order_by('pk').values_list('pk', 'price_per_day')
+        )
+        matrix = quote_matrix([price for _, price in bikes], windows)
+
+        data = []
+        for (bike_id, _), totals in zip(bikes, matrix):
+            data.append({
+                "bike": bike_id,
+                "quotes": [
+                    {"start_date": start, "end_date": end, "rental_duration": duration, "total_price": f"{total:.2f}"}
+                    for (start, end, duration), total in zip(windows, totals)
+                ],
+            })
+        return Response({"success": True, "data": data}, status=status.HTTP_200_OK)
+
 class BookingDetailView(generics.RetrieveAPIView):
     """
         Retrieve details of a specific booking.
@@ -101,6 +257,8 @@ class BookingUpdateView(generics.UpdateAPIView):
     def update(self, request, *args, **kwargs):
         try:
             return super().update(request, *args, **kwargs)
+        except BookingConflict as e:
+            return Response({"success": False, "message": "Failed to update booking", "details": str(e.detail)}, status=e.status_code)
         except Exception as e:
             return Response(
                 {"success": False, "message": "Failed to update booking", "details": str(e)},
@@ -123,4 +281,83 @@ class BookingDeleteView(generics.DestroyAPIView):
         user = self.request.user
         if user.is_staff:
             return Booking.objects.all()  # Admin can delete any booking
-        return Booking.objects.filter(user=user)  # Users can delete only their own bookings
\ No newline at end of file
+        return Booking.objects.filter(user=user)  # Users can delete only their own bookings
+
+class BookingFeedbackView(generics.GenericAPIView):
+    """
+    Rate a completed booking and manage that rating.
+
+    * Requires: Authentication (only the user who made the booking)
+    * POST: rating (1-5), optional comments; only once the booking is completed
+    * GET / PATCH / DELETE: the feedback left for the booking
+    * Returns: Feedback data; the bike's rating counters are updated in the same transaction
+    """
+    serializer_class = FeedbackSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_booking(self):
+        return get_object_or_404(Booking, pk=self.kwargs['pk'], user=self.request.user)
+
+    def get_object(self):
+        return get_object_or_404(Feedback.objects.select_related('booking'), booking=self.get_booking())
+
+    def get(self, request, *args, **kwargs):
+        return Response({"success": True, "data": self.get_serializer(self.get_object()).data})
+
+    def post(self, request, *args, **kwargs):
+        booking = self.get_booking()
+        if booking.status != 'completed':
+            return Response({"success": False, "message": "Only completed bookings can be rated."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if Feedback.objects.filter(booking=booking).exists():
+            return Response({"success": False, "message": "This booking has already been rated."},
+                            status=status.HTTP_409_CONFLICT)
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                serializer.save(booking=booking, user=request.user)
+        except IntegrityError:
+            return Response({"success": False, "message": "This booking has already been rated."},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({"success": True, "data": serializer.data}, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object(), data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            serializer.save()
+        return Response({"success": True, "data": serializer.data})
+
+    def delete(self, request, *args, **kwargs):
+        with transaction.atomic():
+            self.get_object().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class BookingExportView(APIView):
+    """
+    Stream every booking for finance.
+
+    * Requires: Admin authentication
+    * Optional: output=csv|ndjson|columnar (default csv), start_date, end_date
+    * Returns: Streaming file download
+    """
+    permission_classes = [IsAdminUser]
+    fields = (
+        'id', 'user_id', 'user__username', 'bike_id', 'bike__name', 'start_date', 'end_date',
+        'pickup_location', 'rental_duration', 'payment_option', 'total_price', 'payment_status',
+        'status', 'is_active', 'created_at', 'updated_at',
+    )
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"success": False, "message": f"Unsupported output format: {export_format}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filterset = BookingFilter(request.query_params, queryset=Booking.objects.order_by('id'))
+        if not filterset.is_valid():
+            return Response({"success": False, "errors": filterset.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(filterset.qs, self.fields, export_format, 'bookings')
+
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from payment.models import Payment
+from payment.models import IpnNotification, Payment
 
 # Register your models here.
 admin.site.register(Payment)
+
+
+@admin.register(IpnNotification)
+class IpnNotificationAdmin(admin.ModelAdmin):
+    list_display = ('txn_id', 'payment_status', 'invoice', 'received_at', 'processed_at', 'outcome')
+    list_filter = ('outcome', 'payment_status')
+    search_fields = ('txn_id', 'invoice')
@@ -0,0 +1,160 @@
+"""
+Owner earnings ledger and rollups.
+
+Every completed payment appends one ``EarningsEntry`` for the owner of the
+booked bike, in the same transaction that completes the payment. Nothing
+else is written on that path, so concurrent payments of one owner never
+contend on a shared counter row.
+
+``fold_earnings`` folds new entries into per-owner daily and monthly
+``EarningsRollup`` rows, reading the ledger from the high-water mark kept
+in ``EarningsRollupState``. It runs on the background worker after
+entries are recorded and from the ``fold_earnings`` command. Ledger ids
+are allocated before commit, so an entry can become visible after a
+higher id was already folded; such gaps below the mark are remembered and
+re-checked on later folds until ``EARNINGS_GAP_TIMEOUT`` seconds pass
+(a rolled-back insert leaves a gap that never fills).
+
+The owner dashboard reads only the rollups, so its cost depends on the
+number of periods shown, not on the number of bookings.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from bike_rental_service.background import run_coalesced_in_background
+from .models import EarningsEntry, EarningsRollup, EarningsRollupState
+
+
+def record_earnings(payments, earned_at=None):
+    """
+    Append ledger entries for the completed payments in `payments` that do
+    not have one yet. Returns the number of entries written.
+    """
+    earned_at = earned_at or timezone.now()
+    rows = payments.filter(status='completed', earnings_entry__isnull=True).values_list(
+        'id', 'booking_id', 'booking__bike_id', 'booking__bike__owner_id', 'amount',
+    )
+    entries = [
+        EarningsEntry(payment_id=payment_id, booking_id=booking_id, bike_id=bike_id, owner_id=owner_id,
+                      amount=amount, earned_at=earned_at)
+        for payment_id, booking_id, bike_id, owner_id, amount in rows
+    ]
+    if entries:
+        EarningsEntry.objects.bulk_create(entries, ignore_conflicts=True)
+        run_coalesced_in_background(fold_earnings)
+    return len(entries)
+
+
+def period_starts(earned_at):
+    """{period: first day} of the rollup periods a moment falls in, in the site's time zone."""
+    day = timezone.localtime(earned_at).date()
+    return {'day': day, 'month': day.replace(day=1)}
+
+
+def _apply(entries):
+    """Add `entries` ((owner_id, amount, earned_at) tuples) to the rollups."""
+    deltas = defaultdict(lambda: [0, 0])
+    for owner_id, amount, earned_at in entries:
+        for period, start in period_starts(earned_at).items():
+            delta = deltas[(owner_id, period, start)]
+            delta[0] += 1
+            delta[1] += amount
+    if not deltas:
+        return
+
+    existing = EarningsRollup.objects.filter(
+        owner_id__in={owner_id for owner_id, _, _ in deltas},
+        period_start__in={start for _, _, start in deltas},
+    )
+    to_update = []
+    for rollup in existing:
+        delta = deltas.pop((rollup.owner_id, rollup.period, rollup.period_start), None)
+        if delta is not None:
+            rollup.bookings += delta[0]
+            rollup.earnings += delta[1]
+            to_update.append(rollup)
+    EarningsRollup.objects.bulk_update(to_update, ['bookings', 'earnings'], batch_size=1000)
+    EarningsRollup.objects.bulk_create([
+        EarningsRollup(owner_id=owner_id, period=period, period_start=start, bookings=count, earnings=amount)
+        for (owner_id, period, start), (count, amount) in deltas.items()
+    ], batch_size=1000)
+
+
+def _fold_chunk(chunk_size, current_time):
+    """Fold one chunk of new entries plus any gaps that filled in; return the number folded."""
+    with transaction.atomic():
+        # The row lock serializes folds, so no entry is added to the rollups twice.
+        state, _ = EarningsRollupState.objects.select_for_update().get_or_create(pk=1)
+        columns = ('id', 'owner_id', 'amount', 'earned_at')
+        gaps = dict(state.pending_gaps)
+        filled = list(EarningsEntry.objects.filter(id__in=[int(gap) for gap in gaps]).values_list(*columns))
+        rows = list(EarningsEntry.objects.filter(id__gt=state.folded_until).order_by('id')
+                    .values_list(*columns)[:chunk_size])
+        if not filled and not rows and not gaps:
+            return 0
+
+        for entry_id, *_ in filled:
+            del gaps[str(entry_id)]
+        expected = state.folded_until + 1
+        for entry_id, *_ in rows:
+            gaps.update((str(gap), current_time.isoformat()) for gap in range(expected, entry_id))
+            expected = entry_id + 1
+        timeout = timedelta(seconds=getattr(settings, 'EARNINGS_GAP_TIMEOUT', 600))
+        gaps = {gap: seen for gap, seen in gaps.items()
+                if current_time - datetime.fromisoformat(seen) < timeout}
+
+        _apply([row[1:] for row in filled + rows])
+        if rows:
+            state.folded_until = rows[-1][0]
+        state.pending_gaps = gaps
+        state.save()
+        return len(filled) + len(rows)
+
+
+def fold_earnings(chunk_size=5000, full=False):
+    """
+    Fold ledger entries added since the last fold into the rollups; with
+    ``full=True`` rebuild every rollup from the whole ledger. Returns the
+    number of entries folded.
+    """
+    if full:
+        with transaction.atomic():
+            EarningsRollupState.objects.select_for_update().get_or_create(pk=1)
+            EarningsRollup.objects.all().delete()
+            EarningsRollupState.objects.filter(pk=1).update(folded_until=0, pending_gaps={})
+    folded = 0
+    while True:
+        count = _fold_chunk(chunk_size, timezone.now())
+        if not count:
+            return folded
+        folded += count
+
+
+def earnings_dashboard(owner_id, period, start, end):
+    """An owner's rollups for `period` between two dates (inclusive), plus totals."""
+    rollups = EarningsRollup.objects.filter(owner_id=owner_id, period=period)
+    series = list(rollups.filter(period_start__range=(start, end)).order_by('period_start')
+                  .values('period_start', 'bookings', 'earnings'))
+    lifetime = list(EarningsRollup.objects.filter(owner_id=owner_id, period='month').values_list('bookings', 'earnings'))
+    state = EarningsRollupState.objects.filter(pk=1).values('folded_until', 'updated_at').first() or {}
+    return {
+        'owner': owner_id,
+        'period': period,
+        'start': start,
+        'end': end,
+        'totals': {
+            'bookings': sum(row['bookings'] for row in series),
+            'earnings': sum((row['earnings'] for row in series), Decimal('0.00')),
+        },
+        'lifetime': {
+            'bookings': sum(bookings for bookings, _ in lifetime),
+            'earnings': sum((earnings for _, earnings in lifetime), Decimal('0.00')),
+        },
+        'series': series,
+        'updated_at': state.get('updated_at'),
+    }
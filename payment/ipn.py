@@ -0,0 +1,153 @@
+"""
+Queued PayPal IPN processing.
+
+django-paypal stores and verifies each notification and then sends
+``valid_ipn_received``. The receiver here only records it in the
+``IpnNotification`` queue with a single INSERT that ignores duplicates
+(PayPal resends a notification until it is acknowledged), so the
+acknowledgement goes back to PayPal quickly even during retry storms.
+
+The background worker drains the queue in batches. Each batch looks up
+its payments with one query and applies every notification with a
+handful of set-based UPDATEs instead of a ``get()`` and ``save()`` per
+notification, then appends the owners' earnings ledger entries for the
+completed payments (see payment.earnings). On PostgreSQL the batch is
+claimed with ``SKIP LOCKED`` so several processes can drain the queue at
+once. ``process_ipn_queue`` can
+also be run from the ``process_ipn_queue`` command to catch up on
+notifications queued before a restart.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, F, Max, Min, Value, When
+from django.utils.timezone import now
+
+from bike_rental_service.background import run_coalesced_in_background
+from bookings.models import Booking
+from .earnings import record_earnings
+from .models import IpnNotification, Payment
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = 'Completed'
+FAILED = 'Failed'
+
+def enqueue_ipn(ipn_obj):
+    """Queue a verified IPN for processing; duplicates of a queued notification are dropped."""
+    if not ipn_obj.txn_id:
+        return
+    IpnNotification.objects.bulk_create([IpnNotification(
+        txn_id=ipn_obj.txn_id,
+        payment_status=ipn_obj.payment_status or '',
+        invoice=ipn_obj.invoice or '',
+        ipn_id=ipn_obj.pk,
+    )], ignore_conflicts=True)
+    run_coalesced_in_background(process_ipn_queue)
+
+
+def _booking_id(invoice):
+    try:
+        return int(invoice)
+    except (TypeError, ValueError):
+        return None
+
+
+def _process_batch(batch_size, current_time):
+    """Claim and apply up to `batch_size` queued notifications; return their outcomes."""
+    pending = IpnNotification.objects.filter(processed_at__isnull=True).order_by('received_at', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        pending = pending.select_for_update(skip_locked=True)
+    rows = list(pending.values_list('id', 'txn_id', 'payment_status', 'invoice')[:batch_size])
+    if not rows:
+        return None
+
+    booking_ids = {_booking_id(invoice) for _, _, _, invoice in rows} - {None}
+    payments = set(Payment.objects.filter(booking_id__in=booking_ids).values_list('booking_id', flat=True))
+    # transaction_id is unique, so a txn_id already recorded on another payment cannot be applied.
+    taken = dict(Payment.objects.filter(transaction_id__in={txn_id for _, txn_id, _, _ in rows})
+                 .values_list('transaction_id', 'booking_id'))
+
+    outcomes = {outcome: [] for outcome, _ in IpnNotification.OUTCOME_CHOICES}
+    completions, failures = {}, set()
+    for notification_id, txn_id, payment_status, invoice in rows:
+        booking_id = _booking_id(invoice)
+        if payment_status not in (COMPLETED, FAILED):
+            outcome = 'ignored'
+        elif booking_id not in payments:
+            logger.warning("IPN %s %s: no payment for invoice %r", txn_id, payment_status, invoice)
+            outcome = 'missing'
+        elif payment_status == COMPLETED:
+            if taken.get(txn_id, booking_id) != booking_id:
+                logger.warning("IPN %s: transaction already recorded on booking %s", txn_id, taken[txn_id])
+                outcome = 'conflict'
+            elif booking_id in completions:
+                outcome = 'ignored'
+            else:
+                completions[booking_id] = txn_id
+                outcome = 'completed'
+        else:
+            failures.add(booking_id)
+            outcome = 'failed'
+        outcomes[outcome].append(notification_id)
+
+    if completions:
+        Payment.objects.filter(booking_id__in=completions).update(
+            status='completed',
+            transaction_id=Case(
+                *[When(booking_id=booking_id, then=Value(txn_id)) for booking_id, txn_id in completions.items()],
+                output_field=CharField(),
+            ),
+            updated_at=current_time,
+        )
+        Booking.objects.filter(pk__in=completions, payment_status=False).update(
+            payment_status=True, updated_at=current_time,
+        )
+        record_earnings(Payment.objects.filter(booking_id__in=completions), earned_at=current_time)
+    # A failure never overrides a completion, whether earlier or in the same batch.
+    failures -= completions.keys()
+    if failures:
+        Payment.objects.filter(booking_id__in=failures).exclude(status='completed').update(
+            status='failed', updated_at=current_time,
+        )
+
+    for outcome, ids in outcomes.items():
+        if ids:
+            IpnNotification.objects.filter(pk__in=ids).update(processed_at=current_time, outcome=outcome)
+    return Counter({outcome: len(ids) for outcome, ids in outcomes.items() if ids})
+
+
+def process_ipn_queue(batch_size=500, max_batches=None):
+    """Apply queued notifications until the queue is empty; return a count per outcome."""
+    totals, batches = Counter(), 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            outcomes = _process_batch(batch_size, now())
+        if outcomes is None:
+            break
+        totals.update(outcomes)
+        batches += 1
+    if totals:
+        logger.info("Processed %d IPN notifications: %s", sum(totals.values()), dict(totals))
+    return totals
+
+
+def ipn_queue_stats(window_seconds=3600):
+    """Queue depth and lag, plus throughput and worst processing delay over the last `window_seconds`."""
+    current_time = now()
+    pending = IpnNotification.objects.filter(processed_at__isnull=True).aggregate(
+        depth=Count('id'), oldest=Min('received_at'),
+    )
+    recent = IpnNotification.objects.filter(
+        processed_at__gte=current_time - timedelta(seconds=window_seconds),
+    ).aggregate(processed=Count('id'), max_delay=Max(F('processed_at') - F('received_at')))
+    return {
+        'depth': pending['depth'],
+        'oldest_received_at': pending['oldest'],
+        'lag_seconds': (current_time - pending['oldest']).total_seconds() if pending['oldest'] else 0.0,
+        'window_seconds': window_seconds,
+        'processed': recent['processed'],
+        'max_processing_seconds': recent['max_delay'].total_seconds() if recent['max_delay'] else 0.0,
+    }
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payment.earnings import fold_earnings
+
+
+class Command(BaseCommand):
+    help = "Fold new owner earnings ledger entries into the daily and monthly rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Ledger entries folded per transaction.")
+        parser.add_argument('--full', action='store_true', help="Rebuild every rollup from the whole ledger.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        folded = fold_earnings(chunk_size=options['chunk_size'], full=options['full'])
+        self.stdout.write(f"folded={folded} duration={(time.perf_counter() - started) * 1000:.0f}ms")
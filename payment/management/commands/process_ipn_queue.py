@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payment.ipn import ipn_queue_stats, process_ipn_queue
+
+
+class Command(BaseCommand):
+    help = "Apply queued PayPal IPN notifications to their payments in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Notifications applied per transaction.")
+        parser.add_argument('--stats', action='store_true', help="Only report queue depth and lag.")
+        parser.add_argument('--loop', action='store_true', help="Keep running every --interval seconds.")
+        parser.add_argument('--interval', type=int, default=30, help="Seconds between runs with --loop.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = ipn_queue_stats()
+            self.stdout.write(
+                f"depth={stats['depth']} lag={stats['lag_seconds']:.1f}s "
+                f"processed_last_hour={stats['processed']} max_delay={stats['max_processing_seconds']:.1f}s"
+            )
+            return
+        while True:
+            started = time.perf_counter()
+            outcomes = process_ipn_queue(batch_size=options['batch_size'])
+            summary = ' '.join(f"{outcome}={count}" for outcome, count in sorted(outcomes.items())) or 'queue empty'
+            self.stdout.write(f"{summary} duration={(time.perf_counter() - started) * 1000:.0f}ms")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
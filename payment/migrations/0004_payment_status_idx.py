@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_booking_hot_path_indexes'),
+        ('payment', '0003_alter_payment_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status'], name='payment_status_idx'),
+        ),
+    ]
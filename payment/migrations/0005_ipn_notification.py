@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_payment_status_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IpnNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txn_id', models.CharField(help_text='PayPal transaction ID.', max_length=255)),
+                ('payment_status', models.CharField(help_text='PayPal payment status, e.g. Completed.', max_length=255)),
+                ('invoice', models.CharField(blank=True, help_text='Invoice sent with the payment (the booking ID).', max_length=255)),
+                ('ipn_id', models.PositiveBigIntegerField(blank=True, help_text='ID of the stored PayPalIPN.', null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True, help_text='When the notification was queued.')),
+                ('processed_at', models.DateTimeField(blank=True, help_text='When the notification was applied.', null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('completed', 'Payment completed'), ('failed', 'Payment failed'), ('ignored', 'Status not acted on'), ('missing', 'No matching payment'), ('conflict', 'Transaction ID already used by another payment')], help_text='What processing did.', max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at', 'id'], name='ipn_notification_pending_idx'), models.Index(fields=['processed_at'], name='ipn_notification_processed_idx')],
+                'constraints': [models.UniqueConstraint(fields=('txn_id', 'payment_status'), name='ipn_notification_unique_txn')],
+            },
+        ),
+    ]
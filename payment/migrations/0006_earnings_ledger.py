@@ -0,0 +1,66 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_completed_payments(apps, schema_editor):
+    """Ledger entries for payments completed before the ledger existed; fold_earnings builds the rollups."""
+    Payment = apps.get_model('payment', 'Payment')
+    EarningsEntry = apps.get_model('payment', 'EarningsEntry')
+    rows = Payment.objects.filter(status='completed').order_by('id').values_list(
+        'id', 'booking_id', 'booking__bike_id', 'booking__bike__owner_id', 'amount', 'updated_at',
+    )
+    EarningsEntry.objects.bulk_create([
+        EarningsEntry(payment_id=payment_id, booking_id=booking_id, bike_id=bike_id, owner_id=owner_id,
+                      amount=amount, earned_at=earned_at)
+        for payment_id, booking_id, bike_id, owner_id, amount, earned_at in rows.iterator(chunk_size=5000)
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_ipn_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarningsRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folded_until', models.PositiveBigIntegerField(default=0, help_text='Highest folded EarningsEntry id.')),
+                ('pending_gaps', models.JSONField(blank=True, default=dict, help_text='Unfolded ids below folded_until that may still commit, with when they were first missed.')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the rollups were last folded.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EarningsEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.PositiveBigIntegerField(help_text='Booking the payment was for.')),
+                ('bike_id', models.PositiveBigIntegerField(help_text='Bike that was booked.')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Amount earned.', max_digits=10)),
+                ('earned_at', models.DateTimeField(help_text='When the payment completed.')),
+                ('owner', models.ForeignKey(help_text='Owner of the booked bike.', on_delete=django.db.models.deletion.PROTECT, related_name='earnings_entries', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.OneToOneField(help_text='Completed payment.', on_delete=django.db.models.deletion.PROTECT, related_name='earnings_entry', to='payment.payment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EarningsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], help_text='Length of the period.', max_length=5)),
+                ('period_start', models.DateField(help_text='First day of the period.')),
+                ('bookings', models.PositiveIntegerField(default=0, help_text='Paid bookings in the period.')),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, help_text='Earnings in the period.', max_digits=14)),
+                ('owner', models.ForeignKey(help_text='Bike owner.', on_delete=django.db.models.deletion.CASCADE, related_name='earnings_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'period', 'period_start'), name='earnings_rollup_unique_period')],
+            },
+        ),
+        migrations.RunPython(record_completed_payments, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from bookings.models import Booking  # Import the Booking model from the Bookings app
 
@@ -55,6 +56,19 @@ class Payment(models.Model):
         help_text="Timestamp for the last update."
     )
 
+    class Meta:
+        indexes = [
+            # Pending/failed payment sweeps and status filters.
+            models.Index(fields=['status'], name='payment_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored status so completing a payment is recorded in the earnings ledger once."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     def __str__(self):
         return f"Payment {self.id} for Booking {self.booking.id} via {self.payment_method}"
 
@@ -87,4 +101,98 @@ class Payment(models.Model):
         if self.is_successful():
             self.booking.payment_status = True
             self.booking.save(update_fields=['payment_status'])
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class IpnNotification(models.Model):
+    """
+    A PayPal IPN waiting to be applied to its payment (see payment.ipn).
+
+    PayPal retries a notification until it is acknowledged, so each
+    (txn_id, payment_status) pair is stored once; a later status of the
+    same transaction (e.g. Pending then Completed) is a new entry.
+    """
+    OUTCOME_CHOICES = [
+        ('completed', 'Payment completed'),
+        ('failed', 'Payment failed'),
+        ('ignored', 'Status not acted on'),
+        ('missing', 'No matching payment'),
+        ('conflict', 'Transaction ID already used by another payment'),
+    ]
+
+    txn_id = models.CharField(max_length=255, help_text="PayPal transaction ID.")
+    payment_status = models.CharField(max_length=255, help_text="PayPal payment status, e.g. Completed.")
+    invoice = models.CharField(max_length=255, blank=True, help_text="Invoice sent with the payment (the booking ID).")
+    ipn_id = models.PositiveBigIntegerField(null=True, blank=True, help_text="ID of the stored PayPalIPN.")
+    received_at = models.DateTimeField(auto_now_add=True, help_text="When the notification was queued.")
+    processed_at = models.DateTimeField(null=True, blank=True, help_text="When the notification was applied.")
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True, help_text="What processing did.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['txn_id', 'payment_status'], name='ipn_notification_unique_txn'),
+        ]
+        indexes = [
+            # The worker's queue scan and the depth/lag metrics.
+            models.Index(fields=['received_at', 'id'], name='ipn_notification_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+            # Recent throughput and lag.
+            models.Index(fields=['processed_at'], name='ipn_notification_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"IPN {self.txn_id} {self.payment_status} for invoice {self.invoice}"
+
+
+class EarningsEntry(models.Model):
+    """
+    Append-only record of what an owner earned from one completed payment
+    (see payment.earnings). Entries are never updated or deleted; the
+    rollups are folded from them in id order.
+    """
+    payment = models.OneToOneField(
+        Payment, on_delete=models.PROTECT, related_name='earnings_entry', help_text="Completed payment."
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='earnings_entries', help_text="Owner of the booked bike."
+    )
+    booking_id = models.PositiveBigIntegerField(help_text="Booking the payment was for.")
+    bike_id = models.PositiveBigIntegerField(help_text="Bike that was booked.")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Amount earned.")
+    earned_at = models.DateTimeField(help_text="When the payment completed.")
+
+    def __str__(self):
+        return f"{self.amount} for owner {self.owner_id} from payment {self.payment_id}"
+
+
+class EarningsRollup(models.Model):
+    """Per-owner earnings and booking count for one day or month."""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='earnings_rollups', help_text="Bike owner."
+    )
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES, help_text="Length of the period.")
+    period_start = models.DateField(help_text="First day of the period.")
+    bookings = models.PositiveIntegerField(default=0, help_text="Paid bookings in the period.")
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Earnings in the period.")
+
+    class Meta:
+        constraints = [
+            # Also serves the dashboard's owner/period/date range scans.
+            models.UniqueConstraint(fields=['owner', 'period', 'period_start'], name='earnings_rollup_unique_period'),
+        ]
+
+    def __str__(self):
+        return f"Owner {self.owner_id} {self.period} {self.period_start}: {self.earnings}"
+
+
+class EarningsRollupState(models.Model):
+    """High-water mark of the rollups: every ledger entry up to `folded_until` is included."""
+    folded_until = models.PositiveBigIntegerField(default=0, help_text="Highest folded EarningsEntry id.")
+    pending_gaps = models.JSONField(
+        default=dict, blank=True, help_text="Unfolded ids below folded_until that may still commit, with when they were first missed."
+    )
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the rollups were last folded.")
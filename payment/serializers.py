@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
 from .models import Payment
 from bookings.models import Booking
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = '__all__'
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .earnings import record_earnings
+from .models import Payment
+
+@receiver(post_save, sender=Payment)
+def record_completed_payment(sender, instance, **kwargs):
+    """
+    Append the owner's ledger entry when a payment is saved as completed.
+    """
+    if instance.status == 'completed' and getattr(instance, '_loaded_status', None) != 'completed':
+        record_earnings(Payment.objects.filter(pk=instance.pk))
@@ -0,0 +1,44 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+PAYPAL_FORM_CACHE_TIMEOUT = 60 * 60
+
+
+def paypal_form_cache_key(payment_id):
+    return f"payment:paypal-form:{payment_id}"
+
+
+def paypal_form_data(payment, host):
+    """Initial data for the PayPal Payments Standard form of a payment."""
+    return {
+        "business": settings.PAYPAL_RECEIVER_EMAIL,
+        "amount": f"{payment.amount:.2f}",
+        "item_name": f"Bike Rental for {payment.booking.bike.name}",
+        "invoice": str(payment.booking_id),
+        "currency_code": "USD",
+        "notify_url": f"http://{host}{reverse('paypal-ipn')}",
+        "return_url": f"http://{host}{reverse('payment-done')}",
+        "cancel_return": f"http://{host}{reverse('payment-canceled')}",
+    }
+
+
+def prepare_payment(payment_id, host):
+    """
+    Prepare a freshly created payment off the request path: build and cache
+    the PayPal form data and notify about the pending payment.
+    """
+    payment = Payment.objects.select_related('booking__bike', 'booking__user').filter(pk=payment_id).first()
+    if payment is None:
+        return
+    cache.set(paypal_form_cache_key(payment.id), paypal_form_data(payment, host), PAYPAL_FORM_CACHE_TIMEOUT)
+    logger.info(
+        "Payment %s of %s pending for booking %s by %s",
+        payment.id, payment.amount, payment.booking_id, payment.booking.user.username,
+    )
@@ -1,3 +1,288 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import now
+from paypal.standard.ipn.models import PayPalIPN
+from paypal.standard.ipn.signals import valid_ipn_received
+from rest_framework.test import APIClient
+
+from bike_rental_service.background import BackgroundWorker, run_in_background, worker
+from benchmarks.utils import seed_bikes, seed_users
+from bookings.models import Booking
+from .earnings import fold_earnings, record_earnings
+from .ipn import ipn_queue_stats, process_ipn_queue
+from .models import EarningsEntry, EarningsRollup, EarningsRollupState, IpnNotification, Payment
+from .tasks import paypal_form_cache_key, prepare_payment
+
+
+class PaymentExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff, cls.user = seed_users(2, prefix='payment-export-user')
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=['is_staff'])
+        bike = seed_bikes(cls.user, 1, prefix='payment-export-bike')[0]
+        origin = now() + timedelta(days=3)
+        cls.payments = []
+        for day in (0, 10):
+            booking = Booking.objects.create(user=cls.user, bike=bike, start_date=origin + timedelta(days=day),
+                                             end_date=origin + timedelta(days=day + 1), pickup_location='Kathmandu')
+            cls.payments.append(Payment.objects.create(booking=booking, amount=booking.total_price,
+                                                       payment_method='paypal'))
+
+    def test_payments_of_bookings_in_the_window(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        start = self.payments[1].booking.start_date.date().isoformat()
+        response = client.get(f'/api/payments/export/?output=ndjson&start_date={start}')
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.payments[1].pk])
+        self.assertEqual(rows[0]['booking__user__username'], self.user.username)
+        self.assertEqual(rows[0]['status'], 'pending')
+
+
+class PaymentPreparationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1, prefix='payment-prep-user')[0]
+        cls.bike = seed_bikes(cls.user, 1, prefix='payment-prep-bike')[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, payment_option='full_online'):
+        start = now() + timedelta(days=3)
+        return self.client.post('/api/bookings/create/', {
+            'bike': self.bike.pk, 'start_date': start.isoformat(), 'end_date': (start + timedelta(days=1)).isoformat(),
+            'pickup_location': 'Kathmandu', 'rental_duration': 'daily', 'payment_option': payment_option,
+        }, format='json')
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_payment_is_prepared_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.create()
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.get(booking_id=response.json()['data']['id'])
+        self.assertEqual(response.json()['redirect_url'], reverse('payment_process', kwargs={'payment_id': payment.pk}))
+        # Nothing ran on the request path.
+        self.assertIsNone(cache.get(paypal_form_cache_key(payment.pk)))
+        for callback in callbacks:
+            callback()
+        form = cache.get(paypal_form_cache_key(payment.pk))
+        self.assertEqual(form['invoice'], str(payment.booking_id))
+        self.assertEqual(form['amount'], f'{payment.amount:.2f}')
+
+    def test_cash_bookings_queue_nothing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.create(payment_option='cash_on_delivery')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('redirect_url', response.json())
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual([callback.__qualname__ for callback in callbacks], ['bump_availability_version'])
+
+    def test_rolled_back_work_is_not_queued(self):
+        submitted = []
+        with mock.patch.object(worker, 'submit', lambda func, *args: submitted.append(args)), \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                run_in_background(prepare_payment, 1, 'testserver')
+                raise RuntimeError
+            run_in_background(prepare_payment, 2, 'testserver')
+        self.assertEqual(submitted, [(2, 'testserver')])
+
+    def test_worker_threads_survive_failing_tasks(self):
+        background = BackgroundWorker(name='test-background')
+        done = []
+
+        def fail():
+            raise ValueError
+
+        with self.assertLogs('bike_rental_service.background', 'ERROR'):
+            background.submit(fail)
+            background.submit(done.append, 1)
+            background.join()
+        self.assertEqual(done, [1])
+        self.assertEqual(background.depth(), 0)
+
+
+class IpnQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.renter = seed_users(2, prefix='ipn-user')
+        bike, = seed_bikes(cls.owner, 1, prefix='ipn-bike')
+        origin = now() + timedelta(days=3)
+        cls.payments = []
+        for day in range(3):
+            booking = Booking.objects.create(user=cls.renter, bike=bike, start_date=origin + timedelta(days=day),
+                                             end_date=origin + timedelta(days=day + 1), pickup_location='Kathmandu')
+            cls.payments.append(Payment.objects.create(booking=booking, amount=booking.total_price,
+                                                       payment_method='paypal'))
+
+    def notify(self, txn_id, payment_status, payment=None, invoice=None):
+        invoice = invoice if payment is None else str(payment.booking_id)
+        ipn_obj = PayPalIPN.objects.create(txn_id=txn_id, payment_status=payment_status, invoice=invoice or '')
+        valid_ipn_received.send(sender=ipn_obj)
+
+    def payment_state(self, payment):
+        payment.refresh_from_db()
+        payment.booking.refresh_from_db()
+        return payment.status, payment.transaction_id, payment.booking.payment_status
+
+    def test_retries_are_queued_once_per_status(self):
+        for payment_status in ('Pending', 'Completed', 'Completed', 'Pending'):
+            self.notify('TXN-1', payment_status, self.payments[0])
+        self.assertEqual(sorted(IpnNotification.objects.values_list('txn_id', 'payment_status')),
+                         [('TXN-1', 'Completed'), ('TXN-1', 'Pending')])
+
+    def test_batch_applies_completions_and_failures(self):
+        first, second, third = self.payments
+        self.notify('TXN-1', 'Completed', first)
+        self.notify('TXN-2', 'Failed', second)
+        self.notify('TXN-3', 'Pending', third)
+        self.notify('TXN-4', 'Completed', invoice='999999')
+        with self.assertLogs('payment.ipn', 'WARNING'):
+            outcomes = process_ipn_queue()
+        self.assertEqual(outcomes, {'completed': 1, 'failed': 1, 'ignored': 1, 'missing': 1})
+        self.assertEqual(self.payment_state(first), ('completed', 'TXN-1', True))
+        self.assertEqual(self.payment_state(second), ('failed', None, False))
+        self.assertEqual(self.payment_state(third), ('pending', None, False))
+        self.assertFalse(IpnNotification.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(list(EarningsEntry.objects.values_list('payment_id', 'owner_id', 'amount')),
+                         [(first.pk, self.owner.pk, first.amount)])
+
+    def test_redelivery_after_processing_changes_nothing(self):
+        self.notify('TXN-1', 'Completed', self.payments[0])
+        process_ipn_queue()
+        self.notify('TXN-1', 'Completed', self.payments[0])
+        self.assertEqual(process_ipn_queue(), {})
+        self.assertEqual(EarningsEntry.objects.count(), 1)
+
+    def test_failure_never_overrides_a_completion(self):
+        payment = self.payments[0]
+        self.notify('TXN-1', 'Completed', payment)
+        self.notify('TXN-1', 'Failed', payment)
+        process_ipn_queue()
+        self.notify('TXN-2', 'Failed', payment)
+        process_ipn_queue()
+        self.assertEqual(self.payment_state(payment), ('completed', 'TXN-1', True))
+
+    def test_transaction_id_of_another_payment_is_a_conflict(self):
+        self.payments[0].mark_as_completed('TXN-1')
+        self.notify('TXN-1', 'Completed', self.payments[1])
+        with self.assertLogs('payment.ipn', 'WARNING'):
+            self.assertEqual(process_ipn_queue(), {'conflict': 1})
+        self.assertEqual(self.payment_state(self.payments[1]), ('pending', None, False))
+
+    def test_notifications_without_txn_id_are_dropped(self):
+        self.notify('', 'Completed', self.payments[0])
+        self.assertFalse(IpnNotification.objects.exists())
+
+    def test_queue_stats(self):
+        for index, payment in enumerate(self.payments):
+            self.notify(f'TXN-{index}', 'Completed', payment)
+        IpnNotification.objects.filter(txn_id='TXN-0').update(processed_at=now(), outcome='completed')
+        stats = ipn_queue_stats()
+        self.assertEqual((stats['depth'], stats['processed']), (2, 1))
+        self.assertGreaterEqual(stats['lag_seconds'], 0)
+
+
+class EarningsRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.renter = seed_users(2, prefix='earnings-user')
+        cls.owner.is_owner = True
+        cls.owner.save(update_fields=['is_owner'])
+        bike, = seed_bikes(cls.owner, 1, prefix='earnings-bike')
+        origin = now() + timedelta(days=3)
+        cls.payments = []
+        for day, amount in enumerate(['1000.00', '1500.00', '700.00']):
+            booking = Booking.objects.create(user=cls.renter, bike=bike, start_date=origin + timedelta(days=day),
+                                             end_date=origin + timedelta(days=day + 1), pickup_location='Kathmandu')
+            cls.payments.append(Payment.objects.create(booking=booking, amount=Decimal(amount),
+                                                       payment_method='paypal'))
+        # Completed without the save() that would record the earnings now.
+        Payment.objects.filter(booking__bike=bike).update(status='completed')
+
+    def earn(self, payment, day):
+        return record_earnings(Payment.objects.filter(pk=payment.pk),
+                               earned_at=timezone.make_aware(datetime(2025, 1, 30, 12) + timedelta(days=day)))
+
+    def earn_all(self):
+        for day, payment in enumerate(self.payments):
+            self.earn(payment, day)
+
+    def rollups(self):
+        return sorted(EarningsRollup.objects.filter(owner=self.owner)
+                      .values_list('period', 'period_start', 'bookings', 'earnings'))
+
+    expected = [
+        ('day', date(2025, 1, 30), 1, Decimal('1000.00')),
+        ('day', date(2025, 1, 31), 1, Decimal('1500.00')),
+        ('day', date(2025, 2, 1), 1, Decimal('700.00')),
+        ('month', date(2025, 1, 1), 2, Decimal('2500.00')),
+        ('month', date(2025, 2, 1), 1, Decimal('700.00')),
+    ]
+
+    def test_entries_are_recorded_once_per_payment(self):
+        self.assertEqual(self.earn(self.payments[0], 0), 1)
+        self.assertEqual(self.earn(self.payments[0], 1), 0)
+        Payment.objects.filter(pk=self.payments[1].pk).update(status='pending')
+        self.assertEqual(self.earn(self.payments[1], 0), 0)
+        self.assertEqual(EarningsEntry.objects.count(), 1)
+
+    def test_fold_adds_new_entries_to_day_and_month_rollups(self):
+        self.earn_all()
+        self.assertEqual(fold_earnings(), 3)
+        self.assertEqual(self.rollups(), self.expected)
+        self.assertEqual(fold_earnings(), 0)
+        self.assertEqual(self.rollups(), self.expected)
+
+    def test_entries_committed_below_the_mark_are_folded_later(self):
+        self.earn_all()
+        late = EarningsEntry.objects.get(payment=self.payments[1])
+        EarningsEntry.objects.filter(pk=late.pk).delete()
+        self.assertEqual(fold_earnings(), 2)
+        self.assertIn(str(late.pk), EarningsRollupState.objects.get().pending_gaps)
+        # The entry's transaction commits after a higher id was folded.
+        late.save(force_insert=True)
+        self.assertEqual(fold_earnings(), 1)
+        self.assertEqual(self.rollups(), self.expected)
+        self.assertNotIn(str(late.pk), EarningsRollupState.objects.get().pending_gaps)
+
+    @override_settings(EARNINGS_GAP_TIMEOUT=0)
+    def test_gaps_are_given_up_after_the_timeout(self):
+        self.earn_all()
+        EarningsEntry.objects.filter(payment=self.payments[1]).delete()
+        fold_earnings()
+        self.assertEqual(EarningsRollupState.objects.get().pending_gaps, {})
+
+    def test_full_rebuild_matches_the_incremental_rollups(self):
+        self.earn_all()
+        fold_earnings()
+        EarningsRollup.objects.filter(owner=self.owner, period='day').update(earnings=0)
+        self.assertEqual(fold_earnings(full=True), 3)
+        self.assertEqual(self.rollups(), self.expected)
+
+    def test_dashboard_totals(self):
+        self.earn_all()
+        fold_earnings()
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get('/api/payments/earnings/', {'start': '2025-01-31', 'end': '2025-02-28'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row['period_start'] for row in data['series']], ['2025-01-31', '2025-02-01'])
+        self.assertEqual(data['totals'], {'bookings': 2, 'earnings': 2200.0})
+        self.assertEqual(data['lifetime'], {'bookings': 3, 'earnings': 3200.0})
+        client.force_authenticate(self.renter)
+        self.assertEqual(client.get('/api/payments/earnings/').status_code, 403)
@@ -1,25 +1,40 @@
+import logging
+from datetime import timedelta
+
 import requests
 from django.shortcuts import redirect
 from rest_framework import generics, status, views
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from .earnings import earnings_dashboard
+from .ipn import enqueue_ipn, ipn_queue_stats
 from .models import Payment
 from .serializers import PaymentSerializer
+from .tasks import paypal_form_cache_key, paypal_form_data
 from users.permissions import IsOwnerOrAdmin
+from bike_rental_service.fieldsets import SparseFieldsetMixin
 from bookings.models import Booking
+from bookings.exports import EXPORT_FORMATS, export_response
+from bookings.filters import BookingFilter
 
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
 from django.shortcuts import render, get_object_or_404
 from paypal.standard.forms import PayPalPaymentsForm
 from paypal.standard.ipn.signals import valid_ipn_received, invalid_ipn_received
 
-class PaymentListView(generics.ListCreateAPIView):
+logger = logging.getLogger(__name__)
+
+class PaymentListView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     List all payments or create a new payment.
 
     * Requires: Authentication (admin for listing, user for creation), booking ID, payment method
+    * Optional: fields / omit (comma-separated) to choose the returned fields when listing
     * Returns: List of payments or payment initiation redirect URL
     """
     queryset = Payment.objects.all()
@@ -75,6 +90,31 @@ class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PaymentSerializer
     permission_classes = [IsOwnerOrAdmin]
 
+class PaymentExportView(views.APIView):
+    """
+    Stream every payment for finance.
+
+    * Requires: Admin authentication
+    * Optional: output=csv|ndjson|columnar (default csv), start_date, end_date (of the booking)
+    * Returns: Streaming file download
+    """
+    permission_classes = [IsAdminUser]
+    fields = (
+        'id', 'booking_id', 'booking__user__username', 'booking__start_date', 'booking__end_date',
+        'amount', 'payment_method', 'transaction_id', 'status', 'created_at', 'updated_at',
+    )
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"success": False, "message": f"Unsupported output format: {export_format}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filterset = BookingFilter(request.query_params, queryset=Booking.objects.all())
+        if not filterset.is_valid():
+            return Response({"success": False, "errors": filterset.errors}, status=status.HTTP_400_BAD_REQUEST)
+        payments = Payment.objects.filter(booking__in=filterset.qs.values('pk')).order_by('id')
+        return export_response(payments, self.fields, export_format, 'payments')
+
 def payment_process(request, payment_id):
     """
     Render the PayPal payment form.
@@ -82,18 +122,9 @@ def payment_process(request, payment_id):
     * Requires: payment_id (passed via URL after payment initiation)
     * Returns: HTML form for PayPal payment with dynamic amount
     """
-    payment = get_object_or_404(Payment, id=payment_id)
-    host = request.get_host()
-    paypal_dict = {
-        "business": settings.PAYPAL_RECEIVER_EMAIL,
-        "amount": f"{payment.amount:.2f}",  # Use dynamic amount from Payment object
-        "item_name": f"Bike Rental for {payment.booking.bike.name}",
-        "invoice": str(payment.booking.id),
-        "currency_code": "USD",
-        "notify_url": f"http://{host}{reverse('paypal-ipn')}",
-        "return_url": f"http://{host}{reverse('payment-done')}",
-        "cancel_return": f"http://{host}{reverse('payment-canceled')}",
-    }
+    payment = get_object_or_404(Payment.objects.select_related('booking__bike'), id=payment_id)
+    # Prepared by the background worker when the booking was created.
+    paypal_dict = cache.get(paypal_form_cache_key(payment.id)) or paypal_form_data(payment, request.get_host())
     form = PayPalPaymentsForm(initial=paypal_dict)
     context = {"form": form}
     return render(request, "payment/payment_process.html", context)
@@ -116,26 +147,71 @@ def payment_canceled(request):
     """
     return render(request, "payment/payment_canceled.html")
 
-def handle_ipn(sender, **kwargs):
+class OwnerEarningsView(views.APIView):
     """
-    Handle PayPal IPN notifications.
+    Earnings dashboard of a bike owner, read from the precomputed daily/monthly rollups.
 
-    * Requires: None (PayPal callback)
-    * Returns: None (updates payment status)
+    * Requires: Authentication as a bike owner (admins may pass owner=<user id>)
+    * Optional: period=day|month (default day), start and end dates (YYYY-MM-DD; default the last 30 days or 12 months)
+    * Returns: Per-period bookings and earnings, totals for the range and lifetime totals
     """
-    ipn_obj = sender
-    if ipn_obj.payment_status == "Completed":
+    permission_classes = [IsAuthenticated]
+    default_days = {'day': 30, 'month': 365}
+
+    def get(self, request, *args, **kwargs):
+        owner_id = request.user.pk
+        if request.user.is_staff and 'owner' in request.query_params:
+            try:
+                owner_id = int(request.query_params['owner'])
+            except ValueError:
+                return Response({"success": False, "message": "owner must be a user id."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        elif not (request.user.is_owner or request.user.is_staff):
+            return Response({"success": False, "message": "Only bike owners have an earnings dashboard."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        period = request.query_params.get('period', 'day')
+        if period not in self.default_days:
+            return Response({"success": False, "message": "period must be day or month."},
+                            status=status.HTTP_400_BAD_REQUEST)
         try:
-            payment = Payment.objects.get(booking_id=ipn_obj.invoice)
-            payment.mark_as_completed(transaction_id=ipn_obj.txn_id)
-        except Payment.DoesNotExist:
-            print(f"Payment for booking {ipn_obj.invoice} not found.")
-    elif ipn_obj.payment_status == "Failed":
-        try:
-            payment = Payment.objects.get(booking_id=ipn_obj.invoice)
-            payment.mark_as_failed()
-        except Payment.DoesNotExist:
-            print(f"Payment for booking {ipn_obj.invoice} not found.")
+            end = parse_date(request.query_params['end']) if 'end' in request.query_params else localdate()
+            start = parse_date(request.query_params['start']) if 'start' in request.query_params else None
+        except ValueError:
+            start = end = None
+        else:
+            if end is not None and 'start' not in request.query_params:
+                start = end - timedelta(days=self.default_days[period] - 1)
+        if start is None or end is None or start > end:
+            return Response({"success": False, "message": "start and end must be dates (YYYY-MM-DD), start first."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if period == 'month':
+            start = start.replace(day=1)
+        return Response(earnings_dashboard(owner_id, period, start, end))
+
+class IpnQueueStatsView(views.APIView):
+    """
+    Report the PayPal IPN queue.
+
+    * Requires: Admin authentication
+    * Returns: Queue depth, age of the oldest queued notification, and throughput and worst delay over the last hour
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(ipn_queue_stats())
+
+def handle_ipn(sender, **kwargs):
+    """
+    Queue verified PayPal IPN notifications.
+
+    * Requires: None (PayPal callback, via django-paypal's valid_ipn_received signal)
+    * Returns: None (the payment is updated by the IPN queue worker, see payment.ipn)
+    """
+    enqueue_ipn(sender)
+
+def log_invalid_ipn(sender, **kwargs):
+    logger.warning("Invalid PayPal IPN %s: %s", sender.pk, sender.flag_info)
 
 valid_ipn_received.connect(handle_ipn)
-invalid_ipn_received.connect(lambda sender, **kwargs: print("Invalid IPN received"))
\ No newline at end of file
+invalid_ipn_received.connect(log_invalid_ipn)
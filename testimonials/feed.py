@@ -0,0 +1,110 @@
+"""
+Precomputed homepage testimonials feed.
+
+The feed holds the featured and the latest approved testimonials plus a
+site-wide rating summary of all approved testimonials (count, mean and a
+1-5 star histogram). It is rendered once to JSON bytes with an ETag and
+kept in the cache under the current feed version, so the feed view sends
+it without querying the testimonials. The version and the rendered feed
+live in the shared default cache, so a bump in one worker process is
+seen by all of them.
+
+Approving, featuring, editing or deleting a testimonial calls
+``invalidate_feed`` (see testimonials.signals): once the change commits
+the feed version is bumped and a background task renders the new version.
+A builder that started before the change writes under the old version,
+where nobody reads it. Requests arriving before the rebuild finishes render
+the feed themselves. Entries expire after ``TESTIMONIALS_FEED_TIMEOUT``
+seconds, which bounds how long changes that do not go through testimonials
+(e.g. a renamed author) take to show.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from bike_rental_service.background import run_coalesced_in_background
+from .models import Testimonial
+from .serializers import TestimonialSerializer
+
+FEED_VERSION_KEY = 'testimonials:feed:version'
+
+
+def get_feed_version():
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never reuses an old one.
+        cache.add(FEED_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(FEED_VERSION_KEY)
+    return version
+
+
+def bump_feed_version():
+    try:
+        return cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.add(FEED_VERSION_KEY, int(time.time() * 1000), None)
+        return cache.get(FEED_VERSION_KEY)
+
+
+def feed_cache_key(version):
+    return f"testimonials:feed:{version}"
+
+
+def rating_summary():
+    """Count, mean rating and star histogram of the approved testimonials, in one query."""
+    totals = Testimonial.approved.aggregate(
+        count=Count('id'),
+        average=Avg('rating'),
+        **{f"stars_{star}": Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+    )
+    return {
+        'count': totals['count'],
+        'average': round(totals['average'], 2) if totals['average'] is not None else None,
+        'histogram': {star: totals[f"stars_{star}"] for star in range(1, 6)},
+    }
+
+
+def feed_data():
+    approved = Testimonial.approved.select_related('user').order_by('-created_at', '-id')
+    featured = approved.filter(is_featured=True)[:getattr(settings, 'TESTIMONIALS_FEED_FEATURED', 6)]
+    latest = approved[:getattr(settings, 'TESTIMONIALS_FEED_LATEST', 20)]
+    return {
+        'rating_summary': rating_summary(),
+        'featured': TestimonialSerializer(featured, many=True).data,
+        'latest': TestimonialSerializer(latest, many=True).data,
+    }
+
+
+def render_feed():
+    """(etag, body) of the current feed."""
+    body = JSONRenderer().render(feed_data())
+    return quote_etag(hashlib.md5(body).hexdigest()), body
+
+
+def get_feed():
+    """(etag, body) of the current feed version, rendering and caching it if needed."""
+    key = feed_cache_key(get_feed_version())
+    entry = cache.get(key)
+    if entry is None:
+        entry = render_feed()
+        # add() keeps an entry the background rebuild stored meanwhile.
+        cache.add(key, entry, getattr(settings, 'TESTIMONIALS_FEED_TIMEOUT', 3600))
+    return entry
+
+
+def rebuild_feed():
+    """Render the current feed version into the cache."""
+    key = feed_cache_key(get_feed_version())
+    cache.set(key, render_feed(), getattr(settings, 'TESTIMONIALS_FEED_TIMEOUT', 3600))
+
+
+def invalidate_feed():
+    """Replace the feed once the current transaction commits."""
+    transaction.on_commit(bump_feed_version)
+    run_coalesced_in_background(rebuild_feed)
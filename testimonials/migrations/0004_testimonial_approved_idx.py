@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testimonials', '0003_alter_testimonial_is_approved_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-is_featured', '-created_at'], name='testimonial_approved_idx'),
+        ),
+    ]
@@ -48,6 +48,16 @@ class Testimonial(models.Model):
     objects = models.Manager()  # Default manager
     approved = ApprovedTestimonialManager()  # Custom manager for approved testimonials
 
+    class Meta:
+        indexes = [
+            # Public list and homepage feed: approved testimonials, featured first, newest first.
+            # Partial for the same reason as bike_listed_price_idx (bare boolean filters).
+            models.Index(
+                fields=['-is_featured', '-created_at'], name='testimonial_approved_idx',
+                condition=models.Q(is_approved=True),
+            ),
+        ]
+
     def clean(self):
         """
         Validate that the rating is between 1 and 5.
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
 from .models import Testimonial
 
-class TestimonialSerializer(serializers.ModelSerializer):
+class TestimonialSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True, help_text="Author of the testimonial.")
+
     class Meta:
         model = Testimonial
         fields = '__all__'
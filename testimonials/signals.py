@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .feed import invalidate_feed
+from .models import Testimonial
+
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+def refresh_testimonials_feed(sender, instance, created=False, **kwargs):
+    """
+    Rebuild the homepage feed and rating summary after a testimonial is approved, featured, edited or deleted.
+    """
+    if created and not instance.is_approved:
+        # New submissions wait for moderation and are not in the feed yet.
+        return
+    invalidate_feed()
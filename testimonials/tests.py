@@ -1,3 +1,110 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from bike_rental_service.fieldsets import project_queryset
+from benchmarks.utils import seed_users
+from .feed import FEED_VERSION_KEY, feed_cache_key, get_feed_version
+from .models import Testimonial
+from .serializers import TestimonialSerializer
+from .views import TestimonialListView
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class TestimonialFeedTests(TestCase):
+    url = '/api/testimonials/feed/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='feed-user')
+        cls.five, cls.four, cls.pending = Testimonial.objects.bulk_create([
+            Testimonial(user=cls.user, content=f"Testimonial number {index}.", rating=rating, is_approved=approved,
+                        is_featured=featured)
+            for index, (rating, approved, featured) in enumerate([(5, True, True), (4, True, False), (1, False, False)])
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **extra):
+        return self.client.get(self.url, HTTP_ACCEPT='application/json', **extra)
+
+    def test_feed_contents(self):
+        data = self.get().json()
+        self.assertEqual(data['rating_summary'], {
+            'count': 2, 'average': 4.5, 'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1},
+        })
+        self.assertEqual([row['id'] for row in data['featured']], [self.five.pk])
+        self.assertEqual([row['id'] for row in data['latest']], [self.four.pk, self.five.pk])
+
+    def test_repeat_requests_skip_the_testimonials(self):
+        first = self.get()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get()
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([query for query in queries if 'testimonials_testimonial' in query['sql']])
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+            self.assertIn('Accept', response['Vary'])
+        # Containing the tag is not matching it.
+        for header in (f'{etag}x', f'"x{etag[1:]}', ''):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=header).status_code, 200, header)
+
+    def test_feed_follows_moderation(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pending.mark_as_approved()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rating_summary']['count'], 3)
+
+    def test_new_submissions_wait_for_moderation(self):
+        version = get_feed_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Testimonial.objects.create(user=self.user, content="Not moderated yet.", rating=3)
+        self.assertEqual(get_feed_version(), version)
+
+    def test_bumps_are_seen_by_other_processes(self):
+        # Another worker process opens its own handle on the same cache.
+        other_process = DatabaseCache(settings.CACHES['default']['LOCATION'], {})
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.four.delete()
+        version = other_process.get(FEED_VERSION_KEY)
+        self.assertEqual(version, get_feed_version())
+        # The background rebuild already rendered the new version for everyone.
+        etag, body = other_process.get(feed_cache_key(version))
+        self.assertEqual(json.loads(body)['rating_summary']['count'], 1)
+
+
+class TestimonialFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_users(1, prefix='fieldset-user')
+        cls.testimonial = Testimonial.objects.create(user=cls.user, content="Great bikes, friendly staff.", rating=5,
+                                                     is_approved=True)
+
+    def projected(self, fields):
+        request = RequestFactory().get('/api/testimonials/', {'fields': fields})
+        return project_queryset(TestimonialListView.queryset, TestimonialSerializer(context={'request': request}))
+
+    def test_related_attributes_keep_the_full_query(self):
+        queryset = self.projected('id,username')
+        self.assertEqual(queryset.query.select_related, {'user': {}})
+        self.assertEqual(queryset.query.deferred_loading, (frozenset(), True))
+        response = self.client.get('/api/testimonials/', {'fields': 'id,username'})
+        self.assertEqual(response.json()['results'], [{'id': self.testimonial.pk, 'username': self.user.username}])
+
+    def test_own_columns_drop_the_join(self):
+        self.assertEqual(list(self.projected('id,rating')), [{'id': self.testimonial.pk, 'rating': 5}])
+        self.assertEqual(self.projected('id,user').query.select_related, False)
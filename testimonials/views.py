@@ -1,22 +1,54 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions
 from rest_framework.filters import SearchFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from bike_rental_service.fieldsets import SparseFieldsetMixin
+from bikes.cache import etag_matches
 
+from .feed import feed_data, get_feed
 from .filters import TestimonialFilter
 from .models import Testimonial
 from .serializers import TestimonialSerializer
 
-class TestimonialListView(generics.ListAPIView):
+class TestimonialListView(SparseFieldsetMixin, generics.ListAPIView):
     """
-    List all testimonials.
+    List approved testimonials, featured first, then newest first.
 
     * Requires: None (public access)
+    * Optional: fields / omit (comma-separated) to choose the returned fields
     * Returns: List of testimonial data
     """
-    queryset = Testimonial.objects.all()
+    queryset = Testimonial.approved.select_related('user').order_by('-is_featured', '-created_at', '-id')
     serializer_class = TestimonialSerializer
     permission_classes = [permissions.AllowAny]
 
+class TestimonialFeedView(APIView):
+    """
+    Homepage feed: featured and latest approved testimonials with the site-wide rating summary.
+
+    * Requires: None (public access)
+    * Returns: rating_summary (count, average, histogram), featured and latest testimonials
+      (precomputed; supports ETag / If-None-Match)
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return Response(feed_data())
+        etag, body = get_feed()
+        if etag_matches(etag, request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # The browsable API renders the same URL as HTML.
+        patch_vary_headers(response, ['Accept'])
+        return response
+
 class TestimonialCreateView(generics.CreateAPIView):
     """
     Create a new testimonial.
@@ -0,0 +1,195 @@
+"""
+Cached token authentication.
+
+DRF's ``TokenAuthentication`` loads the token and its user with a join on
+every request. ``CachedTokenAuthentication`` keeps the loaded (user, token)
+pair in two layers:
+
+* a small LRU in each process, whose entries live for
+  ``TOKEN_AUTH_LOCAL_TTL`` seconds;
+* the shared Django cache, for ``TOKEN_AUTH_CACHE_TIMEOUT`` seconds.
+
+Deleting or saving a token (logout, rotation, cleanup), deleting a user
+and changing a user's password, active flag or admin flags
+(``User.AUTH_FIELDS``) drop the user's entries from the shared cache and
+from this process's LRU (see users.signals); other profile edits and the
+``last_login`` update keep them. The shared entry is replaced by a short-lived marker
+rather than deleted, so a request that read the token just before the
+change cannot cache the old credentials again. Other processes may keep
+serving their local copy for up to ``TOKEN_AUTH_LOCAL_TTL`` seconds, so
+keep that short.
+
+Tokens older than ``TOKEN_TTL`` seconds are rejected; the login view
+issues a fresh one and ``clear_expired_tokens`` deletes the stale rows.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def token_ttl():
+    """Lifetime of a token as a timedelta, or None if tokens never expire."""
+    seconds = getattr(settings, 'TOKEN_TTL', None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def is_expired(token, current_time=None):
+    ttl = token_ttl()
+    return ttl is not None and token.created <= (current_time or now()) - ttl
+
+
+# Left in the shared cache by an invalidation so a request that loaded the
+# token just before cannot put the old credentials back.
+INVALIDATED = 'invalidated'
+INVALIDATED_TIMEOUT = 60
+
+
+def token_cache_key(key):
+    # The raw key is a credential; keep it out of cache key names.
+    return f"users:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of recently authenticated tokens with a per-entry TTL."""
+
+    def __init__(self, max_size=None, ttl=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        if self._max_size is not None:
+            return self._max_size
+        return getattr(settings, 'TOKEN_AUTH_LOCAL_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'TOKEN_AUTH_LOCAL_TTL', 5)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_token_cache = LocalTokenCache()
+
+
+def invalidate_token(key):
+    """Forget a cached token in the shared cache and in this process."""
+    local_token_cache.discard(key)
+    cache.set(token_cache_key(key), INVALIDATED, INVALIDATED_TIMEOUT)
+
+
+def invalidate_user_tokens(user_id):
+    """Forget every cached token of a user, e.g. after the user changed or was deactivated."""
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+def rotate_token(user):
+    """Replace a user's token with a new one and return it."""
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def get_valid_token(user):
+    """The user's current token, replacing it first if it has expired."""
+    token, _ = Token.objects.get_or_create(user=user)
+    return rotate_token(user) if is_expired(token) else token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that serves repeat requests from the local LRU
+    or the shared cache instead of the database.
+    """
+
+    def authenticate_credentials(self, key):
+        pickled = local_token_cache.get(key)
+        if pickled is not None:
+            credentials = pickle.loads(pickled)
+        else:
+            cache_key = token_cache_key(key)
+            credentials = cache.get(cache_key)
+            if credentials is None or credentials == INVALIDATED:
+                credentials = self.load_credentials(key)
+                # add() leaves a recent invalidation in place; such credentials are not cached anywhere.
+                cached = cache.add(cache_key, credentials, getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 300))
+            else:
+                cached = True
+            if cached:
+                # Stored pickled so each request gets its own user instance, as from the shared cache.
+                local_token_cache.set(key, pickle.dumps(credentials, pickle.HIGHEST_PROTOCOL))
+
+        user, token = credentials
+        if is_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        return credentials
+
+    def load_credentials(self, key):
+        """(user, token) from the database, checked like ``TokenAuthentication``."""
+        try:
+            token = self.get_model().objects.select_related('user').get(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+
+def clear_expired_tokens(chunk_size=1000, current_time=None):
+    """Delete tokens older than ``TOKEN_TTL`` in chunks; return the number deleted."""
+    ttl = token_ttl()
+    if ttl is None:
+        return 0
+    stale = Token.objects.filter(created__lte=(current_time or now()) - ttl)
+    deleted = 0
+    while True:
+        keys = list(stale.values_list('key', flat=True)[:chunk_size])
+        if not keys:
+            return deleted
+        # The post_delete receiver drops each token from the caches.
+        deleted += Token.objects.filter(key__in=keys).delete()[0]
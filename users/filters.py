@@ -1,11 +1,11 @@
 import django_filters
+from rest_framework.filters import SearchFilter
 from users.models import User
-from django.db.models import Q
-from django.db import models
+from .search import filter_phone_prefix, phone_prefix, search_users
 
 class UserFilter(django_filters.FilterSet):
     is_owner = django_filters.BooleanFilter(field_name="is_owner")
-    phone_number = django_filters.CharFilter(field_name="phone_number", lookup_expr='icontains')
+    phone_number = django_filters.CharFilter(method='filter_phone_number', label="Phone number prefix")
     full_name = django_filters.CharFilter(method='filter_full_name', label="Full Name (First + Last)")
     username = django_filters.CharFilter(field_name="username", lookup_expr='icontains')
 
@@ -13,18 +13,34 @@ class UserFilter(django_filters.FilterSet):
         model = User
         fields = ['is_owner', 'phone_number', 'username', 'full_name']
 
+    def filter_phone_number(self, queryset, _, value):
+        """
+        Users whose phone number starts with the given digits, with or without
+        the +977 country code (e.g. "98412" or "+97798412"). Matching is by
+        prefix only, so it can use the phone number index; a value that is not
+        a phone number prefix leaves the list unfiltered, like an empty filter.
+        """
+        prefix = phone_prefix(value)
+        return queryset if prefix is None else filter_phone_prefix(queryset, prefix)
+
     def filter_full_name(self, queryset, _, value):
         """
         Custom filter to search by full name (first_name + last_name).
-        Supports both partial matches and exact matches.
+        Uses the indexed user search, so partial and slightly misspelled names match too.
         """
-        # Split the input value into first and last name
-        parts = value.split()
-        if len(parts) == 2:
-            first_name, last_name = parts
-            return queryset.filter(
-                Q(first_name__icontains=first_name) & Q(last_name__icontains=last_name)
-            )
-        return queryset.filter(
-            Q(first_name__icontains=value) | Q(last_name__icontains=value)
-        )
\ No newline at end of file
+        matches = search_users(queryset, value)
+        return queryset if matches is None else matches
+
+
+class UserSearchFilter(SearchFilter):
+    """
+    Ranked user search (see users.search): names, username and email by
+    trigram match, or a phone number prefix. Best matches come first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, '')
+        matches = search_users(queryset, value) if value.strip() else None
+        if matches is None:
+            return queryset
+        return matches.order_by('-rank', 'pk')
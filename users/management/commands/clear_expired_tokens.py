@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.authentication import clear_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete authentication tokens older than TOKEN_TTL in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Tokens deleted per statement.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = clear_expired_tokens(chunk_size=options['chunk_size'])
+        self.stdout.write(f"deleted={deleted} duration={(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import ThrottleBucket
+
+
+class Command(BaseCommand):
+    help = "Delete throttle buckets that have refilled completely (equivalent to having no row)."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted, _ = ThrottleBucket.objects.filter(full_at__lte=time.time()).delete()
+        self.stdout.write(f"deleted={deleted} duration={(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the user search documents and trigram index, e.g. after bulk imports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Users rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuilt = rebuild_search_index(chunk_size=options['chunk_size'])
+        self.stdout.write(f"rebuilt={rebuilt} duration={(time.perf_counter() - started) * 1000:.0f}ms")
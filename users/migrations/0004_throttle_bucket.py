@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('key', models.CharField(help_text='Throttle cache key, e.g. throttle_user_5.', max_length=255, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField(help_text='Requests left as of updated_at.')),
+                ('updated_at', models.FloatField(help_text='Unix time of the last refill.')),
+                ('full_at', models.FloatField(db_index=True, help_text='Unix time the bucket refills completely; later rows can be deleted.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:24
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def fill_search_documents(apps, schema_editor):
+    """Build every user's search document and, outside PostgreSQL, its trigram rows."""
+    User = apps.get_model('users', 'User')
+    UserSearchTrigram = apps.get_model('users', 'UserSearchTrigram')
+    with_trigrams = schema_editor.connection.vendor != 'postgresql'
+    chunk, trigrams = [], []
+
+    def flush():
+        User.objects.bulk_update(chunk, ['search_document'])
+        UserSearchTrigram.objects.bulk_create(trigrams)
+        chunk.clear()
+        trigrams.clear()
+
+    users = User.objects.only('username', 'first_name', 'last_name', 'email').order_by('pk')
+    for user in users.iterator(chunk_size=1000):
+        parts = [user.username, user.first_name, user.last_name, (user.email or '').split('@')[0]]
+        user.search_document = normalize(' '.join(part for part in parts if part))
+        chunk.append(user)
+        if with_trigrams:
+            grams = set()
+            for word in WORD_RE.findall(user.search_document):
+                padded = f"  {word} "
+                grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+            trigrams += [UserSearchTrigram(user_id=user.pk, trigram=gram) for gram in grams]
+        if len(chunk) >= 1000:
+            flush()
+    flush()
+
+
+def add_search_index(apps, schema_editor):
+    """Trigram index on the search document (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute("CREATE INDEX user_search_document_trgm ON users_user USING gin (search_document gin_trgm_ops)")
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS user_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_throttle_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Normalized text used for user search.'),
+        ),
+        migrations.CreateModel(
+            name='UserSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'user'], name='user_search_trigram_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -25,14 +25,48 @@ class User(AbstractUser):
         default='default_profile.png',
         help_text="Profile image uploaded by the user."
     )
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Storage names of the resized profile picture variants.")
     date_of_birth = models.DateField(blank=True, null=True, help_text="User’s date of birth (optional).")
     bio = models.TextField(blank=True, null=True, help_text="Short description about the user.")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp for when the user was created.")
     updated_at = models.DateTimeField(auto_now=True, help_text="Timestamp for the last update.")
+    search_document = models.TextField(blank=True, default='', editable=False, help_text="Normalized text used for user search.")
 
     def __str__(self):
         return self.username
 
+    # Fields a cached authentication copy of the user must not go stale on (see users.authentication).
+    AUTH_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored search document and auth fields so the save signals only act on changes."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_document = instance.__dict__.get('search_document')
+        instance._loaded_auth_state = instance.auth_state()
+        return instance
+
+    def auth_state(self):
+        """Values of AUTH_FIELDS (None for deferred ones)."""
+        return tuple(self.__dict__.get(field) for field in self.AUTH_FIELDS)
+
+    SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+    def build_search_document(self):
+        """Normalized username, first and last name and email local part for search indexing (see users.search)."""
+        from .search import normalize
+        parts = [self.username, self.first_name, self.last_name, (self.email or '').split('@')[0]]
+        return normalize(' '.join(part for part in parts if part))
+
+    def save(self, *args, **kwargs):
+        """Refresh the search document whenever a field it is built from is saved."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.SEARCH_FIELDS):
+            self.search_document = self.build_search_document()
+            if update_fields is not None and 'search_document' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['search_document']
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         """Returns the full name of the user."""
@@ -69,4 +103,33 @@ class OwnerProfile(models.Model):
                 total_bookings=models.F('total_bookings') + 1,
                 total_earnings=models.F('total_earnings') + amount
             )
-            self.refresh_from_db()  # Refresh the instance to reflect the updated values
\ No newline at end of file
+            self.refresh_from_db()  # Refresh the instance to reflect the updated values
+
+
+class ThrottleBucket(models.Model):
+    """
+    Token bucket of one throttle key (see users.throttling). Times are Unix
+    timestamps so the refill can be computed in a single UPDATE on any database.
+    """
+    key = models.CharField(max_length=255, primary_key=True, help_text="Throttle cache key, e.g. throttle_user_5.")
+    tokens = models.FloatField(help_text="Requests left as of updated_at.")
+    updated_at = models.FloatField(help_text="Unix time of the last refill.")
+    full_at = models.FloatField(db_index=True, help_text="Unix time the bucket refills completely; later rows can be deleted.")
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f} tokens"
+
+
+class UserSearchTrigram(models.Model):
+    """
+    One trigram of a user's search document, for backends without a
+    trigram index (see users.search).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            # Covers the per-user trigram counts of a search without reading the table.
+            models.Index(fields=['trigram', 'user'], name='user_search_trigram_idx'),
+        ]
@@ -0,0 +1,221 @@
+"""
+Ranked user search for the admin user list.
+
+Every user carries ``search_document``: username, first and last name and
+the local part of the email address, lowercased with accents stripped
+(maintained by ``User.save``). The email domain is left out: nearly every
+user shares one of a handful, so its trigrams would match everyone.
+
+On PostgreSQL the document has a trigram GIN index (users/0005). A word
+matches if it occurs in the document or, allowing for typos, by trigram
+word similarity; results are ranked by that similarity.
+
+Other backends have no trigram operator class, so each user's trigrams
+are kept in ``UserSearchTrigram`` (maintained by the user save signal and
+``rebuild_user_search``). A search counts, per user, how many of the
+query's trigrams appear, using the (trigram, user) index, and keeps the
+best ``MAX_CANDIDATES`` users that share enough of them or contain every
+query word, retrying with a lower threshold if there are none. The rank
+is the shared fraction of trigrams.
+
+On both, exact and prefix matches of the username, email or names rank
+first. A query that looks like a phone number (a leading "+" or at least
+``MIN_PHONE_SEARCH_DIGITS`` digits) is a prefix lookup on ``phone_number``
+instead, which its unique index answers as a range scan. Shorter numbers,
+such as a year or part of a username, are searched as text.
+"""
+import math
+import re
+import unicodedata
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+
+from .models import User, UserSearchTrigram
+
+WORD_RE = re.compile(r'[^\W_]+')
+PHONE_RE = re.compile(r'^\+?[\d\s-]{3,}$')
+COUNTRY_CODE = '977'
+MIN_PHONE_SEARCH_DIGITS = 6
+MAX_SEARCH_WORDS = 8
+
+# Share of the query's trigrams a user must have to match without containing every word
+# (the default pg_trgm word similarity threshold).
+SIMILARITY_THRESHOLD = 0.6
+# Used instead when nothing reaches it, so a misspelled name still finds the closest users.
+FUZZY_THRESHOLD = 0.4
+MAX_CANDIDATES = 1000
+
+
+def normalize(text):
+    """Lowercase `text` and strip accents, so "Šrestha" is found by "srestha"."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def search_words(value):
+    return WORD_RE.findall(normalize(value))[:MAX_SEARCH_WORDS]
+
+
+def document_trigrams(document):
+    """Trigrams of each word padded as pg_trgm does: two spaces before, one after."""
+    grams = set()
+    for word in WORD_RE.findall(document):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def query_trigrams(words):
+    """
+    (all, inner) trigrams of the query words. A query word may be the
+    start of a longer word, so its end padding is left out; the inner
+    trigrams are those every document containing the word must have.
+    """
+    grams, inner = set(), set()
+    for word in words:
+        padded = f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        inner.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams, inner
+
+
+def uses_trigram_table(using=None):
+    return connections[using or router.db_for_write(User)].vendor != 'postgresql'
+
+
+def index_users(users, using=None):
+    """Replace the stored trigrams of `users` from their search documents (non-PostgreSQL backends only)."""
+    using = using or router.db_for_write(UserSearchTrigram)
+    if not users or not uses_trigram_table(using):
+        return
+    UserSearchTrigram.objects.using(using).filter(user_id__in=[user.pk for user in users]).delete()
+    # A user has a few dozen trigrams; building a model instance for each costs far more than the insert.
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    statement = (
+        f"INSERT INTO {quote(UserSearchTrigram._meta.db_table)} ({quote('user_id')}, {quote('trigram')}) "
+        "VALUES (%s, %s)"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(statement, [
+            (user.pk, gram) for user in users for gram in document_trigrams(user.search_document)
+        ])
+
+
+def rebuild_search_index(chunk_size=1000):
+    """
+    Recompute every user's search document and trigrams, e.g. after bulk
+    writes that bypassed ``User.save``. Returns the number of users.
+    """
+    last_pk, rebuilt = 0, 0
+    while True:
+        with transaction.atomic():
+            users = list(User.objects.filter(pk__gt=last_pk).order_by('pk')
+                         .only('pk', 'search_document', *User.SEARCH_FIELDS)[:chunk_size])
+            if not users:
+                return rebuilt
+            changed = []
+            for user in users:
+                document = user.build_search_document()
+                if document != user.search_document:
+                    user.search_document = document
+                    changed.append(user)
+            User.objects.bulk_update(changed, ['search_document'])
+            index_users(users)
+        last_pk, rebuilt = users[-1].pk, rebuilt + len(users)
+
+
+def phone_prefix(value):
+    """The stored form (+977...) of a phone number prefix, or None if `value` is not one."""
+    if not PHONE_RE.match(value.strip()):
+        return None
+    digits = re.sub(r'\D', '', value)
+    if not value.strip().startswith('+') and not digits.startswith(COUNTRY_CODE):
+        digits = COUNTRY_CODE + digits
+    return f"+{digits}"
+
+
+def filter_phone_prefix(queryset, prefix):
+    """Users whose phone number starts with `prefix`, as a range over the phone number index."""
+    # Phone numbers are "+" and digits, so incrementing the last character bounds the range.
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return queryset.filter(phone_number__gte=prefix, phone_number__lt=upper, phone_number__startswith=prefix)
+
+
+def exact_match_bonus(phrase, words):
+    first = words[0]
+    return Case(
+        When(Q(username__iexact=phrase) | Q(email__iexact=phrase), then=Value(2.0)),
+        When(Q(username__istartswith=first) | Q(email__istartswith=first) | Q(first_name__istartswith=first)
+             | Q(last_name__istartswith=first), then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def search_users(queryset, value):
+    """
+    `queryset` narrowed to users matching `value` and annotated with
+    ``rank`` (higher is better), or None if `value` has nothing to search for.
+    """
+    prefix = phone_prefix(value)
+    if prefix is not None and (value.strip().startswith('+') or len(re.sub(r'\D', '', value)) >= MIN_PHONE_SEARCH_DIGITS):
+        return filter_phone_prefix(queryset, prefix).annotate(rank=Value(1.0, output_field=FloatField()))
+    # An email address is matched by its local part; exact addresses still rank first.
+    words = search_words(value.split('@', 1)[0] if '@' in value else value)
+    if not words:
+        return None
+    if uses_trigram_table(queryset.db):
+        queryset = _trigram_table_search(queryset, words)
+    else:
+        queryset = _postgres_search(queryset, words)
+    phrase = value.strip()
+    return queryset.annotate(rank=F('similarity') + exact_match_bonus(phrase, words))
+
+
+def _postgres_search(queryset, words):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    phrase = ' '.join(words)
+    contains_all = Q()
+    for word in words:
+        contains_all &= Q(search_document__contains=word)
+    return queryset.annotate(similarity=TrigramWordSimilarity(phrase, 'search_document')).filter(
+        contains_all | Q(search_document__trigram_word_similar=phrase)
+    )
+
+
+def _trigram_table_search(queryset, words):
+    grams, inner = query_trigrams(words)
+    for threshold in (SIMILARITY_THRESHOLD, FUZZY_THRESHOLD):
+        need = max(1, math.ceil(threshold * len(grams)))
+        candidates = list(trigram_candidates(queryset.db, grams, inner, need))
+        if candidates:
+            break
+
+    ids_by_hits = {}
+    similar, substring = [], []
+    for row in candidates:
+        ids_by_hits.setdefault(row['hits'], []).append(row['user_id'])
+        (similar if row['hits'] >= need else substring).append(row['user_id'])
+    # Sharing the inner trigrams is necessary for containing every word, but not sufficient.
+    contains_all = Q(pk__in=substring)
+    for word in words:
+        contains_all &= Q(search_document__contains=word)
+    similarity = Case(
+        *[When(pk__in=ids, then=Value(hits / len(grams))) for hits, ids in ids_by_hits.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return queryset.filter(Q(pk__in=similar) | contains_all).annotate(similarity=similarity)
+
+
+def trigram_candidates(using, grams, inner, need):
+    """The best users sharing at least `need` of `grams` or all of `inner`, with their number of shared trigrams."""
+    candidates = UserSearchTrigram.objects.using(using).filter(trigram__in=grams).values('user_id').annotate(
+        hits=Count('user_id'), inner_hits=Count('user_id', filter=Q(trigram__in=inner)),
+    )
+    matched = Q(hits__gte=need)
+    if inner:
+        matched |= Q(inner_hits=len(inner))
+    return candidates.filter(matched).order_by('-hits', 'user_id')[:MAX_CANDIDATES]
@@ -1,18 +1,21 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from rest_framework.authtoken.models import Token
+from bike_rental_service.fieldsets import SparseFieldsetSerializerMixin
+from bike_rental_service.images import ImageVariantsField
+from .authentication import get_valid_token
 from .models import User, OwnerProfile
 from django.utils import timezone
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     confirm_password = serializers.CharField(write_only=True, required=True)
+    profile_picture_variants = ImageVariantsField('profile_picture', help_text="URLs of the thumbnail, card and full-size picture variants.")
 
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'password', 'confirm_password', 'first_name', 'last_name',
-            'is_owner', 'phone_number', 'address', 'profile_picture'
+            'is_owner', 'phone_number', 'address', 'profile_picture', 'profile_picture_variants'
         ]
 
     def validate(self, data):
@@ -46,7 +49,7 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
 
-class OwnerProfileSerializer(serializers.ModelSerializer):
+class OwnerProfileSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = OwnerProfile
         fields = '__all__'
@@ -67,5 +70,5 @@ class LoginSerializer(serializers.Serializer):
         user = authenticate(username=data['username'], password=data['password'])
         if not user:
             raise serializers.ValidationError("Invalid credentials")
-        token, created = Token.objects.get_or_create(user=user)
+        token = get_valid_token(user)
         return {'token': token.key, 'user': UserSerializer(user).data}
\ No newline at end of file
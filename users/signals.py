@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from bike_rental_service.images import schedule_image_variants
+from .authentication import invalidate_token, invalidate_user_tokens
 from .models import User, OwnerProfile
+from .search import index_users
 
 @receiver(post_save, sender=User)
 def create_owner_profile(sender, instance, created, **kwargs):
@@ -8,4 +13,49 @@ def create_owner_profile(sender, instance, created, **kwargs):
     Automatically create an OwnerProfile when a user is marked as an owner.
     """
     if created and instance.is_owner:
-        OwnerProfile.objects.create(user=instance)
\ No newline at end of file
+        OwnerProfile.objects.create(user=instance)
+
+@receiver(post_save, sender=User)
+def build_profile_picture_variants(sender, instance, **kwargs):
+    """
+    Render the resized variants of a new or changed profile picture off the request path.
+    """
+    schedule_image_variants(instance, 'profile_picture')
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_cached_token(sender, instance, created=False, **kwargs):
+    """
+    Drop a rotated, revoked or expired token from the authentication caches, now and again after commit.
+    """
+    if created:
+        # A new key cannot be cached yet; marking it invalidated would only delay caching it.
+        return
+    key = instance.key
+    invalidate_token(key)
+    transaction.on_commit(lambda: invalidate_token(key))
+
+@receiver(post_save, sender=User)
+def forget_cached_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Make the next request of a user whose password, active or admin flags changed reload it
+    (deleting a user deletes its token). Other saves, such as the last_login update on every
+    login, leave the cached credentials alone.
+    """
+    if created or (update_fields is not None and not set(update_fields) & set(User.AUTH_FIELDS)):
+        return
+    state = instance.auth_state()
+    if state == getattr(instance, '_loaded_auth_state', None):
+        return
+    instance._loaded_auth_state = state
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user_tokens(user_id))
+
+@receiver(post_save, sender=User)
+def index_user_search(sender, instance, using, **kwargs):
+    """
+    Refresh the stored search trigrams of a new user or one whose search document changed.
+    """
+    if instance.search_document != getattr(instance, '_loaded_search_document', None):
+        index_users([instance], using=using)
+        instance._loaded_search_document = instance.search_document
@@ -1,3 +1,247 @@
-from django.test import TestCase
+import base64
+import io
+import math
+import time
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from .authentication import CachedTokenAuthentication, LocalTokenCache, clear_expired_tokens, local_token_cache
+from .models import ThrottleBucket, User, UserSearchTrigram
+from .search import (
+    SIMILARITY_THRESHOLD, document_trigrams, phone_prefix, query_trigrams, search_users, trigram_candidates,
+)
+from .throttling import TokenBucketRateThrottle, consume
+
+
+class UserSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('search-admin', 'admin@example.com', is_staff=True)
+        cls.ramesh, cls.anil, cls.sita, cls.hari = [
+            User.objects.create_user(username, f'{email}@example.com', first_name=first, last_name=last, phone_number=phone)
+            for username, email, first, last, phone in (
+                ('ramesh', 'ramesh.s', 'Ramesh', 'Shrestha', '+9779841000001'),
+                ('shrestha', 'anil', 'Anil', 'Thapa', '+9779841999999'),
+                ('sita', 'sita', 'Sita', 'Sharma', '+9779851000002'),
+                ('hari', 'hari', 'Hári', 'Gurung', '+9779842000000'),
+            )
+        ]
+
+    def search(self, value):
+        return list(search_users(User.objects.all(), value).order_by('-rank', 'pk'))
+
+    def test_exact_username_ranks_first(self):
+        self.assertEqual(self.search('shrestha'), [self.anil, self.ramesh])
+        self.assertEqual(self.search('hari gurung'), [self.hari])
+        self.assertEqual(self.search('zzzz'), [])
+        self.assertIsNone(search_users(User.objects.all(), '!!'))
+
+    def test_migration_backfills_documents_in_batches(self):
+        migration = import_module('users.migrations.0005_user_search')
+        User.objects.update(search_document='')
+        with CaptureQueriesContext(connection) as queries:
+            migration.fill_search_documents(apps, mock.Mock(connection=connection))
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        for user in User.objects.all():
+            self.assertEqual(user.search_document, user.build_search_document())
+
+    def test_phone_prefix(self):
+        self.assertEqual(phone_prefix('98410'), '+97798410')
+        self.assertEqual(phone_prefix('+977 9841-0'), '+97798410')
+        self.assertIsNone(phone_prefix('ram'))
+        self.assertEqual(self.search('+977 9841'), [self.ramesh, self.anil])
+        self.assertEqual(self.search('984100'), [self.ramesh])
+
+    def test_short_numbers_are_searched_as_text(self):
+        rider = User.objects.create_user('rider2024', 'rider2024@example.com')
+        User.objects.create_user('other', 'other@example.com', phone_number='+9772024000000')
+        self.assertEqual(self.search('2024'), [rider])
+
+    def test_phone_filter_is_a_prefix_range(self):
+        self.client.force_login(self.admin)
+
+        def filtered(value):
+            response = self.client.get('/api/users/', {'phone_number': value})
+            self.assertEqual(response.status_code, 200)
+            return sorted(user['username'] for user in response.json()['results'])
+
+        self.assertEqual(filtered('9841'), ['ramesh', 'shrestha'])
+        # The last digit is the range's upper bound: "...99" must not reach "+9779842".
+        self.assertEqual(filtered('+977984199'), ['shrestha'])
+        self.assertEqual(filtered('98510'), ['sita'])
+        # Not a phone number prefix: ignored like an empty filter.
+        self.assertEqual(filtered('ram'), ['hari', 'ramesh', 'search-admin', 'shrestha', 'sita'])
+
+
+class TrigramTableSearchTests(UserSearchTests):
+    """The same searches through UserSearchTrigram, which backends without pg_trgm use."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('users.search.uses_trigram_table', return_value=True):
+            super().setUpTestData()
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch('users.search.uses_trigram_table', return_value=True))
+
+    def test_trigrams_are_stored_per_user(self):
+        self.assertEqual(set(UserSearchTrigram.objects.filter(user=self.hari).values_list('trigram', flat=True)),
+                         document_trigrams('hari hari gurung hari'))
+
+    def test_similarity_is_the_shared_fraction_of_trigrams(self):
+        matches = search_users(User.objects.all(), 'shres').order_by('-rank', 'pk')
+        self.assertEqual([(user.username, user.similarity) for user in matches], [('ramesh', 1.0), ('shrestha', 1.0)])
+
+    def test_misspellings_fall_back_to_the_lower_threshold(self):
+        grams, inner = query_trigrams(['shrsta'])
+        # 3 of the 6 trigrams are shared: below 0.6, at least 0.4.
+        self.assertFalse(trigram_candidates('default', grams, inner, math.ceil(SIMILARITY_THRESHOLD * len(grams))))
+        matches = search_users(User.objects.all(), 'shrsta').order_by('-rank', 'pk')
+        self.assertEqual([(user.username, user.similarity) for user in matches], [('ramesh', 0.5), ('shrestha', 0.5)])
+
+
+class TokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('token-user', 'token-user@example.com', 'secret-password')
+
+    def setUp(self):
+        cache.clear()
+        local_token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self, loads):
+        """Authenticate the token, expecting `loads` reads of it from the token table."""
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                return self.auth.authenticate_credentials(self.token.key)
+            finally:
+                self.assertEqual(sum('FROM "authtoken_token"' in query['sql'] for query in queries), loads)
+
+    def save_user(self, **kwargs):
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in kwargs.items():
+                setattr(user, field, value)
+            user.save()
+        return user
+
+    def test_repeat_requests_are_served_from_the_caches(self):
+        self.assertEqual(self.authenticate(1), (self.user, self.token))
+        self.authenticate(0)
+        # Another process: only the shared cache is warm.
+        local_token_cache.clear()
+        self.assertEqual(self.authenticate(0)[0].username, 'token-user')
+
+    def test_logins_and_profile_edits_keep_the_cache(self):
+        self.authenticate(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, User.objects.get(pk=self.user.pk))
+        self.save_user(bio='Rides every weekend.')
+        local_token_cache.clear()
+        self.authenticate(0)
+
+    def test_deactivation_and_password_changes_invalidate(self):
+        self.authenticate(1)
+        self.save_user(password=make_password('new-password'))
+        self.authenticate(1)
+        self.save_user(is_active=False)
+        with self.assertRaisesMessage(AuthenticationFailed, 'User inactive or deleted.'):
+            self.authenticate(1)
+
+    def test_revoked_tokens_are_refused(self):
+        self.authenticate(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(user=self.user).delete()
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid token.'):
+            self.authenticate(1)
+
+    @override_settings(TOKEN_TTL=3600)
+    def test_expired_tokens_are_refused_and_cleared(self):
+        self.authenticate(1)
+        Token.objects.filter(pk=self.token.pk).update(created=now() - timedelta(hours=2))
+        local_token_cache.clear()
+        cache.clear()
+        with self.assertRaisesMessage(AuthenticationFailed, 'Token has expired.'):
+            self.authenticate(1)
+        self.assertEqual(clear_expired_tokens(), 1)
+        self.assertFalse(Token.objects.exists())
+
+    def test_local_entries_expire(self):
+        local = LocalTokenCache(max_size=2, ttl=0)
+        local.set('key', b'value')
+        self.assertIsNone(local.get('key'))
+
+    def test_basic_authentication_is_still_accepted(self):
+        credentials = base64.b64encode(b'token-user:secret-password').decode()
+        response = self.client.post('/api/users/token/rotate/', HTTP_AUTHORIZATION=f'Basic {credentials}')
+        self.assertEqual(response.status_code, 200)
+        wrong = base64.b64encode(b'token-user:wrong-password').decode()
+        response = self.client.post('/api/users/token/rotate/', HTTP_AUTHORIZATION=f'Basic {wrong}')
+        self.assertEqual(response.status_code, 401)
+
+
+class ThrottleTests(TestCase):
+    def test_burst_then_refusal(self):
+        self.assertEqual([consume('burst', 3, 60, current_time=1000)[0] for _ in range(3)], [True] * 3)
+        # 3 per minute refills one token every 20 seconds.
+        self.assertEqual(consume('burst', 3, 60, current_time=1000), (False, 20.0))
+        allowed, wait = consume('burst', 3, 60, current_time=1015)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 5.0)
+
+    def test_refill_is_capped_at_capacity(self):
+        for _ in range(3):
+            consume('refill', 3, 60, current_time=1000)
+        self.assertEqual(consume('refill', 3, 60, current_time=1020), (True, 0.0))
+        self.assertFalse(consume('refill', 3, 60, current_time=1020)[0])
+        # An hour later the bucket holds 3 tokens again, not 180.
+        self.assertEqual([consume('refill', 3, 60, current_time=4620)[0] for _ in range(4)], [True] * 3 + [False])
+
+    def test_first_request_creates_the_bucket(self):
+        self.assertEqual(consume('new', 3, 60, current_time=1000), (True, 0.0))
+        bucket = ThrottleBucket.objects.get(key='new')
+        self.assertEqual((bucket.tokens, bucket.updated_at, bucket.full_at), (2.0, 1000.0, 1020.0))
+
+    def test_throttle_reports_the_wait(self):
+        class TwoPerMinute(TokenBucketRateThrottle):
+            scope = 'test'
+            rate = '2/minute'
+
+            def get_cache_key(self, request, view):
+                return 'throttle_test'
+
+        request = APIRequestFactory().get('/')
+        with mock.patch('users.throttling.time.time', return_value=1000.0):
+            results = [TwoPerMinute().allow_request(request, None) for _ in range(2)]
+            throttle = TwoPerMinute()
+            results.append(throttle.allow_request(request, None))
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(throttle.wait(), 30.0)
+
+    def test_prune_deletes_only_full_buckets(self):
+        current_time = time.time()
+        ThrottleBucket.objects.bulk_create([
+            ThrottleBucket(key='full', tokens=3, updated_at=current_time - 120, full_at=current_time - 60),
+            ThrottleBucket(key='draining', tokens=0, updated_at=current_time, full_at=current_time + 60),
+        ])
+        out = io.StringIO()
+        call_command('prune_throttle_buckets', stdout=out)
+        self.assertIn('deleted=1 ', out.getvalue())
+        self.assertEqual(list(ThrottleBucket.objects.values_list('key', flat=True)), ['draining'])
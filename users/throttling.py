@@ -0,0 +1,112 @@
+"""
+Throttles backed by a shared token-bucket table.
+
+DRF's rate throttles keep a list of request timestamps per key in the
+Django cache and rewrite the whole list on every check. With the default
+local-memory cache each worker process counts on its own, so a limit is
+effectively multiplied by the number of workers.
+
+Here each key is a row of ``ThrottleBucket`` holding a token bucket: a
+"10/hour" rate allows a burst of 10 requests and refills at 10 per hour.
+A check is one conditional UPDATE that refills the bucket and takes a
+token only if one is available, so concurrent requests in any process
+cannot overdraw it. A refused request reads the row once to report how
+long to wait; the first request of a key also inserts the row.
+
+A bucket that has refilled completely is the same as no row, so
+``prune_throttle_buckets`` can delete rows past ``full_at`` at any time.
+"""
+import time
+
+from django.db import connections, router
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+from .models import ThrottleBucket
+
+
+_take_sql = {}
+
+
+def _take_statement(connection):
+    """
+    The conditional refill-and-take UPDATE. Written out rather than built
+    with F() expressions: compiling that expression tree on every request
+    cost several times more than running the statement.
+    """
+    vendor = connection.vendor
+    if vendor not in _take_sql:
+        quote = connection.ops.quote_name
+        table = quote(ThrottleBucket._meta.db_table)
+        least = 'MIN' if vendor == 'sqlite' else 'LEAST'
+        # Parameters: now, refill rate, capacity; every column on the right-hand side holds its old value.
+        refilled = f"{least}(%(capacity)s, {quote('tokens')} + (%(now)s - {quote('updated_at')}) * %(rate)s)"
+        _take_sql[vendor] = (
+            f"UPDATE {table} SET {quote('tokens')} = {refilled} - 1, "
+            f"{quote('full_at')} = %(now)s + (%(capacity)s - {refilled} + 1) / %(rate)s, "
+            f"{quote('updated_at')} = %(now)s "
+            f"WHERE {quote('key')} = %(key)s AND {quote('tokens')} + (%(now)s - {quote('updated_at')}) * %(rate)s >= 1"
+        )
+    return _take_sql[vendor]
+
+
+def consume(key, capacity, period, current_time=None):
+    """
+    Take one token from the bucket of `key` (`capacity` tokens refilled
+    over `period` seconds). Returns (allowed, seconds until a token is
+    available).
+    """
+    current_time = time.time() if current_time is None else current_time
+    refill_rate = capacity / period
+    connection = connections[router.db_for_write(ThrottleBucket)]
+    params = {'key': key, 'now': current_time, 'rate': refill_rate, 'capacity': float(capacity)}
+
+    def take():
+        with connection.cursor() as cursor:
+            cursor.execute(_take_statement(connection), params)
+            return cursor.rowcount
+
+    if take():
+        return True, 0.0
+    buckets = ThrottleBucket.objects.filter(key=key)
+    state = buckets.values_list('tokens', 'updated_at').first()
+    if state is None:
+        # Unknown key: start a full bucket and take from it. If another
+        # request created the row first, the insert is skipped and the
+        # conditional update decides against that row.
+        ThrottleBucket.objects.bulk_create([ThrottleBucket(
+            key=key, tokens=capacity, updated_at=current_time, full_at=current_time,
+        )], ignore_conflicts=True)
+        if take():
+            return True, 0.0
+        state = buckets.values_list('tokens', 'updated_at').get()
+    tokens, updated_at = state
+    available = min(capacity, tokens + (current_time - updated_at) * refill_rate)
+    return False, max(0.0, (1 - available) / refill_rate)
+
+
+class TokenBucketRateThrottle(SimpleRateThrottle):
+    """``SimpleRateThrottle`` that counts requests in the shared bucket table instead of the cache."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self._wait = consume(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class SharedAnonRateThrottle(AnonRateThrottle, TokenBucketRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(UserRateThrottle, TokenBucketRateThrottle):
+    pass
+
+
+class SharedScopedRateThrottle(ScopedRateThrottle, TokenBucketRateThrottle):
+    pass
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     UserListView, UserDetailView, RegisterUserView, LoginView, LogoutView,
-    OwnerProfileListView, OwnerProfileDetailView
+    TokenRotateView, OwnerProfileListView, OwnerProfileDetailView
 )
 
 urlpatterns = [
@@ -10,6 +10,7 @@ urlpatterns = [
     path('register/', RegisterUserView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/rotate/', TokenRotateView.as_view(), name='token-rotate'),
     path('owners/', OwnerProfileListView.as_view(), name='owner-list'),
     path('owners/<int:pk>/', OwnerProfileDetailView.as_view(), name='owner-detail'),
 ]
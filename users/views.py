@@ -1,30 +1,33 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework.authtoken.models import Token
-from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.views import APIView
 from django.contrib.auth import login, logout
+from bike_rental_service.fieldsets import SparseFieldsetMixin
 
-from .filters import UserFilter
+from .authentication import get_valid_token, rotate_token
+from .filters import UserFilter, UserSearchFilter
 from .models import User, OwnerProfile
 from .serializers import UserSerializer, OwnerProfileSerializer, LoginSerializer
 from .permissions import IsUserOrReadOnly, IsOwnerOrAdmin
 
-class UserListView(generics.ListAPIView):
+class UserListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     List all registered users.
 
     * Requires: Admin authentication
-    * Returns: List of user data
+    * Optional: search (ranked match on username, names and email, or a phone number prefix)
+    * Optional: phone_number (prefix, with or without +977), full_name, username, is_owner
+    * Optional: fields / omit (comma-separated) to choose the returned fields
+    * Returns: List of user data, best search matches first
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, UserSearchFilter]
     filterset_class = UserFilter
-    search_fields = ['username', 'email', 'first_name', 'last_name']
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -51,7 +54,7 @@ class RegisterUserView(APIView):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
+            token = get_valid_token(user)
             return Response({"token": token.key, "user": serializer.data}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -81,15 +84,30 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        request.user.auth_token.delete()
+        # Deleting the token also drops it from the authentication caches.
+        Token.objects.filter(user=request.user).delete()
         logout(request)
         return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
 
-class OwnerProfileListView(generics.ListCreateAPIView):
+class TokenRotateView(APIView):
+    """
+    Replace the caller's authentication token.
+
+    * Requires: Authentication
+    * Returns: The new token; the old one stops working immediately
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        token = rotate_token(request.user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+class OwnerProfileListView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     List all owner profiles or create a new one.
 
     * Requires: Authentication (admin for listing, user for creation)
+    * Optional: fields / omit (comma-separated) to choose the returned fields when listing
     * Returns: List of owner profiles or newly created profile data
     """
     queryset = OwnerProfile.objects.all()